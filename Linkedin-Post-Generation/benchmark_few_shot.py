@@ -0,0 +1,70 @@
+import os
+import time
+import random
+import tempfile
+import statistics
+
+from few_shot import FewShotPosts
+from jsonl_store import write_records
+
+# Synthetic corpus sizes to benchmark (1M takes a while to generate and load)
+CORPUS_SIZES = [1_000, 100_000, 1_000_000]
+QUERIES_PER_SIZE = 200
+
+TAGS = ["Supply Chain", "Machine Learning", "Data Engineering", "Cloud Infrastructure",
+        "Innovation", "Software Development", "User Experience", "Career Development",
+        "Logistics", "Leadership", "MLOps", "Analytics"]
+PILLARS = ["Data", "Supply Chain", "ML Systems", "Cloud"]
+LENGTHS = ["Short", "Medium", "Long"]
+
+
+def make_corpus(n, seed=42):
+    rng = random.Random(seed)
+    return [
+        {
+            "text": f"Synthetic post {i}",
+            "engagement": rng.randint(0, 500),
+            "line_count": rng.randint(1, 15),
+            "tags": rng.sample(TAGS, rng.randint(1, 3)),
+            "primary_pillar": rng.choice(PILLARS),
+        }
+        for i in range(n)
+    ]
+
+
+def time_queries(fs, rng):
+    latencies = []
+    for _ in range(QUERIES_PER_SIZE):
+        length, tag = rng.choice(LENGTHS), rng.choice(TAGS)
+        pillar = rng.choice(PILLARS + [None])
+        start = time.perf_counter()
+        fs.get_post_ids(length=length, tag=tag, pillar=pillar)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'posts':>10} {'load (s)':>10} {'snapshot (s)':>13} {'query p50 (ms)':>15} {'query p95 (ms)':>15}")
+
+    for n in CORPUS_SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "posts.jsonl")
+            write_records(path, make_corpus(n))
+
+            # First load parses the JSONL (and writes the snapshot), second one is a warm start
+            start = time.perf_counter()
+            FewShotPosts(path)
+            load_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            fs = FewShotPosts(path)
+            snapshot_seconds = time.perf_counter() - start
+
+            p50, p95 = time_queries(fs, rng)
+            print(f"{n:>10} {load_seconds:>10.2f} {snapshot_seconds:>13.2f} {p50:>15.3f} {p95:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,163 @@
+import os
 import pandas as pd
-import json
+import numpy as np
+import hashlib
+import threading
+
+from jsonl_store import iter_chunks
+
+# Relative to where the app runs from; LINKEDIN_POSTS_PATH points elsewhere (the API server sets it)
+DEFAULT_FILE_PATH = os.getenv("LINKEDIN_POSTS_PATH", "data/processed_posts.jsonl")
+# Posts parsed per DataFrame piece, so we never hold the whole corpus as Python dicts
+LOAD_CHUNK_SIZE = 50_000
+
+# Fields saved in the binary snapshot next to the JSON file
+SNAPSHOT_FIELDS = ["df", "unique_tags", "unique_pillars", "tag_index", "length_index", "pillar_index"]
 
 
 class FewShotPosts:
-    def __init__(self, file_path="data/processed_posts.json"):
+    def __init__(self, file_path=DEFAULT_FILE_PATH, use_snapshot=True):
+        self.file_path = os.path.abspath(file_path)
+        self.file_stat = None
+        self.file_hash = None
         self.df = None
         self.unique_tags = None
         self.unique_pillars = None
+        self.tag_index = {}
+        self.length_index = {}
+        self.pillar_index = {}
+        self.all_ids = None
+        self.load(file_path, use_snapshot)
+
+    def load(self, file_path, use_snapshot=True):
+        """
+        Loads the corpus, preferring the precompiled snapshot (DataFrame + indexes)
+        when it was built from the same JSON content; otherwise parses the JSON
+        and writes a fresh snapshot for the next start.
+        """
+        self.file_stat = file_signature(file_path)
+        snapshot_path = get_snapshot_path(file_path)
+
+        if use_snapshot and os.path.exists(snapshot_path):
+            snapshot = pd.read_pickle(snapshot_path)
+            # Same mtime/size means we can skip hashing; otherwise compare content hashes
+            if snapshot["file_stat"] == self.file_stat or snapshot["file_hash"] == file_hash(file_path):
+                for field in SNAPSHOT_FIELDS:
+                    setattr(self, field, snapshot[field])
+                self.file_hash = snapshot["file_hash"]
+                self.all_ids = self.make_all_ids()
+                return
+
+        self.file_hash = file_hash(file_path)
         self.load_posts(file_path)
 
+        if use_snapshot:
+            snapshot = {field: getattr(self, field) for field in SNAPSHOT_FIELDS}
+            snapshot["file_stat"] = self.file_stat
+            snapshot["file_hash"] = self.file_hash
+            # Write to a temp file first so a concurrent reader never sees half a snapshot
+            tmp_path = snapshot_path + ".tmp"
+            pd.to_pickle(snapshot, tmp_path)
+            os.replace(tmp_path, snapshot_path)
+
+    def is_stale(self):
+        """True when the data file's content changed since we loaded it (an mtime-only touch doesn't count)."""
+        stat = file_signature(self.file_path)
+        if stat == self.file_stat:
+            return False
+        if file_hash(self.file_path) == self.file_hash:
+            self.file_stat = stat
+            return False
+        return True
+
     def load_posts(self, file_path):
-        with open(file_path, encoding="utf-8") as f:
-            posts = json.load(f)
-            self.df = pd.json_normalize(posts)
+        # Streams the JSONL (or an old JSON array file) in chunks and stitches the pieces together
+        frames = [pd.json_normalize(chunk) for chunk in iter_chunks(file_path, LOAD_CHUNK_SIZE)]
+        # An empty corpus still gets the columns below, so it loads as empty indexes
+        self.df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["text", "line_count", "tags"])
+
+        # Length buckets: under 5 lines is Short, up to 10 is Medium, anything longer is Long
+        line_counts = self.df['line_count'].to_numpy()
+        self.df['length'] = np.select([line_counts < 5, line_counts <= 10], ["Short", "Medium"], "Long")
+
+        self.build_index()
+
+        # Collect all unique tags for the dropdown
+        self.unique_tags = list(self.tag_index)
+
+        # Collect unique pillars if they exist in the data
+        if 'primary_pillar' in self.df.columns:
+            self.unique_pillars = self.df['primary_pillar'].dropna().unique().tolist()
+
+    def build_index(self):
+        """
+        Builds inverted indexes (tag / length / pillar -> sorted int32 row ids) once at load time,
+        so each lookup is a set intersection instead of a scan over the whole DataFrame.
+        """
+        # Explode the tag lists into (row_id, tag) pairs and group them in one pass
+        tags = self.df['tags'].explode().dropna()
+        self.tag_index = self.group_row_ids(tags.index.to_numpy(), tags.to_numpy())
 
-            # Apply length categorization logic
-            self.df['length'] = self.df['line_count'].apply(self.categorize_length)
+        self.length_index = self.group_row_ids(np.arange(len(self.df)), self.df['length'].to_numpy())
 
-            # Collect all unique tags for the dropdown
-            all_tags = self.df['tags'].apply(lambda x: x).sum()
-            self.unique_tags = list(set(all_tags))
+        self.pillar_index = {}
+        if 'primary_pillar' in self.df.columns:
+            self.pillar_index = self.group_row_ids(np.arange(len(self.df)), self.df['primary_pillar'].to_numpy())
 
-            # Collect unique pillars if they exist in the data
-            if 'primary_pillar' in self.df.columns:
-                self.unique_pillars = self.df['primary_pillar'].unique().tolist()
+        self.all_ids = self.make_all_ids()
 
-    def get_filtered_posts(self, length, tag):
+    def make_all_ids(self):
+        # What an unfiltered lookup returns; built once and read-only, since every caller shares it
+        all_ids = np.arange(len(self.df), dtype=np.int32)
+        all_ids.flags.writeable = False
+        return all_ids
+
+    @staticmethod
+    def group_row_ids(row_ids, keys):
+        codes, uniques = pd.factorize(keys)
+        # factorize codes missing keys (a post without a pillar) as -1 and leaves them out of
+        # uniques; drop those rows, or that group would shift every key onto the wrong ids
+        present = codes >= 0
+        codes, row_ids = codes[present], np.asarray(row_ids)[present]
+        order = np.argsort(codes, kind="stable")
+        boundaries = np.flatnonzero(np.diff(codes[order])) + 1
+        groups = np.split(row_ids[order].astype(np.int32), boundaries)
+        # Drop duplicate ids (a post listing the same tag twice) and keep them sorted for intersection
+        return {key: np.unique(group) for key, group in zip(uniques, groups) if len(group)}
+
+    def get_post_ids(self, length=None, tag=None, pillar=None):
+        """
+        Returns the row ids matching every given filter (None means "any").
+        Intersects starting from the smallest list, so the work depends on the
+        size of the matches rather than the size of the corpus.
+        """
+        empty = np.empty(0, dtype=np.int32)
+        id_lists = []
+        if tag is not None:
+            id_lists.append(self.tag_index.get(tag, empty))
+        if length is not None:
+            id_lists.append(self.length_index.get(length, empty))
+        if pillar is not None:
+            id_lists.append(self.pillar_index.get(pillar, empty))
+
+        if not id_lists:
+            return self.all_ids
+
+        id_lists.sort(key=len)
+        result = id_lists[0]
+        for ids in id_lists[1:]:
+            if len(result) == 0:
+                break
+            result = np.intersect1d(result, ids, assume_unique=True)
+        return result
+
+    def get_filtered_posts(self, length, tag, pillar=None):
         """
         Retrieves posts matching a specific length and technical tag.
         Removed 'language' argument since all your posts are English.
         """
-        df_filtered = self.df[
-            (self.df['tags'].apply(lambda tags: tag in tags)) &
-            (self.df['length'] == length)
-            ]
-        return df_filtered.to_dict(orient='records')
-
-    def categorize_length(self, line_count):
-        if line_count < 5:
-            return "Short"
-        elif 5 <= line_count <= 10:
-            return "Medium"
-        else:
-            return "Long"
+        ids = self.get_post_ids(length=length, tag=tag, pillar=pillar)
+        return self.df.iloc[ids].to_dict(orient='records')
 
     def get_tags(self):
         return self.unique_tags
@@ -51,6 +166,43 @@ class FewShotPosts:
         return self.unique_pillars
 
 
+def file_signature(file_path):
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def file_hash(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_snapshot_path(file_path):
+    return os.path.splitext(file_path)[0] + ".snapshot.pkl"
+
+
+# One shared corpus per process. Streamlit re-runs main.py on every interaction
+# but keeps imported modules, so this survives reruns and is shared by all sessions.
+_shared_posts = None
+_shared_lock = threading.Lock()
+
+
+def get_few_shot_posts(file_path=DEFAULT_FILE_PATH):
+    """
+    Returns the process-wide FewShotPosts, building it on first use and
+    rebuilding it only when the data file's content changes.
+    """
+    global _shared_posts
+    with _shared_lock:
+        if (_shared_posts is None
+                or _shared_posts.file_path != os.path.abspath(file_path)
+                or _shared_posts.is_stale()):
+            _shared_posts = FewShotPosts(file_path)
+        return _shared_posts
+
+
 if __name__ == "__main__":
     # Simple test to verify the class works
     fs = FewShotPosts()
@@ -0,0 +1,208 @@
+import os
+import re
+import json
+
+import numpy as np
+
+# Posts are stored as JSON Lines: one record per line, so they can be written and read
+# one at a time instead of holding the whole corpus in memory. The optional ".idx" file
+# next to it holds every record's byte offset (int64, plus the file size at the end),
+# which gives random access to record i without scanning the file.
+INDEX_SUFFIX = ".idx"
+READ_BLOCK = 1024 * 1024
+CHUNK_SIZE = 10_000
+
+_SEPARATORS = re.compile(r"[\s,]*")
+
+
+def index_path(path):
+    return path + INDEX_SUFFIX
+
+
+class JsonlWriter:
+    """
+    Writes records one line at a time to a temp file that is swapped in on close,
+    so readers never see a half-written file. With index=True the byte offsets are
+    streamed to the index file as we go, so memory stays flat however many records.
+    """
+
+    def __init__(self, path, index=True):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.file = open(self.tmp_path, "wb")
+        self.index_file = open(index_path(path) + ".tmp", "wb") if index else None
+        self.count = 0
+
+    def write(self, record):
+        if self.index_file is not None:
+            self.index_file.write(np.int64(self.file.tell()).tobytes())
+        self.file.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.count += 1
+
+    def close(self):
+        size = self.file.tell()
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+        if self.index_file is not None:
+            self.index_file.write(np.int64(size).tobytes())
+            self.index_file.close()
+            # Written after the data file, so a valid index is never older than its data
+            os.replace(index_path(self.path) + ".tmp", index_path(self.path))
+        elif os.path.exists(index_path(self.path)):
+            os.remove(index_path(self.path))
+
+    def abort(self):
+        for f, tmp_path in ((self.file, self.tmp_path), (self.index_file, index_path(self.path) + ".tmp")):
+            if f is not None:
+                f.close()
+                os.remove(tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_records(path, records, index=True):
+    """Writes any iterable of records (a generator is fine); returns how many were written."""
+    with JsonlWriter(path, index=index) as writer:
+        for record in records:
+            writer.write(record)
+    return writer.count
+
+
+def is_json_array(path):
+    """True for the old format: one big JSON array (e.g. raw_posts.json)."""
+    with open(path, encoding="utf-8") as f:
+        while True:
+            char = f.read(1)
+            if not char or not char.isspace():
+                return char == "["
+
+
+def iter_json_array(path, block_size=READ_BLOCK):
+    """
+    Streams the items of a JSON array file without json.load-ing all of it:
+    reads a block at a time and decodes items as soon as they are complete.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buffer = f.read(block_size).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path} is not a JSON array")
+        pos = 1
+        while True:
+            pos = _SEPARATORS.match(buffer, pos).end()
+            if buffer[pos:pos + 1] == "]":
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # The next item runs past the end of the buffer: drop what we've used and read more
+                block = f.read(block_size)
+                if not block:
+                    raise
+                buffer = buffer[pos:] + block
+                pos = 0
+                continue
+            yield record
+            pos = end
+
+
+def iter_records(path):
+    """Streams records from a JSONL file, or from an old-style JSON array file."""
+    if is_json_array(path):
+        yield from iter_json_array(path)
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_chunks(path, chunk_size=CHUNK_SIZE):
+    """Lists of up to chunk_size records, for building a DataFrame piece by piece."""
+    chunk = []
+    for record in iter_records(path):
+        chunk.append(record)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def build_index(path):
+    """Scans a JSONL file once and writes its byte-offset index."""
+    tmp_path = index_path(path) + ".tmp"
+    with open(path, "rb") as f, open(tmp_path, "wb") as out:
+        offset = 0
+        for line in f:
+            if line.strip():
+                out.write(np.int64(offset).tobytes())
+            offset += len(line)
+        out.write(np.int64(offset).tobytes())
+    os.replace(tmp_path, index_path(path))
+
+
+def load_index(path):
+    """The offsets (memory-mapped), rebuilding the index when it's missing or older than the data."""
+    idx_path = index_path(path)
+    stat = os.stat(path)
+    if not os.path.exists(idx_path) or os.path.getmtime(idx_path) < stat.st_mtime:
+        build_index(path)
+    offsets = np.memmap(idx_path, dtype=np.int64, mode="r")
+    if offsets[-1] != stat.st_size:
+        # Same mtime but a different size: the data was rewritten without its index
+        del offsets
+        build_index(path)
+        offsets = np.memmap(idx_path, dtype=np.int64, mode="r")
+    return offsets
+
+
+class JsonlReader:
+    """Random access to the records of a JSONL file: reader[i] reads just that line."""
+
+    def __init__(self, path):
+        self.path = path
+        self.offsets = load_index(path)
+        self.file = open(path, "rb")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        self.file.seek(int(self.offsets[i]))
+        return json.loads(self.file.read(int(self.offsets[i + 1] - self.offsets[i])))
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def convert_json_array(src_path, dst_path=None, index=True):
+    """Converts an old JSON array file to JSONL (streaming, so any size works). Returns the JSONL path."""
+    dst_path = dst_path or os.path.splitext(src_path)[0] + ".jsonl"
+    count = write_records(dst_path, iter_records(src_path), index=index)
+    print(f"Converted {count} records: {src_path} -> {dst_path}")
+    return dst_path
+
+
+if __name__ == "__main__":
+    # python jsonl_store.py data/processed_posts.json [data/processed_posts.jsonl]
+    import sys
+
+    convert_json_array(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
@@ -1,12 +1,23 @@
 import os
+import sys
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 
+# Make the repo-level "shared" package importable when running from this folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared.llm_cache import get_llm_cache
+
 # Look in the parent directory for the .env file
 load_dotenv("../.env")
 
 # Initialize LLM with the supported model
+# Post generation samples at the default temperature, so asking again for the same
+# topic should give a new post: no response cache here
 llm = ChatGroq(
     groq_api_key=os.getenv("GROQ_API_KEY"),
-    model_name="llama-3.3-70b-versatile"
-)
\ No newline at end of file
+    model_name="llama-3.3-70b-versatile",
+)
+
+# Metadata extraction (preprocess.py) only needs the same facts about the same post,
+# so re-running it is served from the shared cache
+cached_llm = llm.model_copy(update={"cache": get_llm_cache()})
\ No newline at end of file
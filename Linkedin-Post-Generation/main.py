@@ -1,6 +1,10 @@
+import time
 import streamlit as st
-from few_shot import FewShotPosts
-from post_generator import generate_post  # Corrected import
+from few_shot import get_few_shot_posts
+from post_generator import generate_post_stream
+from shared.streaming import format_metrics
+from shared.tracing import span
+from shared import api_client
 
 # Options for length
 length_options = ["Short", "Medium", "Long"]
@@ -18,7 +22,8 @@ def main():
     # Dropdowns: Style (Tag) and Length
     col1, col2 = st.columns(2)
 
-    fs = FewShotPosts()
+    # Shared across reruns and sessions; only rebuilt when the data file changes
+    fs = get_few_shot_posts()
     tags = fs.get_tags()
 
     with col1:
@@ -33,16 +38,30 @@ def main():
         if not post_topic.strip():
             st.error("Please enter a topic to generate a post.")
         else:
-            with st.spinner("Analyzing your style and generating text..."):
-                try:
-                    # Corrected function call: matches generate_post(length, tag, topic)
-                    post = generate_post(selected_length, selected_tag, post_topic)
+            try:
+                st.markdown("---")
+                if api_client.API_URL:
+                    # The shared API server writes it (warm models; identical requests share one LLM call)
+                    with st.spinner("Analyzing your style and generating text..."):
+                        start = time.perf_counter()
+                        post = api_client.generate_post(selected_length, selected_tag, post_topic)
+                    st.write(post)
+                    st.success("Post Generated!")
+                    st.caption(f"Generated by {api_client.API_URL} in {time.perf_counter() - start:.2f}s")
+                else:
+                    # Stream the post so the first words show up right away instead of after the whole completion
+                    metrics = {}
+                    # TTFT and tokens/sec go on the trace span (see shared/tracing.py) rather than stdout
+                    with st.spinner("Analyzing your style and generating text..."), \
+                            span("generate_post", name="stream") as attrs:
+                        stream = generate_post_stream(selected_length, selected_tag, post_topic, metrics)
+                        st.write_stream(stream)
+                        attrs.update(metrics)
 
                     st.success("Post Generated!")
-                    st.markdown("---")
-                    st.write(post)
-                except Exception as e:
-                    st.error(f"An error occurred: {e}")
+                    st.caption(format_metrics(metrics))
+            except Exception as e:
+                st.error(f"An error occurred: {e}")
 
 
 if __name__ == "__main__":
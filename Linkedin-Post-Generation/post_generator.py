@@ -1,7 +1,7 @@
 from llm_helper import llm
-from few_shot import FewShotPosts
-
-few_shot = FewShotPosts()
+from semantic_selector import get_example_selector
+from shared.streaming import stream_with_metrics
+from shared.tracing import span, callbacks
 
 def get_length_str(length):
     if length == "Short":
@@ -20,11 +20,24 @@ def generate_post(length, tag, topic):
         tag (str): The style category (e.g., "Machine Learning").
         topic (str): The actual content you want to write about.
     """
-    prompt = get_prompt(length, tag, topic)
-    response = llm.invoke(prompt)
+    with span("generate_post"):
+        prompt = get_prompt(length, tag, topic)
+        response = llm.invoke(prompt, config={"callbacks": callbacks()})
     return response.content
 
+def generate_post_stream(length, tag, topic, metrics=None):
+    """
+    Streaming version of generate_post: yields the post text piece by piece as Groq produces it.
+    If a dict is passed as `metrics`, it is filled with time-to-first-token and tokens/sec.
+    """
+    prompt = get_prompt(length, tag, topic)
+    return stream_with_metrics(llm.stream(prompt, config={"callbacks": callbacks()}), metrics if metrics is not None else {})
+
 def get_prompt(length, tag, topic):
+    with span("prompt", name="get_prompt"):
+        return build_prompt(length, tag, topic)
+
+def build_prompt(length, tag, topic):
     length_str = get_length_str(length)
 
     prompt = f'''
@@ -35,8 +48,11 @@ def get_prompt(length, tag, topic):
     3) Style Context: The post should be relevant to {tag} professionals.
     '''
 
-    # Fetch examples based on length and tag (Style)
-    examples = few_shot.get_filtered_posts(length, tag)
+    # Fetch the examples closest to the topic, within the chosen length and tag (Style)
+    # Use max two samples to keep the prompt focused
+    with span("retrieval", name="few_shot_examples") as attrs:
+        examples = get_example_selector().select(topic, length=length, tag=tag, k=2)
+        attrs["documents"] = len(examples)
 
     if len(examples) > 0:
         prompt += "\n4) Use the writing style as per the following examples."
@@ -45,9 +61,6 @@ def get_prompt(length, tag, topic):
         post_text = post['text']
         prompt += f'\n\n Example {i+1}: \n\n {post_text}'
 
-        if i == 1: # Use max two samples to keep the prompt focused
-            break
-
     return prompt
 
 if __name__ == "__main__":
@@ -1,40 +1,187 @@
 import json
-from llm_helper import llm  # Interfaces with Groq llama-3.2-90b-text-preview
+import os
+import time
+import random
+import hashlib
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from llm_helper import cached_llm  # Interfaces with Groq llama-3.2-90b-text-preview
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.exceptions import OutputParserException
+from tag_unifier import DEFAULT_TAG_MAP_PATH, resolve_tags_with_llm, unify_tags
+from jsonl_store import JsonlWriter, iter_records
 
 
-def process_posts(raw_file_path, processed_file_path=None):
+# Batch enrichment settings
+# Groq is mostly network wait, so a handful of threads gives a near-linear speedup
+MAX_WORKERS = 8
+# Posts queued per worker; the rest of the raw file isn't read until they finish
+IN_FLIGHT_PER_WORKER = 4
+MAX_RETRIES = 5
+BASE_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 30.0
+
+
+def process_posts(raw_file_path, processed_file_path=None, checkpoint_path=None, max_workers=MAX_WORKERS,
+                  tag_map_path=None):
     """
     Orchestrates the data pipeline: reads raw posts, enriches them with technical
     metadata, and unifies tags for a clean dataset.
+    Enrichment runs concurrently and is checkpointed, so a crashed run resumes
+    from where it stopped instead of starting over.
+    Posts stream through one at a time (raw file -> checkpoint -> JSONL output), so
+    memory stays flat however big the corpus is. The raw file can be JSONL or the
+    old JSON array.
     """
-    with open(raw_file_path, encoding='utf-8') as file:
-        posts = json.load(file)
-        enriched_posts = []
-
-        # Initial technical enrichment per post
-        for post in posts:
-            # Extract metadata like pillar and language using the LLM
-            metadata = extract_metadata(post['text'])
-            # Merge original dictionary with new metadata fields
-            post_with_metadata = post | metadata
-            enriched_posts.append(post_with_metadata)
+    if checkpoint_path is None:
+        checkpoint_path = os.path.splitext(processed_file_path)[0] + ".checkpoint.jsonl"
+    if tag_map_path is None:
+        # The tag -> category map lives next to the processed data and grows with it
+        tag_map_path = os.path.join(os.path.dirname(processed_file_path), os.path.basename(DEFAULT_TAG_MAP_PATH))
+
+    # Initial technical enrichment per post
+    done = enrich_posts(iter_records(raw_file_path), checkpoint_path, max_workers=max_workers)
 
     # Consolidate technical tags across the dataset
     # This ensures consistency by mapping specific terms to broader categories
-    unified_tags = get_unified_tags(enriched_posts)
+    unified_tags = get_unified_tags(iter_enriched(raw_file_path, checkpoint_path, done), tag_map_path)
 
-    for post in enriched_posts:
-        current_tags = post.get('tags', [])
-        # Map original tags to their unified technical categories
-        new_tags = {unified_tags.get(tag, tag) for tag in current_tags}
-        post['tags'] = list(new_tags)
+    # Write processed data to a new file, one post per line (plus its byte-offset index)
+    with JsonlWriter(processed_file_path) as writer:
+        for post in iter_enriched(raw_file_path, checkpoint_path, done):
+            current_tags = post.get('tags', [])
+            # Map original tags to their unified technical categories
+            new_tags = {unified_tags.get(tag, tag) for tag in current_tags}
+            post['tags'] = list(new_tags)
+            writer.write(post)
 
-    # Write processed data to a new file
-    with open(processed_file_path, encoding='utf-8', mode="w") as outfile:
-        json.dump(enriched_posts, outfile, indent=4)
+
+def enrich_posts(posts, checkpoint_path, max_workers=MAX_WORKERS, max_retries=MAX_RETRIES):
+    """
+    Runs extract_metadata over a stream of posts with a thread pool.
+    Every finished post is appended to a JSONL checkpoint file keyed by a hash
+    of its text, so re-running after a crash only processes the missing posts.
+    Posts that still fail after all retries are skipped (and logged) rather
+    than killing the whole run.
+    Only a few posts per worker are in flight at once, and finished posts live in
+    the checkpoint rather than in memory: returns {post key: byte offset of its line}.
+    """
+    done = load_checkpoint(checkpoint_path)
+
+    stats = {"processed": 0, "resumed": 0, "retries": 0, "failed": 0}
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def enrich_one(post):
+        metadata, retries = call_with_backoff(extract_metadata, post['text'], max_retries=max_retries)
+        with lock:
+            stats["retries"] += retries
+        return post | metadata
+
+    with open(checkpoint_path, mode="ab") as checkpoint:
+        if checkpoint.tell() and not checkpoint_ends_with_newline(checkpoint_path):
+            # A crash mid-write left a half line; start ours on a fresh one
+            checkpoint.write(b"\n")
+
+        def finish(futures_done):
+            for future in futures_done:
+                i, key = in_flight.pop(future)
+                try:
+                    enriched = future.result()
+                except Exception as e:
+                    stats["failed"] += 1
+                    print(f"Skipping post {i}: {e}")
+                    continue
+
+                # Only this (main) thread writes, so lines never interleave
+                done[key] = checkpoint.tell()
+                checkpoint.write((json.dumps({"key": key, "post": enriched}) + "\n").encode("utf-8"))
+                checkpoint.flush()
+                stats["processed"] += 1
+
+        in_flight = {}  # future -> (post number, key)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for i, post in enumerate(posts):
+                key = post_key(post)
+                if key in done:
+                    stats["resumed"] += 1
+                    continue
+                if key in in_flight.values():
+                    continue
+                if len(in_flight) >= max_workers * IN_FLIGHT_PER_WORKER:
+                    finish(wait(in_flight, return_when=FIRST_COMPLETED).done)
+                in_flight[executor.submit(enrich_one, post)] = (i, key)
+            finish(wait(in_flight).done)
+
+    elapsed = time.perf_counter() - start
+    rate = stats["processed"] / elapsed if elapsed > 0 else 0.0
+    print(f"Enriched {stats['processed']} posts in {elapsed:.1f}s ({rate:.2f} posts/sec), "
+          f"resumed {stats['resumed']}, retries {stats['retries']}, failed {stats['failed']}")
+    return done
+
+
+def iter_enriched(raw_file_path, checkpoint_path, done):
+    """Enriched posts in the raw file's order, read back one at a time from the checkpoint."""
+    with open(checkpoint_path, "rb") as checkpoint:
+        for post in iter_records(raw_file_path):
+            offset = done.get(post_key(post))
+            if offset is None:
+                continue
+            checkpoint.seek(offset)
+            yield json.loads(checkpoint.readline())["post"]
+
+
+def post_key(post):
+    return hashlib.sha1(post['text'].encode('utf-8')).hexdigest()
+
+
+def load_checkpoint(checkpoint_path):
+    """{post key: byte offset of its checkpoint line}; the posts themselves stay on disk."""
+    done = {}
+    if not os.path.exists(checkpoint_path):
+        return done
+
+    with open(checkpoint_path, "rb") as f:
+        offset = 0
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-write can leave a half line at the end; just redo that post
+                offset += len(line)
+                continue
+            done[record["key"]] = offset
+            offset += len(line)
+    return done
+
+
+def checkpoint_ends_with_newline(checkpoint_path):
+    with open(checkpoint_path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def is_rate_limit_error(error):
+    # Groq raises RateLimitError (HTTP 429); match loosely so we don't depend on the SDK class
+    message = str(error).lower()
+    return type(error).__name__ == "RateLimitError" or "429" in message or "rate limit" in message
+
+
+def call_with_backoff(fn, *args, max_retries=MAX_RETRIES):
+    """
+    Calls fn with exponential backoff (plus jitter) on rate limits and bad JSON.
+    Returns (result, number_of_retries).
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return fn(*args), attempt
+        except Exception as e:
+            if attempt == max_retries or not (is_rate_limit_error(e) or isinstance(e, OutputParserException)):
+                raise
+            delay = min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** attempt)
+            time.sleep(delay * (0.5 + random.random()))
 
 
 def extract_metadata(post):
@@ -55,7 +202,7 @@ def extract_metadata(post):
     '''
 
     pt = PromptTemplate.from_template(template)
-    chain = pt | llm
+    chain = pt | cached_llm
     response = chain.invoke(input={"post": post})
 
     try:
@@ -66,43 +213,22 @@ def extract_metadata(post):
         raise OutputParserException("LLM output could not be parsed as JSON.")
     return res
 
-def get_unified_tags(posts_with_metadata):
+def get_unified_tags(posts_with_metadata, tag_map_path=DEFAULT_TAG_MAP_PATH):
     """
     Creates a mapping to merge similar technical tags into unified categories.
+    See tag_unifier.py: tags are clustered by embedding, only new representatives and
+    ambiguous tags go to the LLM (in bounded batches), and the map is saved so later
+    runs only resolve tags they haven't seen.
     """
-    unique_tags = set()
-    for post in posts_with_metadata:
-        unique_tags.update(post.get('tags', []))
-
-    unique_tags_list = ', '.join(unique_tags)
+    tag_counts = Counter(tag for post in posts_with_metadata for tag in post.get('tags', []))
 
-    template = '''
-    Unify and map these technical tags into broad professional categories.
-    - Use Title Case only.
-    - Follow these categorization examples:
-       - "Logistics" or "Warehousing" maps to "Supply Chain"
-       - "AWS", "Docker", or "K8s" maps to "Cloud Infrastructure"
-       - "LLMs" or "RAG" maps to "Machine Learning"
-       - "Snowflake" or "SQL" maps to "Data Engineering"
-    - Output ONLY a JSON object mapping the original tag to the unified tag.
-
-    List of tags to process: 
-    {tags}
-    '''
+    def resolve(batch, categories):
+        # Rate limits and bad JSON are retried like the enrichment calls
+        return call_with_backoff(resolve_tags_with_llm, batch, categories)[0]
 
-    pt = PromptTemplate.from_template(template)
-    chain = pt | llm
-    response = chain.invoke(input={"tags": unique_tags_list})
-
-    try:
-        json_parser = JsonOutputParser()
-        res = json_parser.parse(response.content)
-    except OutputParserException:
-        # Return an empty dictionary if unification logic fails
-        return {}
-    return res
+    return unify_tags(tag_counts, tag_map_path, resolve=resolve)
 
 
 if __name__ == "__main__":
     # Execute the processing pipeline
-    process_posts("data/raw_posts.json", "data/processed_posts.json")
\ No newline at end of file
+    process_posts("data/raw_posts.json", "data/processed_posts.jsonl")
\ No newline at end of file
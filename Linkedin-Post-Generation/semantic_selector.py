@@ -0,0 +1,103 @@
+import os
+import sys
+import json
+import threading
+import numpy as np
+
+# Make the repo-level "shared" package importable when running from this folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared.embedding_service import get_embedding_service
+from few_shot import get_few_shot_posts
+
+# Same small CPU model the other projects in this repo use
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def get_embeddings():
+    """
+    The process-wide embedding service (shared/embedding_service.py), so the model is
+    loaded once even next to the news and t-shirt apps, and topics hit its disk cache.
+    Rows and queries are normalized here, so the un-normalized service works as-is.
+    """
+    return get_embedding_service(EMBEDDING_MODEL)
+
+
+class SemanticExampleSelector:
+    """
+    Picks few-shot examples by cosine similarity between the topic and each post.
+    Post embeddings are computed once, saved as a .npy matrix next to the data
+    file and memory-mapped afterwards, so a request only embeds the topic and
+    does one matrix-vector product over the rows that pass the tag/length filter.
+    """
+
+    def __init__(self, few_shot_posts, embeddings=None):
+        self.posts = few_shot_posts
+        self.embeddings = embeddings or get_embeddings()
+        self.matrix = self.load_matrix()
+
+    def load_matrix(self):
+        base_path = os.path.splitext(self.posts.file_path)[0]
+        matrix_path = base_path + ".embeddings.npy"
+        meta_path = base_path + ".embeddings.json"
+
+        if os.path.exists(matrix_path) and os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            # Reuse the saved vectors only if they were built from the same posts with the same model
+            if meta.get("file_hash") == self.posts.file_hash and meta.get("model") == EMBEDDING_MODEL:
+                return np.load(matrix_path, mmap_mode="r")
+
+        texts = self.posts.df['text'].tolist()
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        # Normalize rows so a dot product is the cosine similarity
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+
+        tmp_path = base_path + ".embeddings.tmp.npy"
+        np.save(tmp_path, vectors)
+        os.replace(tmp_path, matrix_path)
+        with open(meta_path, encoding="utf-8", mode="w") as f:
+            json.dump({"file_hash": self.posts.file_hash, "model": EMBEDDING_MODEL,
+                       "rows": len(vectors), "dim": int(vectors.shape[1])}, f)
+
+        return np.load(matrix_path, mmap_mode="r")
+
+    def embed_query(self, text):
+        query = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(query)
+        return query / norm if norm else query
+
+    def select(self, topic, length=None, tag=None, k=2):
+        """
+        Returns the k posts most similar to the topic, filtered by length and tag.
+        If nothing matches both filters we relax to tag only, then to the whole corpus,
+        so the prompt always gets some style examples.
+        """
+        for filters in ({"length": length, "tag": tag}, {"tag": tag}, {}):
+            ids = self.posts.get_post_ids(**filters)
+            if len(ids):
+                break
+        else:
+            return []
+
+        scores = self.matrix[ids] @ self.embed_query(topic)
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return self.posts.df.iloc[ids[top]].to_dict(orient='records')
+
+
+_selector = None
+_selector_lock = threading.Lock()
+
+
+def get_example_selector():
+    """Process-wide selector, rebuilt only when the shared corpus is rebuilt."""
+    global _selector
+    posts = get_few_shot_posts()
+    with _selector_lock:
+        if _selector is None or _selector.posts is not posts:
+            _selector = SemanticExampleSelector(posts)
+        return _selector
@@ -0,0 +1,203 @@
+import os
+import json
+import time
+from collections import Counter
+
+import numpy as np
+from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.exceptions import OutputParserException
+
+from llm_helper import llm  # also puts the repo root on sys.path for shared/
+from shared.embedding_service import get_embedding_service
+
+# Same small CPU model the rest of the repo uses; vectors are cached on disk by the shared service
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_TAG_MAP_PATH = "data/tag_map.json"
+
+# A tag joins a cluster when its cosine similarity to the representative is at least this...
+CLUSTER_THRESHOLD = 0.7
+# ...and takes the representative's category without asking the LLM only above this.
+# Members in between are "ambiguous" and get resolved by the LLM themselves.
+CONFIDENT_THRESHOLD = 0.85
+# Tags per LLM call, so the prompt stays far below the context window however many tags there are
+BATCH_SIZE = 100
+# Existing categories listed in the prompt (most used first), so it stays bounded too
+MAX_PROMPT_CATEGORIES = 50
+# Rows per block when comparing new tags with already mapped ones (bounds memory)
+SIMILARITY_BLOCK = 1024
+
+UNIFY_TEMPLATE = '''
+Unify and map these technical tags into broad professional categories.
+- Use Title Case only.
+- Reuse one of the existing categories whenever it fits: {categories}
+- Follow these categorization examples:
+   - "Logistics" or "Warehousing" maps to "Supply Chain"
+   - "AWS", "Docker", or "K8s" maps to "Cloud Infrastructure"
+   - "LLMs" or "RAG" maps to "Machine Learning"
+   - "Snowflake" or "SQL" maps to "Data Engineering"
+- Output ONLY a JSON object mapping every original tag to its unified tag.
+
+List of tags to process:
+{tags}
+'''
+
+
+def tag_key(tag):
+    # "RAG", "rag " and "Rag" are the same tag
+    return " ".join(tag.split()).lower()
+
+
+def load_tag_map(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["tags"]
+
+
+def save_tag_map(path, tag_map):
+    """Written to a temp file and swapped in, so a crash never leaves a half-written map."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, encoding="utf-8", mode="w") as f:
+        json.dump({"model": EMBEDDING_MODEL, "tags": dict(sorted(tag_map.items()))}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+# llm has no response cache: the tag map already remembers every answer, and a retry
+# after a malformed reply should really ask again instead of replaying it
+
+
+def resolve_tags_with_llm(tags, categories):
+    """Asks the LLM to map one batch of tags; raises OutputParserException on bad JSON."""
+    pt = PromptTemplate.from_template(UNIFY_TEMPLATE)
+    chain = pt | llm
+    response = chain.invoke(input={"tags": json.dumps(tags),
+                                   "categories": ", ".join(categories) or "(none yet)"})
+    try:
+        result = JsonOutputParser().parse(response.content)
+    except OutputParserException:
+        raise OutputParserException("LLM output could not be parsed as JSON.")
+    if not isinstance(result, dict):
+        raise OutputParserException("LLM output is not a JSON object.")
+    return {tag: category for tag, category in result.items() if isinstance(category, str) and category.strip()}
+
+
+def cluster_tags(vectors, weights):
+    """
+    Greedy leader clustering on normalized vectors: the most frequent unassigned tag
+    becomes a representative and takes every unassigned tag within CLUSTER_THRESHOLD.
+    Each step is one matrix-vector product over the tags still unassigned.
+    Returns (representative index per tag, similarity to that representative).
+    """
+    n = len(vectors)
+    representative = np.full(n, -1, dtype=np.int64)
+    similarity = np.zeros(n, dtype=np.float32)
+    unassigned = np.ones(n, dtype=bool)
+
+    for i in np.argsort(-np.asarray(weights), kind="stable"):
+        if not unassigned[i]:
+            continue
+        candidates = np.flatnonzero(unassigned)
+        sims = vectors[candidates] @ vectors[i]
+        members = candidates[sims >= CLUSTER_THRESHOLD]
+        representative[members] = i
+        similarity[members] = sims[sims >= CLUSTER_THRESHOLD]
+        representative[i], similarity[i] = i, 1.0
+        unassigned[members] = False
+        unassigned[i] = False
+    return representative, similarity
+
+
+def nearest_known(vectors, known_vectors):
+    """Index of and similarity to the closest already-mapped tag, for every new tag."""
+    best = np.full(len(vectors), -1, dtype=np.int64)
+    best_sim = np.full(len(vectors), -1.0, dtype=np.float32)
+    if not len(known_vectors):
+        return best, best_sim
+    for start in range(0, len(vectors), SIMILARITY_BLOCK):
+        sims = vectors[start:start + SIMILARITY_BLOCK] @ known_vectors.T
+        best[start:start + SIMILARITY_BLOCK] = sims.argmax(axis=1)
+        best_sim[start:start + SIMILARITY_BLOCK] = sims.max(axis=1)
+    return best, best_sim
+
+
+def unify_tags(tag_counts, tag_map_path=DEFAULT_TAG_MAP_PATH, resolve=resolve_tags_with_llm, embeddings=None):
+    """
+    Maps every tag in `tag_counts` ({tag: how often it appears}) to a unified category.
+
+    Tags already in the persisted tag map are answered from it. New tags are embedded
+    and then resolved in order:
+    1. a new tag very close to an already mapped tag takes its category
+    2. the rest are clustered; representatives and ambiguous members go to
+       `resolve(batch, categories)` in batches of BATCH_SIZE
+    3. confident cluster members take their representative's category
+    Only resolved tags are saved, so tags from a failed batch map to themselves for
+    this run and are retried next time instead of being lost.
+    """
+    start = time.perf_counter()
+    tag_map = load_tag_map(tag_map_path)  # tag key -> category
+    known = sum(1 for tag in tag_counts if tag_key(tag) in tag_map)
+    new_tags = {}  # tag key -> count
+    display = {}  # tag key -> how it was first written, which is what the LLM sees
+    for tag, count in tag_counts.items():
+        key = tag_key(tag)
+        if key and key not in tag_map:
+            new_tags[key] = new_tags.get(key, 0) + count
+            display.setdefault(key, " ".join(tag.split()))
+    stats = {"known": known, "new": len(new_tags), "matched_known": 0,
+             "sent_to_llm": 0, "llm_batches": 0, "inherited": 0, "unresolved": 0}
+
+    if new_tags:
+        embeddings = embeddings or get_embedding_service(EMBEDDING_MODEL, normalize=True)
+        keys = list(new_tags)
+        vectors = np.asarray(embeddings.embed_documents(keys), dtype=np.float32)
+        known_keys = list(tag_map)
+        known_vectors = np.asarray(embeddings.embed_documents(known_keys), dtype=np.float32) if known_keys \
+            else np.zeros((0, vectors.shape[1]), dtype=np.float32)
+
+        resolved = {}
+        # 1. Near-duplicates of tags we've already mapped
+        best, best_sim = nearest_known(vectors, known_vectors)
+        for i in np.flatnonzero(best_sim >= CONFIDENT_THRESHOLD):
+            resolved[keys[i]] = tag_map[known_keys[best[i]]]
+        stats["matched_known"] = len(resolved)
+
+        # 2. Cluster the rest and ask the LLM about representatives + ambiguous members
+        remaining = [i for i, key in enumerate(keys) if key not in resolved]
+        representative, similarity = cluster_tags(vectors[remaining], [new_tags[keys[i]] for i in remaining])
+        to_ask = [keys[remaining[j]] for j in range(len(remaining))
+                  if representative[j] == j or similarity[j] < CONFIDENT_THRESHOLD]
+        categories = Counter(tag_map.values())
+        categories.update(resolved.values())
+        for batch_start in range(0, len(to_ask), BATCH_SIZE):
+            batch = to_ask[batch_start:batch_start + BATCH_SIZE]
+            stats["llm_batches"] += 1
+            try:
+                answer = {tag_key(tag): category.strip()
+                          for tag, category in resolve([display[key] for key in batch],
+                                                       [c for c, _ in categories.most_common(MAX_PROMPT_CATEGORIES)]).items()}
+            except Exception as e:
+                print(f"Tag batch {stats['llm_batches']} failed ({e}); those tags will be retried next run")
+                continue
+            for key in batch:
+                if key in answer:
+                    resolved[key] = answer[key]
+                    categories[answer[key]] += 1
+        stats["sent_to_llm"] = len(to_ask)
+
+        # 3. Confident members follow their representative
+        for j in range(len(remaining)):
+            key, rep_key = keys[remaining[j]], keys[remaining[representative[j]]]
+            if key not in resolved and rep_key in resolved and similarity[j] >= CONFIDENT_THRESHOLD:
+                resolved[key] = resolved[rep_key]
+                stats["inherited"] += 1
+
+        stats["unresolved"] = len(new_tags) - len(resolved)
+        tag_map.update(resolved)
+        save_tag_map(tag_map_path, tag_map)
+
+    print(f"Unified {len(tag_counts)} tags in {time.perf_counter() - start:.1f}s: " +
+          ", ".join(f"{name} {value}" for name, value in stats.items()))
+    # Tags still unresolved keep their own name, as before
+    return {tag: tag_map.get(tag_key(tag), tag) for tag in tag_counts}
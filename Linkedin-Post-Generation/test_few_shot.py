@@ -0,0 +1,33 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from few_shot import FewShotPosts  # noqa: E402
+from jsonl_store import write_records  # noqa: E402
+
+
+def make_posts(tmp_path, records):
+    path = str(tmp_path / "posts.jsonl")
+    write_records(path, records)
+    return FewShotPosts(path, use_snapshot=False)
+
+
+def test_missing_pillar_keeps_ids_aligned(tmp_path):
+    posts = make_posts(tmp_path, [
+        {"text": "a", "line_count": 3, "tags": ["AI"], "primary_pillar": "Cloud"},
+        {"text": "b", "line_count": 3, "tags": ["AI"]},
+        {"text": "c", "line_count": 3, "tags": ["AI"], "primary_pillar": "Data"},
+    ])
+
+    assert posts.get_post_ids(pillar="Cloud").tolist() == [0]
+    assert posts.get_post_ids(pillar="Data").tolist() == [2]
+    assert posts.get_filtered_posts("Short", "AI", pillar="Data")[0]["text"] == "c"
+    assert sorted(posts.get_pillars()) == ["Cloud", "Data"]
+
+
+def test_empty_corpus(tmp_path):
+    posts = make_posts(tmp_path, [])
+
+    assert len(posts.get_post_ids()) == 0
+    assert len(posts.get_post_ids(length="Short", tag="AI")) == 0
+    assert posts.get_tags() == []
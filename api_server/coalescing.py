@@ -0,0 +1,91 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFull(Exception):
+    """Raised instead of queueing when too many requests are already waiting."""
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight requests: the first caller for a key starts the
+    work, everyone who asks for the same key before it finishes awaits that same
+    result (or error). Nothing is kept afterwards; the LLM response cache takes
+    over once the answer exists.
+    """
+
+    def __init__(self):
+        self.in_flight = {}  # key -> asyncio.Future
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        """Runs `await fn()` once per key at a time; returns (result, shared) where shared means we joined another call."""
+        future = self.in_flight.get(key)
+        shared = future is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.started += 1
+            future = asyncio.ensure_future(fn())
+            self.in_flight[key] = future
+            future.add_done_callback(functools.partial(self._finished, key))
+        # shield: a client that disconnects cancels only its own wait, not the work the others share
+        return await asyncio.shield(future), shared
+
+    def _finished(self, key, future):
+        if self.in_flight.get(key) is future:
+            del self.in_flight[key]
+        if not future.cancelled():
+            # Marks the error as retrieved even if every waiter went away
+            future.exception()
+
+
+class WorkQueue:
+    """
+    Bounded concurrency toward the LLM provider: at most `concurrency` jobs run at
+    once (in worker threads, since LangChain's invoke is blocking), up to
+    `max_waiting` more wait their turn in arrival order, and past that callers
+    get QueueFull right away instead of piling up.
+    """
+
+    def __init__(self, concurrency, max_waiting):
+        self.concurrency = concurrency
+        self.max_waiting = max_waiting
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="api-worker")
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, fn, *args):
+        if self.semaphore.locked() and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise QueueFull(f"{self.waiting} requests already waiting")
+
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        try:
+            # Copy the context so tracing spans opened by the handler are parents of the work's spans
+            context = contextvars.copy_context()
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, functools.partial(context.run, fn, *args))
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self.semaphore.release()
+
+    def stats(self):
+        return {"concurrency": self.concurrency, "running": self.running, "waiting": self.waiting,
+                "completed": self.completed, "rejected": self.rejected}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
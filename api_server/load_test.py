@@ -0,0 +1,168 @@
+"""
+Load generator for the API server, run fully offline against the fake LLM
+(shared/fake_llm.py) with synthetic LinkedIn posts, news articles and a SQLite
+t-shirt store. The same workload runs twice: once with every request executed
+on its own (what separate Streamlit sessions do today) and once with single-flight
+coalescing, and the throughput, latency and number of LLM calls are compared.
+
+    python api_server/load_test.py
+    python api_server/load_test.py --requests 600 --clients 64 --distinct 30 --latency 0.5
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import threading
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The benchmark suite sends every cache and trace to a scratch folder on import and has the data generators
+sys.path.append(os.path.join(REPO_ROOT, "benchmarks"))
+import run_benchmarks as bench  # noqa: E402
+
+os.environ["LINKEDIN_POSTS_PATH"] = os.path.join(bench.WORK_DIR, "processed_posts.jsonl")
+os.environ["NEWS_COLLECTIONS_DIR"] = os.path.join(bench.WORK_DIR, "collections")
+os.environ["DB_URI"] = "sqlite:///" + os.path.join(bench.WORK_DIR, "tshirts.db")
+
+import aiohttp  # noqa: E402
+from aiohttp import web  # noqa: E402
+from shared import fake_llm  # noqa: E402
+
+QUESTIONS = ["How many t-shirts do we have left for Nike in XS size and white color?",
+             "How much is the total price of the inventory for all S-size t-shirts?",
+             "How many white color Levi's shirt I have?",
+             "How much sales amount will be generated if we sell all large size t-shirts today after discounts?"]
+
+_llm_calls = 0
+_llm_calls_lock = threading.Lock()
+
+
+def counting_responder(prompt):
+    global _llm_calls
+    with _llm_calls_lock:
+        _llm_calls += 1
+    return bench.responder(prompt)
+
+
+def prepare_data(posts, articles):
+    from benchmark_few_shot import make_corpus
+    from jsonl_store import write_records
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from shared.embedding_service import get_embedding_service
+    from collection_manager import DEFAULT_COLLECTION, get_collection_manager
+
+    write_records(os.environ["LINKEDIN_POSTS_PATH"], make_corpus(posts))
+    bench.make_tshirt_db(os.environ["DB_URI"].removeprefix("sqlite:///"), 1_000)
+    text_splitter = RecursiveCharacterTextSplitter(separators=['\n\n', '\n', '.', ','], chunk_size=1000)
+    collections = get_collection_manager(get_embedding_service("sentence-transformers/all-MiniLM-L6-v2"))
+    collections.ingest(DEFAULT_COLLECTION, bench.make_articles(articles), text_splitter)
+
+
+def make_requests(count, distinct, salt, seed=0):
+    """
+    `count` requests drawn from `distinct` different ones, a few of them much more
+    popular than the rest (like real traffic). `salt` keeps each run's prompts apart,
+    so the second run can't be answered from the first run's response cache.
+    """
+    rng = random.Random(seed)
+    pool = []
+    for i in range(distinct):
+        kind = i % 3
+        if kind == 0:
+            pool.append(("/v1/linkedin/post", {"length": rng.choice(["Short", "Medium", "Long"]),
+                                               "tag": rng.choice(["Machine Learning", "Supply Chain"]),
+                                               "topic": f"{rng.choice(bench.TOPICS)} ({salt} #{i})"}))
+        elif kind == 1:
+            pool.append(("/v1/news/query", {"question": f"what did article {i} say about {rng.choice(bench.TOPICS)}? "
+                                                        f"({salt})"}))
+        else:
+            pool.append(("/v1/tshirt/question", {"question": f"{QUESTIONS[i % len(QUESTIONS)]} ({salt} #{i})"}))
+    weights = [1 / (rank + 1) for rank in range(distinct)]
+    return rng.choices(pool, weights=weights, k=count)
+
+
+async def run_load(requests, clients, coalesce, concurrency):
+    import server
+
+    # Warmed up once in main(), so both runs start from the same warm state
+    app = server.create_app(coalesce=coalesce, concurrency=concurrency, max_queue=len(requests), warm=False)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    base_url = f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+    calls_before = _llm_calls
+    latencies, errors = [], 0
+    pending = list(reversed(requests))
+
+    async def client(session):
+        nonlocal errors
+        while pending:
+            path, payload = pending.pop()
+            start = time.perf_counter()
+            async with session.post(base_url + path, json=payload) as response:
+                await response.read()
+                if response.status != 200:
+                    errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    try:
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=clients)) as session:
+            start = time.perf_counter()
+            await asyncio.gather(*(client(session) for _ in range(clients)))
+            seconds = time.perf_counter() - start
+            async with session.get(base_url + "/stats") as response:
+                stats = await response.json()
+    finally:
+        await runner.cleanup()
+
+    latencies.sort()
+    return {
+        "requests_per_sec": len(requests) / seconds,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "llm_calls": _llm_calls - calls_before,
+        "coalesced": stats["coalesced"],
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--clients", type=int, default=32, help="concurrent HTTP clients")
+    parser.add_argument("--distinct", type=int, default=24, help="different requests in the mix")
+    parser.add_argument("--concurrency", type=int, default=8, help="server-side LLM concurrency")
+    parser.add_argument("--latency", type=float, default=0.5, help="fake LLM seconds before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=300.0, help="fake LLM generation speed")
+    args = parser.parse_args()
+
+    fake_llm.install(latency_seconds=args.latency, tokens_per_sec=args.tokens_per_sec, responder=counting_responder)
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    import server  # after install(), like the apps
+    import langchain_helper
+
+    prepare_data(posts=2_000, articles=20)
+    server.warm_up()
+
+    print(f"{args.requests} requests from {args.clients} clients over {args.distinct} distinct requests, "
+          f"server concurrency {args.concurrency}, fake LLM latency {args.latency}s\n")
+    print(f"{'mode':>12} {'req/s':>8} {'p50 (ms)':>9} {'p95 (ms)':>9} {'LLM calls':>10} {'coalesced':>10} {'errors':>7}")
+    results = {}
+    for mode, coalesce in (("separate", False), ("single-flight", True)):
+        # Each run starts without saved SQL plans, and its own salt keeps the response caches apart
+        langchain_helper._plan_cache = None
+        requests = make_requests(args.requests, args.distinct, salt=mode)
+        row = asyncio.run(run_load(requests, args.clients, coalesce, args.concurrency))
+        results[mode] = row
+        print(f"{mode:>12} {row['requests_per_sec']:>8.1f} {row['p50_ms']:>9.0f} {row['p95_ms']:>9.0f} "
+              f"{row['llm_calls']:>10} {row['coalesced']:>10} {row['errors']:>7}")
+
+    gain = results["single-flight"]["requests_per_sec"] / results["separate"]["requests_per_sec"]
+    print(f"\nThroughput gain from coalescing: {gain:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Async HTTP API in front of the repo's generation paths, so several Streamlit
+sessions (or any other client) share one set of warm resources:
+
+    POST /v1/linkedin/post      {"length", "tag", "topic"}  -> {"post"}
+    POST /v1/news/query         {"question", "collection", "rerank", "token_budget"}
+                                                            -> {"answer", "sources", "context"}
+    POST /v1/tshirt/question    {"question"}                -> {"answer", "sql", "db_result", "plan_cache_hit"}
+    GET  /health, GET /stats
+
+Identical requests that arrive while one is already running are coalesced into a
+single LLM call, and LLM work runs on a bounded pool with a bounded wait queue
+(503 once it's full). Run it from the repo root:
+
+    python api_server/server.py --port 8000
+    GENAI_API_URL=http://127.0.0.1:8000 streamlit run main.py   # in any app folder
+"""
+import os
+import sys
+import json
+import hashlib
+import argparse
+import threading
+
+from aiohttp import web
+from dotenv import load_dotenv
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIRS = ["Linkedin-Post-Generation", "news_research_project", "tshirt_sales"]
+
+# The apps use paths relative to their own folder; the server serves them all from one process
+os.environ.setdefault("LINKEDIN_POSTS_PATH",
+                      os.path.join(REPO_ROOT, "Linkedin-Post-Generation", "data", "processed_posts.jsonl"))
+os.environ.setdefault("NEWS_COLLECTIONS_DIR", os.path.join(REPO_ROOT, "news_research_project", "collections"))
+
+# API keys and DB settings, as for the apps
+load_dotenv(os.path.join(REPO_ROOT, ".env"))
+
+sys.path.append(REPO_ROOT)
+for app_dir in APP_DIRS:
+    sys.path.append(os.path.join(REPO_ROOT, app_dir))
+
+from coalescing import QueueFull, SingleFlight, WorkQueue  # noqa: E402
+
+HOST = os.getenv("API_HOST", "127.0.0.1")
+PORT = int(os.getenv("API_PORT", "8000"))
+# Concurrent LLM-bound requests; Groq rate limits hit long before the CPU does
+MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", "8"))
+# Requests allowed to wait for a slot; beyond this the server answers 503 right away
+MAX_QUEUE = int(os.getenv("API_MAX_QUEUE", "64"))
+LENGTHS = ("Short", "Medium", "Long")
+
+COALESCE = web.AppKey("coalesce", bool)
+SINGLE_FLIGHT = web.AppKey("single_flight", SingleFlight)
+WORK_QUEUE = web.AppKey("work_queue", WorkQueue)
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# --- The work itself (blocking; runs on the WorkQueue's threads) ---
+# App modules are imported on first use, so the load test can install the fake LLM first.
+
+def linkedin_post(payload):
+    import post_generator
+    return {"post": post_generator.generate_post(payload["length"], payload["tag"], payload["topic"])}
+
+
+_news = None
+_news_lock = threading.Lock()
+
+
+def get_news():
+    """(embeddings, answer_chain, collection manager) for the news RAG path, built once."""
+    global _news
+    with _news_lock:
+        if _news is None:
+            from langchain_groq import ChatGroq
+            from shared.embedding_service import get_embedding_service
+            from rag import build_answer_chain
+            from collection_manager import get_collection_manager
+
+            # Same settings as news_research_project/main.py (sampled, so no response cache)
+            llm = ChatGroq(model_name="llama-3.3-70b-versatile", temperature=0.5)
+            embeddings = get_embedding_service("sentence-transformers/all-MiniLM-L6-v2")
+            collections = get_collection_manager(embeddings)
+            collections.adopt_legacy_index(os.path.join(REPO_ROOT, "news_research_project", "vector_index"))
+            _news = (embeddings, build_answer_chain(llm), collections)
+        return _news
+
+
+def news_query(payload):
+    from shared.tracing import span, callbacks
+    from rag import stream_answer
+    from context_packing import CANDIDATES
+
+    embeddings, answer_chain, collections = get_news()
+    if not collections.exists(payload["collection"]):
+        raise ApiError(f"Collection {payload['collection']!r} has no articles yet; process some URLs first", status=404)
+    # Loaded on demand; the least recently used collections are dropped past NEWS_COLLECTIONS_RAM_MB
+    retriever = collections.get_retriever(payload["collection"], k=CANDIDATES, rerank=payload["rerank"])
+    context_stats = {}
+    with span("rag_query", name="api"):
+        docs, chunks = stream_answer(retriever, answer_chain, payload["question"], config={"callbacks": callbacks()},
+                                     embeddings=embeddings, token_budget=payload["token_budget"],
+                                     context_stats=context_stats)
+        answer = "".join(chunks)
+    sources = [{"source": doc.metadata.get("source", "Unknown Source"),
+                "score": doc.metadata.get("rerank_score", doc.metadata.get("score")),
+                "truncated": bool(doc.metadata.get("truncated"))} for doc in docs]
+    return {"answer": answer, "sources": sources, "context": context_stats}
+
+
+def tshirt_question(payload):
+    from langchain_helper import answer_question, format_response
+    return format_response(answer_question(payload["question"]))
+
+
+def warm_tshirt():
+    from langchain_helper import get_few_shot_db_chain, get_plan_cache
+    get_few_shot_db_chain()
+    get_plan_cache()
+
+
+def warm_up():
+    """Loads what the first request would otherwise pay for; anything unavailable is reported and skipped."""
+    from semantic_selector import get_example_selector
+
+    # The selector loads the corpus and its embedding matrix
+    steps = [("linkedin corpus", get_example_selector), ("news models", get_news)]
+    if os.getenv("DB_URI") or os.getenv("DB_HOST"):
+        steps.append(("tshirt chain", warm_tshirt))
+    for name, step in steps:
+        try:
+            step()
+            print(f"Warmed up {name}")
+        except Exception as e:
+            print(f"Skipped warming up {name}: {e}")
+
+
+# --- Request parsing: every field gets its default here, so equivalent requests share a key ---
+
+def text_field(body, name):
+    value = body.get(name)
+    if not isinstance(value, str) or not value.strip():
+        raise ApiError(f"'{name}' is required")
+    return value.strip()
+
+
+def parse_linkedin(body):
+    length = body.get("length", "Medium")
+    if length not in LENGTHS:
+        raise ApiError(f"'length' must be one of {LENGTHS}")
+    return {"length": length, "tag": text_field(body, "tag"), "topic": text_field(body, "topic")}
+
+
+def parse_news(body):
+    from context_packing import CONTEXT_TOKEN_BUDGET
+    from collection_manager import DEFAULT_COLLECTION, collection_name
+    try:
+        token_budget = int(body.get("token_budget", CONTEXT_TOKEN_BUDGET))
+    except (TypeError, ValueError):
+        raise ApiError("'token_budget' must be an integer")
+    try:
+        collection = collection_name(str(body.get("collection") or DEFAULT_COLLECTION))
+    except ValueError as e:
+        raise ApiError(str(e))
+    return {"question": text_field(body, "question"), "collection": collection,
+            "rerank": bool(body.get("rerank", False)), "token_budget": token_budget}
+
+
+def parse_tshirt(body):
+    return {"question": text_field(body, "question")}
+
+
+ENDPOINTS = {
+    "/v1/linkedin/post": (parse_linkedin, linkedin_post),
+    "/v1/news/query": (parse_news, news_query),
+    "/v1/tshirt/question": (parse_tshirt, tshirt_question),
+}
+
+
+def request_key(path, payload):
+    return hashlib.sha256(json.dumps([path, payload], sort_keys=True).encode("utf-8")).hexdigest()
+
+
+async def handle_endpoint(request):
+    parse, work = ENDPOINTS[request.path]
+    try:
+        body = await request.json()
+        if not isinstance(body, dict):
+            raise ApiError("Request body must be a JSON object")
+        payload = parse(body)
+    except json.JSONDecodeError:
+        return web.json_response({"error": "Request body must be JSON"}, status=400)
+    except ApiError as e:
+        return web.json_response({"error": str(e)}, status=e.status)
+
+    app = request.app
+    # Without coalescing every request gets its own key, so it still goes through the same queue
+    key = request_key(request.path, payload) if app[COALESCE] else object()
+    try:
+        result, shared = await app[SINGLE_FLIGHT].do(key, lambda: app[WORK_QUEUE].run(work, payload))
+    except QueueFull as e:
+        return web.json_response({"error": f"Server busy: {e}"}, status=503, headers={"Retry-After": "1"})
+    except ApiError as e:
+        return web.json_response({"error": str(e)}, status=e.status)
+    except Exception as e:
+        print(f"{request.path} failed: {e!r}")
+        return web.json_response({"error": str(e)}, status=500)
+    return web.json_response(result, headers={"X-Coalesced": "1" if shared else "0"})
+
+
+async def handle_health(request):
+    return web.json_response({"status": "ok"})
+
+
+async def handle_stats(request):
+    single_flight = request.app[SINGLE_FLIGHT]
+    return web.json_response({
+        "coalesce": request.app[COALESCE],
+        "started": single_flight.started,
+        "coalesced": single_flight.coalesced,
+        "in_flight": len(single_flight.in_flight),
+        "queue": request.app[WORK_QUEUE].stats(),
+        "news_collections": _news[2].stats() if _news is not None else None,
+    })
+
+
+def create_app(coalesce=True, concurrency=MAX_CONCURRENCY, max_queue=MAX_QUEUE, warm=True):
+    app = web.Application()
+    app[COALESCE] = coalesce
+
+    async def on_startup(app):
+        # Created here so they belong to the server's event loop
+        app[SINGLE_FLIGHT] = SingleFlight()
+        app[WORK_QUEUE] = WorkQueue(concurrency, max_queue)
+        if warm:
+            await app[WORK_QUEUE].run(warm_up)
+
+    async def on_cleanup(app):
+        app[WORK_QUEUE].shutdown()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    for path in ENDPOINTS:
+        app.router.add_post(path, handle_endpoint)
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/stats", handle_stats)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY, help="LLM-bound requests at once")
+    parser.add_argument("--max-queue", type=int, default=MAX_QUEUE, help="requests allowed to wait for a slot")
+    parser.add_argument("--no-coalesce", action="store_true", help="run identical in-flight requests separately")
+    parser.add_argument("--fake-llm", action="store_true", help="serve from the offline fake LLM (no API keys)")
+    args = parser.parse_args()
+
+    if args.fake_llm:
+        from shared import fake_llm
+        fake_llm.install()
+
+    web.run_app(create_app(coalesce=not args.no_coalesce, concurrency=args.concurrency, max_queue=args.max_queue),
+                host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
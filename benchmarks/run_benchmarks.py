@@ -0,0 +1,393 @@
+"""
+Offline benchmark suite for every app in the repo.
+
+ChatGroq is swapped for a deterministic fake chat model (configurable latency and
+token rate), HuggingFace embeddings for hashed bag-of-words vectors and TiDB for a
+SQLite file, so this runs without API keys or network access. Results are written
+as JSON so two runs can be compared:
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --mode full --compare results.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+import statistics
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIRS = ["Linkedin-Post-Generation", "news_research_project", "tshirt_sales"]
+
+# Every cache and trace goes to a scratch folder, so runs never see each other's (or the apps') state.
+# These have to be set before anything from shared/ is imported.
+WORK_DIR = tempfile.mkdtemp(prefix="genai-bench-")
+os.environ["LLM_CACHE_PATH"] = os.path.join(WORK_DIR, "llm_cache.sqlite")
+os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(WORK_DIR, "embeddings.sqlite")
+os.environ["TRACE_PATH"] = os.path.join(WORK_DIR, "traces.jsonl")
+os.environ["TSHIRT_SUMMARY_PATH"] = os.path.join(WORK_DIR, "tshirt_summary.sqlite")
+
+sys.path.append(REPO_ROOT)
+for app_dir in APP_DIRS:
+    sys.path.append(os.path.join(REPO_ROOT, app_dir))
+
+from shared import fake_llm
+
+# Data sizes per benchmark; "full" takes several minutes
+SIZES = {
+    "quick": {"preprocess": [20], "generate_post": [1_000], "few_shot": [1_000, 10_000],
+              "news": [10], "tshirt": [1_000]},
+    "full": {"preprocess": [20, 200], "generate_post": [1_000, 20_000], "few_shot": [1_000, 100_000, 1_000_000],
+             "news": [10, 100, 500], "tshirt": [1_000, 100_000]},
+}
+QUERIES = 20
+# A metric counts as a regression when it gets this much worse than the baseline...
+REGRESSION_THRESHOLD = 1.2
+# ...and both values are above the timer noise floor (sub-millisecond numbers jitter a lot)
+NOISE_FLOOR = {"_ms": 1.0, "_seconds": 0.01}
+
+PILLARS = ["Data", "Supply Chain", "ML Systems", "Cloud"]
+RAW_TAGS = ["RAG", "LLMs", "Kubernetes", "Docker", "AWS", "Logistics", "Warehousing", "Snowflake", "SQL",
+            "Forecasting", "MLOps", "Airflow", "Spark", "Inventory", "Agents"]
+TOPICS = ["Why Agentic RAG is the future", "Forecasting demand with small data", "Cutting cloud costs",
+          "Lessons from a failed data migration", "Kubernetes for ML teams", "Building trust in dashboards"]
+
+
+# --- helpers ---
+
+def percentiles_ms(latencies):
+    latencies = sorted(latencies)
+    p95_index = max(0, int(round(0.95 * len(latencies))) - 1)
+    return {"p50_ms": statistics.median(latencies) * 1000, "p95_ms": latencies[p95_index] * 1000}
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def size_dir(name, n):
+    """A fresh working folder per benchmark/size (the apps use relative data paths)."""
+    path = os.path.join(WORK_DIR, f"{name}-{n}")
+    os.makedirs(os.path.join(path, "data"), exist_ok=True)
+    return path
+
+
+def last_section(prompt, label):
+    """Text after the last "<label>:" in a prompt, up to the end of that line."""
+    matches = re.findall(rf"{label}:[ \t]*(.*)", prompt)
+    return matches[-1].strip() if matches else ""
+
+
+def responder(prompt):
+    """Deterministic answers shaped like what each app expects back from the LLM."""
+    rng = fake_llm.seeded_random(prompt)
+
+    # preprocess.extract_metadata
+    if "extract metadata" in prompt:
+        return json.dumps({"line_count": rng.randint(1, 15), "tags": rng.sample(RAW_TAGS, 2),
+                           "primary_pillar": rng.choice(PILLARS)})
+
+    # tag_unifier: every batch maps into a handful of categories
+    if "Unify and map" in prompt:
+        tags = json.loads(prompt.rsplit("List of tags to process:", 1)[-1].strip())
+        return json.dumps({tag: rng.choice(["Machine Learning", "Cloud Infrastructure", "Supply Chain",
+                                            "Data Engineering"]) for tag in tags})
+
+    # tshirt SQLDatabaseChain: first call writes the SQL, second call phrases the answer
+    if prompt.rstrip().endswith("SQLQuery:"):
+        from few_shots import few_shots
+        question = last_section(prompt, "Question")
+        for example in few_shots:
+            if example["Question"].lower().rstrip("?") in question.lower():
+                return example["SQLQuery"]
+        return "SELECT SUM(stock_quantity) FROM t_shirts"
+    if prompt.rstrip().endswith("Answer:"):
+        return f"The result is {last_section(prompt, 'SQLResult')}."
+
+    return fake_llm.default_response(prompt, fake_llm.SETTINGS["response_tokens"])
+
+
+# --- Linkedin-Post-Generation ---
+
+def make_raw_posts(n):
+    rng = random.Random(n)
+    return [{"text": f"Post {i} of {n}: " + " ".join(rng.choice(fake_llm.WORDS) for _ in range(40)),
+             "engagement": rng.randint(0, 500)} for i in range(n)]
+
+
+def bench_preprocess(n):
+    import preprocess
+
+    folder = size_dir("preprocess", n)
+    raw_path = os.path.join(folder, "data", "raw_posts.json")
+    processed_path = os.path.join(folder, "data", "processed_posts.jsonl")
+    with open(raw_path, "w", encoding="utf-8") as f:
+        json.dump(make_raw_posts(n), f)
+
+    _, cold_seconds = timed(preprocess.process_posts, raw_path, processed_path)
+    # Second run: every post comes back from the checkpoint
+    _, resume_seconds = timed(preprocess.process_posts, raw_path, processed_path)
+    return {"seconds": cold_seconds, "posts_per_sec": n / cold_seconds, "resume_seconds": resume_seconds}
+
+
+def bench_generate_post(n):
+    from benchmark_few_shot import make_corpus
+    from jsonl_store import write_records
+    import post_generator
+
+    folder = size_dir("generate_post", n)
+    write_records(os.path.join(folder, "data", "processed_posts.jsonl"), make_corpus(n))
+
+    cwd = os.getcwd()
+    os.chdir(folder)
+    try:
+        # The first call also loads the corpus and builds the example embeddings
+        _, first_seconds = timed(post_generator.generate_post, "Medium", "Machine Learning", TOPICS[0])
+
+        rng = random.Random(0)
+        calls = [(rng.choice(["Short", "Medium", "Long"]), rng.choice(["Machine Learning", "Supply Chain"]),
+                  f"{rng.choice(TOPICS)} #{i}") for i in range(QUERIES)]
+        cold = [timed(post_generator.generate_post, *call)[1] for call in calls]
+        # Same requests again: prompts repeat, so the response cache answers them
+        warm = [timed(post_generator.generate_post, *call)[1] for call in calls]
+    finally:
+        os.chdir(cwd)
+
+    result = {"first_call_seconds": first_seconds}
+    result.update({f"cold_{key}": value for key, value in percentiles_ms(cold).items()})
+    result.update({f"warm_{key}": value for key, value in percentiles_ms(warm).items()})
+    return result
+
+
+def bench_few_shot(n):
+    from benchmark_few_shot import make_corpus, time_queries
+    from few_shot import FewShotPosts
+    from jsonl_store import write_records
+
+    path = os.path.join(size_dir("few_shot", n), "data", "processed_posts.jsonl")
+    write_records(path, make_corpus(n))
+
+    _, load_seconds = timed(FewShotPosts, path)
+    # Warm starts are short enough to be noisy, so keep the best of a few
+    snapshot_seconds = min(timed(FewShotPosts, path)[1] for _ in range(3))
+    fs = FewShotPosts(path)
+    p50, p95 = time_queries(fs, random.Random(0))
+    return {"load_seconds": load_seconds, "snapshot_load_seconds": snapshot_seconds,
+            "query_p50_ms": p50, "query_p95_ms": p95}
+
+
+# --- news_research_project ---
+
+def make_articles(n):
+    from langchain_core.documents import Document
+
+    rng = random.Random(n)
+    articles = []
+    for i in range(n):
+        paragraphs = ["Article %d. " % i + " ".join(rng.choice(fake_llm.WORDS) for _ in range(150))
+                      for _ in range(4)]
+        articles.append(Document(page_content="\n\n".join(paragraphs),
+                                 metadata={"source": f"https://news.example.com/{n}/{i}"}))
+    return articles
+
+
+def bench_news(n):
+    from langchain_groq import ChatGroq
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from shared.embedding_service import get_embedding_service
+    from shared.streaming import stream_with_metrics
+    from collection_manager import DEFAULT_COLLECTION, CollectionManager
+    from rag import build_answer_chain, stream_answer
+    from context_packing import CANDIDATES
+
+    embeddings = get_embedding_service("sentence-transformers/all-MiniLM-L6-v2")
+    collections = CollectionManager(embeddings, os.path.join(size_dir("news", n), "collections"))
+    # Same splitter settings as main.py
+    text_splitter = RecursiveCharacterTextSplitter(separators=['\n\n', '\n', '.', ','], chunk_size=1000)
+    articles = make_articles(n)
+
+    stats, ingest_seconds = timed(collections.ingest, DEFAULT_COLLECTION, articles, text_splitter)
+    _, reingest_seconds = timed(collections.ingest, DEFAULT_COLLECTION, articles, text_splitter)
+
+    llm = ChatGroq(model_name="llama-3.3-70b-versatile", temperature=0.5)
+    # Same retrieve-once path as main.py (the first call opens the collection and builds the BM25 index)
+    retriever, retriever_seconds = timed(collections.get_retriever, DEFAULT_COLLECTION, k=CANDIDATES)
+    answer_chain = build_answer_chain(llm)
+    latencies, ttfts, prompt_tokens, saved_tokens = [], [], [], []
+    for i in range(QUERIES):
+        metrics, context_stats = {}, {}
+        start = time.perf_counter()
+        _, chunks = stream_answer(retriever, answer_chain, f"what did article {i} say about {TOPICS[i % len(TOPICS)]}?",
+                                  embeddings=embeddings, context_stats=context_stats)
+        prompt_tokens.append(context_stats["prompt_tokens"])
+        saved_tokens.append(context_stats["tokens_saved"])
+        for _ in stream_with_metrics(chunks, metrics):
+            pass
+        latencies.append(time.perf_counter() - start)
+        ttfts.append(metrics["ttft_seconds"] or 0.0)
+
+    result = {"chunks": stats["chunks_added"], "ingest_seconds": ingest_seconds,
+              "chunks_per_sec": stats["chunks_added"] / ingest_seconds, "reingest_unchanged_seconds": reingest_seconds,
+              "retriever_open_seconds": retriever_seconds,
+              "ttft_p50_ms": statistics.median(ttfts) * 1000,
+              "prompt_tokens_mean": statistics.mean(prompt_tokens), "tokens_saved_mean": statistics.mean(saved_tokens)}
+    result.update({f"query_{key}": value for key, value in percentiles_ms(latencies).items()})
+    return result
+
+
+# --- tshirt_sales ---
+
+def make_tshirt_db(path, rows):
+    import sqlite3
+
+    rng = random.Random(rows)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t_shirts (t_shirt_id INTEGER PRIMARY KEY, brand TEXT, color TEXT, size TEXT, "
+                 "price INTEGER, stock_quantity INTEGER)")
+    conn.execute("CREATE TABLE discounts (discount_id INTEGER PRIMARY KEY, t_shirt_id INTEGER, pct_discount REAL)")
+    conn.executemany("INSERT INTO t_shirts VALUES (?, ?, ?, ?, ?, ?)", [
+        (i, rng.choice(["Van Huesen", "Levi", "Nike", "Adidas"]), rng.choice(["Red", "Blue", "Black", "White"]),
+         rng.choice(["XS", "S", "M", "L", "XL"]), rng.randint(10, 50), rng.randint(10, 100))
+        for i in range(1, rows + 1)
+    ])
+    conn.executemany("INSERT INTO discounts VALUES (?, ?, ?)",
+                     [(i, rng.randint(1, rows), rng.choice([5.0, 10.0, 15.0, 20.0])) for i in range(1, rows // 10 + 1)])
+    conn.commit()
+    conn.close()
+
+
+def bench_tshirt(rows):
+    from few_shots import few_shots
+
+    db_path = os.path.join(size_dir("tshirt", rows), "tshirts.db")
+    make_tshirt_db(db_path, rows)
+    os.environ["DB_URI"] = f"sqlite:///{db_path}"
+
+    import langchain_helper
+    # Start every size from a cold chain (new engine, empty result cache and plan cache)
+    langchain_helper._chain = None
+    langchain_helper._plan_cache = None
+
+    questions = [example["Question"] for example in few_shots]
+    _, setup_seconds = timed(langchain_helper.get_few_shot_db_chain)
+    cold = [timed(langchain_helper.answer_question, question)[1] for question in questions]
+    # Same questions again: saved SQL (no LLM call) and cached results
+    warm = [timed(langchain_helper.answer_question, question)[1] for question in questions]
+
+    result = {"chain_setup_seconds": setup_seconds}
+    result.update({f"cold_{key}": value for key, value in percentiles_ms(cold).items()})
+    result.update({f"warm_{key}": value for key, value in percentiles_ms(warm).items()})
+    return result
+
+
+BENCHMARKS = {
+    "preprocess": bench_preprocess,
+    "generate_post": bench_generate_post,
+    "few_shot": bench_few_shot,
+    "news": bench_news,
+    "tshirt": bench_tshirt,
+}
+
+
+# --- reporting ---
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def lower_is_better(metric):
+    return not metric.endswith("_per_sec") and metric != "chunks" and not metric.startswith("tokens_saved")
+
+
+def below_noise_floor(metric, *values):
+    for suffix, floor in NOISE_FLOOR.items():
+        if metric.endswith(suffix):
+            return all(value < floor for value in values)
+    return False
+
+
+def compare(results, baseline_path, threshold=REGRESSION_THRESHOLD):
+    """Prints current/baseline ratios and returns the metrics that regressed."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(row["benchmark"], row["size"]): row["metrics"] for row in json.load(f)["results"]}
+
+    regressions = []
+    print(f"\nCompared with {baseline_path}:")
+    for row in results:
+        previous = baseline.get((row["benchmark"], row["size"]))
+        if previous is None:
+            continue
+        for metric, value in row["metrics"].items():
+            old = previous.get(metric)
+            if not old or not value or below_noise_floor(metric, old, value):
+                continue
+            # Ratio > 1 always means "worse", whichever direction the metric goes
+            ratio = value / old if lower_is_better(metric) else old / value
+            flag = "  REGRESSION" if ratio > threshold else ""
+            print(f"  {row['benchmark']:<14}{row['size']:>9}  {metric:<28}{old:>12.3f} -> {value:>12.3f}"
+                  f"  ({ratio:.2f}x){flag}")
+            if flag:
+                regressions.append((row["benchmark"], row["size"], metric, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=sorted(SIZES), default="quick")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="run just these benchmarks")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake LLM seconds before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=300.0, help="fake LLM generation speed")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    args = parser.parse_args()
+
+    fake_llm.install(latency_seconds=args.latency, tokens_per_sec=args.tokens_per_sec, responder=responder)
+
+    results = []
+    for name in args.only or list(BENCHMARKS):
+        for size in SIZES[args.mode][name]:
+            print(f"Running {name} (size {size})...")
+            metrics = BENCHMARKS[name](size)
+            results.append({"benchmark": name, "size": size, "metrics": metrics})
+            print("  " + ", ".join(f"{key}={value:.3f}" for key, value in metrics.items()))
+
+    from shared.tracing import load_spans, summarize, format_summary
+    stages = summarize(load_spans(os.environ["TRACE_PATH"]))
+    print("\nPer-stage spans:\n" + format_summary(stages))
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "mode": args.mode,
+            "fake_llm": {"latency_seconds": args.latency, "tokens_per_sec": args.tokens_per_sec,
+                         "response_tokens": fake_llm.SETTINGS["response_tokens"],
+                         "embedding_seconds_per_text": fake_llm.SETTINGS["embedding_seconds_per_text"]},
+        },
+        "results": results,
+        "stages": stages,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare and compare(results, args.compare):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+# Point the server at a throwaway database before importing it
+_tmp_dir = tempfile.mkdtemp()
+os.environ.setdefault("LEAVE_DB_PATH", os.path.join(_tmp_dir, "load_test.db"))
+
+import main  # noqa: E402
+from store import SEED_EMPLOYEES, MemoryLeaveStore, SQLiteLeaveStore  # noqa: E402
+
+
+def make_store(employee_count):
+    """The default 10 employees, or a synthetic company of employee_count people."""
+    if employee_count <= len(SEED_EMPLOYEES):
+        return main.store, list(SEED_EMPLOYEES)
+    seed = {f"E{i:06d}": {"balance": 20, "history": [f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}"]}
+            for i in range(employee_count)}
+    if os.getenv("LEAVE_STORE") == "memory":
+        return MemoryLeaveStore(seed), list(seed)
+    return SQLiteLeaveStore(os.path.join(_tmp_dir, f"load_test_{employee_count}.db"), seed=seed), list(seed)
+
+
+async def timed(latencies, coro):
+    start = time.perf_counter()
+    result = await coro
+    latencies.append((time.perf_counter() - start) * 1000)
+    return result
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def run(calls, concurrency, seed, employee_count):
+    rng = random.Random(seed)
+    # The tools look up main.store on every call, so swapping it here is enough
+    main.store, employees = make_store(employee_count)
+    start_balances = await main.store.get_balances(employees)
+
+    limit = asyncio.Semaphore(concurrency)
+    latencies = {"get_leave_balance": [], "apply_leave": [], "get_leave_balances": [], "who_is_on_leave": []}
+    applied = {"ok": 0, "rejected": 0}
+
+    async def one_call(i):
+        emp = rng.choice(employees)
+        roll = rng.random()
+        async with limit:
+            if roll < 0.45:
+                await timed(latencies["get_leave_balance"], main.get_leave_balance(emp))
+            elif roll < 0.9:
+                days = [f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"]
+                message = await timed(latencies["apply_leave"], main.apply_leave(emp, days))
+                applied["ok" if message.startswith("Leave applied") else "rejected"] += 1
+            elif roll < 0.95:
+                team = rng.sample(employees, min(200, len(employees)))
+                await timed(latencies["get_leave_balances"], main.get_leave_balances(team))
+            else:
+                day = rng.randint(1, 21)
+                await timed(latencies["who_is_on_leave"],
+                            main.who_is_on_leave(f"2025-06-{day:02d}", f"2025-06-{day + 7:02d}"))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_call(i) for i in range(calls)))
+    elapsed = time.perf_counter() - start
+
+    print(f"{calls} calls, {len(employees)} employees, concurrency {concurrency}, "
+          f"{elapsed:.2f}s ({calls / elapsed:.0f} calls/sec)")
+    for tool, values in latencies.items():
+        if values:
+            print(f"  {tool:<18} n={len(values):<6} p50={statistics.median(values):.2f}ms "
+                  f"p99={percentile(values, 99):.2f}ms")
+
+    # Every successful apply_leave took exactly one day, and no balance may go negative
+    end_balances = await main.store.get_balances(employees)
+    spent = sum(start_balances[emp] - end_balances[emp] for emp in employees)
+    assert all(balance >= 0 for balance in end_balances.values()), "a balance was overdrawn"
+    assert spent == applied["ok"], f"balance mismatch: spent {spent}, applied {applied['ok']}"
+    print(f"  applied {applied['ok']}, rejected {applied['rejected']} (insufficient balance), balances consistent")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent load test for the LeaveManager tools")
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--employees", type=int, default=10,
+                        help="synthetic employee count (e.g. 100000) to check per-call cost stays flat")
+    args = parser.parse_args()
+    asyncio.run(run(args.calls, args.concurrency, args.seed, args.employees))
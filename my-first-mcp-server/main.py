@@ -1,59 +1,87 @@
 from mcp.server.fastmcp import FastMCP
-from typing import List
+from typing import Dict, List, Optional
+from store import create_store, InsufficientBalance, MAX_PAGE_SIZE
 
-# In-memory mock database with 10 rows
-employee_leaves = {
-    "E001": {"balance": 18, "history": ["2024-12-25", "2025-01-01"]},
-    "E002": {"balance": 20, "history": []},
-    "E003": {"balance": 5, "history": ["2025-02-10", "2025-02-11", "2025-02-12"]},
-    "E004": {"balance": 12, "history": ["2024-11-20"]},
-    "E005": {"balance": 25, "history": []},
-    "E006": {"balance": 15, "history": ["2025-03-01", "2025-03-02"]},
-    "E007": {"balance": 8, "history": ["2025-01-15"]},
-    "E008": {"balance": 22, "history": []},
-    "E009": {"balance": 10, "history": ["2024-12-30"]},
-    "E010": {"balance": 30, "history": []}
-}
+# Storage backend (SQLite by default; set LEAVE_STORE=memory for the old in-memory mock)
+store = create_store()
 
 # Create MCP server
 mcp = FastMCP("LeaveManager")
 
 # Tool: Check Leave Balance
 @mcp.tool()
-def get_leave_balance(employee_id: str) -> str:
+async def get_leave_balance(employee_id: str) -> str:
     """Check how many leave days are left for the employee"""
-    data = employee_leaves.get(employee_id)
-    if data:
-        return f"{employee_id} has {data['balance']} leave days remaining."
+    balance = await store.get_balance(employee_id)
+    if balance is not None:
+        return f"{employee_id} has {balance} leave days remaining."
     return f"Employee ID {employee_id} not found."
 
 # Tool: Apply for Leave
 @mcp.tool()
-def apply_leave(employee_id: str, leave_dates: List[str]) -> str:
+async def apply_leave(employee_id: str, leave_dates: List[str]) -> str:
     """Apply leave for specific dates (e.g., ["2025-04-17", "2025-05-01"])"""
-    if employee_id not in employee_leaves:
-        return f"Employee ID {employee_id} not found."
-
     requested_days = len(leave_dates)
-    available_balance = employee_leaves[employee_id]["balance"]
 
-    if available_balance < requested_days:
-        return f"Insufficient balance. Requested {requested_days}, available {available_balance}."
+    # The store checks and deducts the balance in one atomic step
+    try:
+        new_balance = await store.apply_leave(employee_id, leave_dates)
+    except InsufficientBalance as e:
+        return f"Insufficient balance. Requested {e.requested}, available {e.available}."
 
-    # Deduct balance and add to history
-    employee_leaves[employee_id]["balance"] -= requested_days
-    employee_leaves[employee_id]["history"].extend(leave_dates)
-    return f"Leave applied successfully for {requested_days} day(s). New balance for {employee_id}: {employee_leaves[employee_id]['balance']}."
+    if new_balance is None:
+        return f"Employee ID {employee_id} not found."
+    return f"Leave applied successfully for {requested_days} day(s). New balance for {employee_id}: {new_balance}."
 
 # Tool: Get Leave History
 @mcp.tool()
-def get_leave_history(employee_id: str) -> str:
-    """Get the list of dates the employee was previously on leave"""
-    data = employee_leaves.get(employee_id)
-    if data:
-        history = ", ".join(data['history']) if data['history'] else "No previous leaves recorded."
-        return f"Leave history for {employee_id}: {history}"
-    return f"Employee ID {employee_id} not found."
+async def get_leave_history(employee_id: str, cursor: int = 0, limit: int = 100) -> Dict:
+    """
+    Get the dates the employee was previously on leave, one page at a time.
+    Pass the returned next_cursor back in to get the following page (it is null on the last page).
+    """
+    page = await store.get_history_page(employee_id, cursor, max(1, min(limit, MAX_PAGE_SIZE)))
+    if page is None:
+        return {"employee_id": employee_id, "error": f"Employee ID {employee_id} not found."}
+    dates, next_cursor = page
+    return {"employee_id": employee_id, "dates": dates, "next_cursor": next_cursor}
+
+# Tool: Check many balances at once
+@mcp.tool()
+async def get_leave_balances(employee_ids: List[str]) -> Dict[str, Optional[int]]:
+    """Check leave balances for many employees in one call (e.g. a whole team). Unknown IDs map to null."""
+    return await store.get_balances(employee_ids)
+
+# Tool: Apply leave for many employees at once
+@mcp.tool()
+async def apply_leave_bulk(requests: Dict[str, List[str]]) -> Dict[str, Dict]:
+    """
+    Apply leave for several employees in one call, e.g. {"E001": ["2025-04-17"], "E002": ["2025-04-18"]}.
+    Each employee's request succeeds or fails on its own.
+    """
+    results = await store.apply_leave_bulk(list(requests.items()))
+    response = {}
+    for (employee_id, dates), (status, new_balance, available) in zip(requests.items(), results):
+        if status == "ok":
+            response[employee_id] = {"status": "ok", "days": len(dates), "new_balance": new_balance}
+        elif status == "insufficient":
+            response[employee_id] = {"status": "insufficient_balance", "requested": len(dates), "available": available}
+        else:
+            response[employee_id] = {"status": "not_found"}
+    return response
+
+# Tool: Who is off in a date range
+@mcp.tool()
+async def who_is_on_leave(start_date: str, end_date: str, cursor: Optional[str] = None, limit: int = 500) -> Dict:
+    """
+    List who is on leave between two dates, inclusive (YYYY-MM-DD), grouped by date.
+    Large ranges are paged: pass the returned next_cursor back in to continue.
+    """
+    rows, next_cursor = await store.who_is_on_leave(start_date, end_date, cursor, max(1, min(limit, MAX_PAGE_SIZE)))
+    on_leave = {}
+    for day, employee_id in rows:
+        on_leave.setdefault(day, []).append(employee_id)
+    return {"start_date": start_date, "end_date": end_date, "on_leave": on_leave, "next_cursor": next_cursor}
 
 # Resource: Greeting
 @mcp.resource("greeting://{name}")
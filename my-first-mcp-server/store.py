@@ -0,0 +1,342 @@
+import asyncio
+import bisect
+import os
+import queue
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+# Starting data, loaded into an empty store (same 10 mock employees as before)
+SEED_EMPLOYEES = {
+    "E001": {"balance": 18, "history": ["2024-12-25", "2025-01-01"]},
+    "E002": {"balance": 20, "history": []},
+    "E003": {"balance": 5, "history": ["2025-02-10", "2025-02-11", "2025-02-12"]},
+    "E004": {"balance": 12, "history": ["2024-11-20"]},
+    "E005": {"balance": 25, "history": []},
+    "E006": {"balance": 15, "history": ["2025-03-01", "2025-03-02"]},
+    "E007": {"balance": 8, "history": ["2025-01-15"]},
+    "E008": {"balance": 22, "history": []},
+    "E009": {"balance": 10, "history": ["2024-12-30"]},
+    "E010": {"balance": 30, "history": []}
+}
+
+
+# Upper bounds for one page of results, so a single call never builds a huge response
+MAX_PAGE_SIZE = 1000
+
+
+class InsufficientBalance(Exception):
+    def __init__(self, requested: int, available: int):
+        super().__init__(f"Requested {requested}, available {available}.")
+        self.requested = requested
+        self.available = available
+
+
+class LeaveStore:
+    """Interface every storage backend implements. All methods are async."""
+
+    async def get_balance(self, employee_id: str) -> Optional[int]:
+        """Remaining days, or None if the employee doesn't exist."""
+        raise NotImplementedError
+
+    async def apply_leave(self, employee_id: str, leave_dates: List[str]) -> Optional[int]:
+        """
+        Atomically checks the balance and books the dates.
+        Returns the new balance, None for an unknown employee, or raises InsufficientBalance.
+        """
+        raise NotImplementedError
+
+    async def get_history(self, employee_id: str) -> Optional[List[str]]:
+        """Booked dates in the order they were added, or None if the employee doesn't exist."""
+        raise NotImplementedError
+
+    async def get_history_page(self, employee_id: str, cursor: int, limit: int) -> Optional[Tuple[List[str], Optional[int]]]:
+        """One page of history: (dates, next_cursor). next_cursor is None on the last page."""
+        raise NotImplementedError
+
+    async def get_balances(self, employee_ids: List[str]) -> Dict[str, Optional[int]]:
+        """Balances for many employees in one call (None for unknown ids)."""
+        raise NotImplementedError
+
+    async def apply_leave_bulk(self, requests: List[Tuple[str, List[str]]]) -> List[Tuple[str, Optional[int], Optional[int]]]:
+        """
+        Applies many (employee_id, dates) requests; each one is atomic on its own.
+        Returns (status, new_balance, available) per request, status being "ok", "not_found" or "insufficient".
+        """
+        raise NotImplementedError
+
+    async def who_is_on_leave(self, start: str, end: str, cursor: Optional[str], limit: int) -> Tuple[List[Tuple[str, str]], Optional[str]]:
+        """(date, employee_id) pairs with start <= date <= end, ordered by date, plus the next page cursor."""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class MemoryLeaveStore(LeaveStore):
+    """In-process dict, like the original mock. A lock makes check-then-decrement atomic."""
+
+    def __init__(self, seed=SEED_EMPLOYEES):
+        self.employees = {emp: {"balance": data["balance"], "history": list(data["history"])}
+                          for emp, data in seed.items()}
+        self.lock = asyncio.Lock()
+
+        # Per-date index: sorted list of (date, seq, employee_id); seq keeps booking order within a day
+        self.by_date = []
+        self.seq = 0
+        for emp, data in self.employees.items():
+            for day in data["history"]:
+                self._index_date(emp, day)
+
+    def _index_date(self, employee_id, day):
+        self.seq += 1
+        bisect.insort(self.by_date, (day, self.seq, employee_id))
+
+    def _book(self, employee_id, leave_dates):
+        data = self.employees.get(employee_id)
+        if data is None:
+            return "not_found", None, None
+        if data["balance"] < len(leave_dates):
+            return "insufficient", None, data["balance"]
+        data["balance"] -= len(leave_dates)
+        data["history"].extend(leave_dates)
+        for day in leave_dates:
+            self._index_date(employee_id, day)
+        return "ok", data["balance"], None
+
+    async def get_balance(self, employee_id):
+        data = self.employees.get(employee_id)
+        return data["balance"] if data else None
+
+    async def apply_leave(self, employee_id, leave_dates):
+        async with self.lock:
+            status, balance, available = self._book(employee_id, leave_dates)
+        if status == "insufficient":
+            raise InsufficientBalance(len(leave_dates), available)
+        return balance
+
+    async def get_history(self, employee_id):
+        data = self.employees.get(employee_id)
+        return list(data["history"]) if data else None
+
+    async def get_history_page(self, employee_id, cursor, limit):
+        data = self.employees.get(employee_id)
+        if data is None:
+            return None
+        page = data["history"][cursor:cursor + limit]
+        next_cursor = cursor + limit if cursor + limit < len(data["history"]) else None
+        return page, next_cursor
+
+    async def get_balances(self, employee_ids):
+        return {emp: (self.employees[emp]["balance"] if emp in self.employees else None) for emp in employee_ids}
+
+    async def apply_leave_bulk(self, requests):
+        async with self.lock:
+            return [self._book(emp, dates) for emp, dates in requests]
+
+    async def who_is_on_leave(self, start, end, cursor, limit):
+        if cursor:
+            day, seq = cursor.rsplit("|", 1)
+            position = bisect.bisect_right(self.by_date, (day, int(seq), "\uffff"))
+        else:
+            position = bisect.bisect_left(self.by_date, (start,))
+        rows = []
+        while position < len(self.by_date) and len(rows) < limit:
+            day, seq, emp = self.by_date[position]
+            if day > end:
+                break
+            rows.append((day, emp, seq))
+            position += 1
+
+        more = position < len(self.by_date) and self.by_date[position][0] <= end
+        next_cursor = f"{rows[-1][0]}|{rows[-1][2]}" if rows and more else None
+        return [(day, emp) for day, emp, _ in rows], next_cursor
+
+
+class SQLiteLeaveStore(LeaveStore):
+    """
+    Persistent store on SQLite in WAL mode (readers don't block the writer).
+    A small pool of connections is used from worker threads so the event loop never blocks.
+    apply_leave is a single conditional UPDATE inside BEGIN IMMEDIATE, so two
+    concurrent requests can never both spend the same days.
+    """
+
+    def __init__(self, db_path="leaves.db", pool_size=8, seed=SEED_EMPLOYEES):
+        self.db_path = db_path
+        self.pool = queue.Queue()
+        for _ in range(pool_size):
+            conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self.pool.put(conn)
+        self._run_sync(self._create_schema, seed)
+
+    def _run_sync(self, fn, *args):
+        conn = self.pool.get()
+        try:
+            return fn(conn, *args)
+        finally:
+            self.pool.put(conn)
+
+    async def _run(self, fn, *args):
+        return await asyncio.to_thread(self._run_sync, fn, *args)
+
+    @staticmethod
+    def _create_schema(conn, seed):
+        conn.execute("CREATE TABLE IF NOT EXISTS employees (employee_id TEXT PRIMARY KEY, balance INTEGER NOT NULL)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS leaves ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, employee_id TEXT NOT NULL, leave_date TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_leaves_employee ON leaves(employee_id, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_leaves_date ON leaves(leave_date)")
+
+        if conn.execute("SELECT COUNT(*) FROM employees").fetchone()[0] == 0:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("INSERT INTO employees VALUES (?, ?)",
+                                 [(emp, data["balance"]) for emp, data in seed.items()])
+                conn.executemany("INSERT INTO leaves (employee_id, leave_date) VALUES (?, ?)",
+                                 [(emp, day) for emp, data in seed.items() for day in data["history"]])
+                conn.execute("COMMIT")
+            except BaseException:
+                SQLiteLeaveStore._rollback(conn)
+                raise
+
+    @staticmethod
+    def _rollback(conn):
+        # A failed COMMIT may already have ended the transaction
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+
+    @staticmethod
+    def _get_balance(conn, employee_id):
+        row = conn.execute("SELECT balance FROM employees WHERE employee_id = ?", (employee_id,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _apply_leave(conn, employee_id, leave_dates):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            status, balance, available = SQLiteLeaveStore._book(conn, employee_id, leave_dates)
+            conn.execute("COMMIT")
+        except BaseException:
+            # Anything (not just sqlite3.Error) must roll back, or the pooled connection goes back mid-transaction
+            SQLiteLeaveStore._rollback(conn)
+            raise
+        if status == "insufficient":
+            raise InsufficientBalance(len(leave_dates), available)
+        return balance
+
+    @staticmethod
+    def _book(conn, employee_id, leave_dates):
+        # Conditional UPDATE: the balance check and the deduction are one statement
+        requested = len(leave_dates)
+        updated = conn.execute(
+            "UPDATE employees SET balance = balance - ? WHERE employee_id = ? AND balance >= ?",
+            (requested, employee_id, requested)
+        ).rowcount
+        if updated == 0:
+            balance = SQLiteLeaveStore._get_balance(conn, employee_id)
+            return ("not_found", None, None) if balance is None else ("insufficient", None, balance)
+        conn.executemany("INSERT INTO leaves (employee_id, leave_date) VALUES (?, ?)",
+                         [(employee_id, day) for day in leave_dates])
+        return "ok", SQLiteLeaveStore._get_balance(conn, employee_id), None
+
+    @staticmethod
+    def _apply_leave_bulk(conn, requests):
+        # One transaction for the whole batch instead of one per employee
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            results = [SQLiteLeaveStore._book(conn, emp, dates) for emp, dates in requests]
+            conn.execute("COMMIT")
+            return results
+        except BaseException:
+            # Anything (not just sqlite3.Error) must roll back, or the pooled connection goes back mid-transaction
+            SQLiteLeaveStore._rollback(conn)
+            raise
+
+    @staticmethod
+    def _get_balances(conn, employee_ids):
+        balances = dict.fromkeys(employee_ids)
+        unique_ids = list(balances)
+        # SQLite limits bound parameters per statement, so query in slices
+        for start in range(0, len(unique_ids), 500):
+            batch = unique_ids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            for emp, balance in conn.execute(
+                    f"SELECT employee_id, balance FROM employees WHERE employee_id IN ({placeholders})", batch):
+                balances[emp] = balance
+        return balances
+
+    @staticmethod
+    def _get_history_page(conn, employee_id, cursor, limit):
+        if SQLiteLeaveStore._get_balance(conn, employee_id) is None:
+            return None
+        # cursor is the last leaves.id returned; the (employee_id, id) index makes this a range scan
+        rows = conn.execute(
+            "SELECT id, leave_date FROM leaves WHERE employee_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (employee_id, cursor, limit + 1)
+        ).fetchall()
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return [day for _, day in rows[:limit]], next_cursor
+
+    @staticmethod
+    def _who_is_on_leave(conn, start, end, cursor, limit):
+        # The leave_date index is ordered by (leave_date, rowid), so this is a range scan with keyset paging
+        if cursor:
+            day, last_id = cursor.rsplit("|", 1)
+            rows = conn.execute(
+                "SELECT leave_date, employee_id, id FROM leaves "
+                "WHERE (leave_date > ? OR (leave_date = ? AND id > ?)) AND leave_date <= ? "
+                "ORDER BY leave_date, id LIMIT ?",
+                (day, day, int(last_id), end, limit + 1)
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT leave_date, employee_id, id FROM leaves WHERE leave_date BETWEEN ? AND ? "
+                "ORDER BY leave_date, id LIMIT ?",
+                (start, end, limit + 1)
+            ).fetchall()
+        next_cursor = f"{rows[limit - 1][0]}|{rows[limit - 1][2]}" if len(rows) > limit else None
+        return [(day, emp) for day, emp, _ in rows[:limit]], next_cursor
+
+    @staticmethod
+    def _get_history(conn, employee_id):
+        if SQLiteLeaveStore._get_balance(conn, employee_id) is None:
+            return None
+        rows = conn.execute("SELECT leave_date FROM leaves WHERE employee_id = ? ORDER BY id", (employee_id,))
+        return [row[0] for row in rows]
+
+    async def get_balance(self, employee_id):
+        return await self._run(self._get_balance, employee_id)
+
+    async def apply_leave(self, employee_id, leave_dates):
+        return await self._run(self._apply_leave, employee_id, leave_dates)
+
+    async def get_history(self, employee_id):
+        return await self._run(self._get_history, employee_id)
+
+    async def get_history_page(self, employee_id, cursor, limit):
+        return await self._run(self._get_history_page, employee_id, cursor, limit)
+
+    async def get_balances(self, employee_ids):
+        return await self._run(self._get_balances, employee_ids)
+
+    async def apply_leave_bulk(self, requests):
+        return await self._run(self._apply_leave_bulk, requests)
+
+    async def who_is_on_leave(self, start, end, cursor, limit):
+        return await self._run(self._who_is_on_leave, start, end, cursor, limit)
+
+    async def close(self):
+        while not self.pool.empty():
+            self.pool.get().close()
+
+
+def create_store() -> LeaveStore:
+    """Picks the backend from LEAVE_STORE (sqlite by default, or memory)."""
+    backend = os.getenv("LEAVE_STORE", "sqlite")
+    if backend == "memory":
+        return MemoryLeaveStore()
+    return SQLiteLeaveStore(os.getenv("LEAVE_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "leaves.db")))
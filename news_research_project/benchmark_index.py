@@ -0,0 +1,96 @@
+import sys
+import json
+import time
+import argparse
+import statistics
+
+import faiss
+import numpy as np
+
+from index_modes import MODES, build_index, choose_mode, index_memory_bytes
+
+# MiniLM (what the app uses) is 384-d; faiss.ipynb uses 768-d mpnet
+DEFAULT_DIM = 384
+DEFAULT_SIZES = [10_000, 100_000]
+QUERIES = 200
+K = 10
+
+
+def make_vectors(n, dim, seed=0, clusters=200, latent_dim=32):
+    """
+    Normalized vectors around random topic centres. Variation lives in a low-dimensional
+    subspace, like real sentence embeddings (pure high-dimensional noise would make every
+    approximate index look far worse than it is on text).
+    """
+    structure = np.random.default_rng(42)
+    centres = structure.standard_normal((clusters, dim)).astype(np.float32)
+    projection = structure.standard_normal((latent_dim, dim)).astype(np.float32) / np.sqrt(latent_dim)
+
+    rng = np.random.default_rng(seed)
+    latent = rng.standard_normal((n, latent_dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, n)] + latent @ projection
+    vectors += 0.05 * rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def recall_at_k(found, truth):
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def bench_mode(mode, vectors, queries, truth):
+    start = time.perf_counter()
+    index = build_index(vectors, np.arange(len(vectors)), mode)
+    build_seconds = time.perf_counter() - start
+
+    # One query at a time, like the app does
+    latencies, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, labels = index.search(query[None, :], K)
+        latencies.append(time.perf_counter() - start)
+        found.append(labels[0])
+
+    return {
+        "mode": mode,
+        "build_seconds": build_seconds,
+        "memory_mb": index_memory_bytes(index) / 1e6,
+        "query_p50_ms": statistics.median(latencies) * 1000,
+        f"recall_at_{K}": recall_at_k(found, truth),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k vs latency/memory of each index mode against flat.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'vectors':>9} {'mode':>6} {'build (s)':>10} {'memory (MB)':>12} {'p50 (ms)':>9} {f'recall@{K}':>10}")
+    for n in args.sizes:
+        vectors = make_vectors(n, args.dim)
+        queries = make_vectors(QUERIES, args.dim, seed=1)
+        # Ground truth from exact search
+        exact = faiss.IndexFlatL2(args.dim)
+        exact.add(vectors)
+        _, truth = exact.search(queries, K)
+
+        for mode in MODES:
+            if mode == "ivfpq" and n < 256 * 39:
+                continue
+            row = bench_mode(mode, vectors, queries, truth)
+            row["vectors"] = n
+            results.append(row)
+            print(f"{n:>9} {mode:>6} {row['build_seconds']:>10.2f} {row['memory_mb']:>12.1f} "
+                  f"{row['query_p50_ms']:>9.3f} {row[f'recall_at_{K}']:>10.3f}")
+        print(f"{'':>9} auto mode picks: {choose_mode(n)}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"dim": args.dim, "k": K, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+import os
+import re
+import json
+import time
+import shutil
+import threading
+from collections import OrderedDict
+
+from vector_store import INDEX_FILE, index_exists, index_version, open_vector_store, read_index
+from index_modes import SEARCH_INDEX_FILE, load_search_meta
+from hybrid import HybridRetriever, build_bm25
+from ingest import ingest_documents, load_manifest as load_sources_manifest
+
+# Each named collection is an ordinary index directory (see vector_store.py) under here
+COLLECTIONS_DIR = os.getenv("NEWS_COLLECTIONS_DIR", "collections")
+# The collection's own manifest; manifest.json next to it is ingest's per-URL bookkeeping
+COLLECTION_FILE = "collection.json"
+DEFAULT_COLLECTION = "default"
+# Loaded collections (FAISS index + BM25) are evicted least recently used first past this
+RAM_BUDGET_MB = float(os.getenv("NEWS_COLLECTIONS_RAM_MB", "512"))
+
+# Becomes a directory name, so keep it boring
+NAME_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+
+
+def collection_name(name):
+    """Normalizes a user-typed name ("NVDA Q2" -> "nvda-q2") and rejects what can't be a folder name."""
+    name = re.sub(r"[^a-z0-9_-]+", "-", name.strip().lower()).strip("-")
+    if not NAME_PATTERN.match(name):
+        raise ValueError(f"Invalid collection name {name!r}: use letters, digits, '-' and '_'")
+    return name
+
+
+class CollectionManager:
+    """
+    Named vector indexes on disk, each in its own directory with a collection.json
+    manifest (embedding model, dimension, document count, build time). Collections
+    are opened on first use and kept in an LRU; when the loaded ones exceed the RAM
+    budget, the least recently used are dropped (in-flight queries keep their
+    reference, so a dropped or replaced index is only freed once they finish).
+    """
+
+    def __init__(self, embeddings, root=COLLECTIONS_DIR, ram_budget_mb=RAM_BUDGET_MB):
+        self.embeddings = embeddings
+        # None is fine for just listing or deleting collections
+        self.model_name = getattr(embeddings, "model_name", type(embeddings).__name__) if embeddings else None
+        self.root = os.path.abspath(root)
+        self.ram_budget_bytes = int(ram_budget_mb * 1024 * 1024)
+        self._loaded = OrderedDict()  # name -> (version, vectorstore, bm25, bytes); most recent last
+        self._loading = {}  # name -> threading.Event, set once the thread opening it is done
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        os.makedirs(self.root, exist_ok=True)
+
+    # --- Manifests ---
+
+    def collection_dir(self, name):
+        return os.path.join(self.root, collection_name(name))
+
+    def load_manifest(self, name):
+        path = os.path.join(self.collection_dir(name), COLLECTION_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_manifest(self, name, manifest):
+        path = os.path.join(self.collection_dir(name), COLLECTION_FILE)
+        with open(path + ".tmp", encoding="utf-8", mode="w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def list_collections(self):
+        """Manifests of every collection on disk, by name."""
+        manifests = []
+        for name in sorted(os.listdir(self.root)):
+            if NAME_PATTERN.match(name):
+                manifest = self.load_manifest(name)
+                if manifest is not None:
+                    manifests.append(manifest)
+        return manifests
+
+    def exists(self, name):
+        """True once the collection has an index to search."""
+        return index_exists(self.collection_dir(name))
+
+    def create(self, name):
+        """Creates an empty collection (or returns the existing one's manifest)."""
+        name = collection_name(name)
+        manifest = self.load_manifest(name)
+        if manifest is not None:
+            return manifest
+        os.makedirs(self.collection_dir(name), exist_ok=True)
+        manifest = {"name": name, "model": self.model_name, "dimension": None, "doc_count": 0, "sources": 0,
+                    "created_at": time.time(), "built_at": None, "build_seconds": None, "index_mode": "flat"}
+        self.save_manifest(name, manifest)
+        return manifest
+
+    def delete(self, name):
+        name = collection_name(name)
+        with self._lock:
+            self._loaded.pop(name, None)
+        shutil.rmtree(self.collection_dir(name), ignore_errors=True)
+
+    def adopt_legacy_index(self, index_dir, name=DEFAULT_COLLECTION):
+        """Moves the old single vector_index folder in as a collection, once."""
+        if not index_exists(index_dir) or self.load_manifest(name) is not None:
+            return False
+        os.makedirs(self.root, exist_ok=True)
+        shutil.move(index_dir, self.collection_dir(name))
+        self.create(name)
+        self.refresh_manifest(name)
+        return True
+
+    # --- Building ---
+
+    def ingest(self, name, docs, text_splitter):
+        """
+        Adds documents to a collection (incrementally, see ingest.py) and updates its
+        manifest. Refuses to mix vectors from a different embedding model.
+        """
+        manifest = self.create(name)
+        if manifest["model"] != self.model_name:
+            raise ValueError(f"Collection {manifest['name']!r} was built with {manifest['model']}, "
+                             f"not {self.model_name}; use another collection")
+        start = time.perf_counter()
+        stats = ingest_documents(docs, self.collection_dir(name), self.embeddings, text_splitter)
+        if stats["chunks_added"] or stats["chunks_removed"]:
+            self.refresh_manifest(name, build_seconds=time.perf_counter() - start)
+        return stats
+
+    def refresh_manifest(self, name, build_seconds=None):
+        """Re-reads counts and dimension from the index files into collection.json."""
+        index_dir = self.collection_dir(name)
+        manifest = self.load_manifest(name)
+        index = read_index(os.path.join(index_dir, INDEX_FILE))
+        search_meta = load_search_meta(index_dir)
+        manifest.update({
+            "dimension": index.d,
+            "doc_count": int(index.ntotal),
+            "sources": len(load_sources_manifest(index_dir)["sources"]),
+            "built_at": time.time(),
+            "build_seconds": build_seconds,
+            "index_mode": search_meta["mode"] if search_meta else "flat",
+            "disk_bytes": sum(os.path.getsize(os.path.join(index_dir, f)) for f in os.listdir(index_dir)),
+        })
+        self.save_manifest(name, manifest)
+        return manifest
+
+    # --- Loading ---
+
+    def estimate_bytes(self, name, vectorstore, bm25):
+        """
+        What a loaded collection costs: the FAISS index that gets searched (its file
+        size, a close proxy for RAM), BM25 and the docstore offsets. Document texts
+        are memory-mapped and paged in by the OS, so they don't count.
+        """
+        index_dir = self.collection_dir(name)
+        search_path = os.path.join(index_dir, SEARCH_INDEX_FILE)
+        index_path = search_path if os.path.exists(search_path) else os.path.join(index_dir, INDEX_FILE)
+        return os.path.getsize(index_path) + bm25.memory_bytes() + vectorstore.docstore.offsets.nbytes
+
+    def load(self, name):
+        """(vectorstore, bm25) for a collection, from the LRU or freshly opened."""
+        name = collection_name(name)
+        index_dir = self.collection_dir(name)
+        if not index_exists(index_dir):
+            raise LookupError(f"Collection {name!r} has no index yet; process some URLs into it first")
+
+        while True:
+            version = index_version(index_dir)
+            with self._lock:
+                cached = self._loaded.get(name)
+                if cached is not None and cached[0] == version:
+                    self._loaded.move_to_end(name)
+                    self.hits += 1
+                    return cached[1], cached[2]
+                loading = self._loading.get(name)
+                if loading is None:
+                    # We open it; sessions asking for the same cold collection wait below
+                    loading = self._loading[name] = threading.Event()
+                    break
+            # Another thread is opening this collection; once it's done, look again
+            loading.wait()
+
+        # The slow part runs outside the lock, so other collections stay servable meanwhile
+        try:
+            vectorstore = open_vector_store(index_dir, self.embeddings)
+            bm25 = build_bm25(vectorstore)
+            size = self.estimate_bytes(name, vectorstore, bm25)
+            with self._lock:
+                self._loaded.pop(name, None)
+                self._loaded[name] = (version, vectorstore, bm25, size)
+                self.loads += 1
+                self._evict(keep=name)
+        finally:
+            with self._lock:
+                del self._loading[name]
+            loading.set()
+        return vectorstore, bm25
+
+    def _evict(self, keep):
+        # Oldest first; the collection just asked for stays even if it alone is over budget
+        while self.loaded_bytes() > self.ram_budget_bytes and len(self._loaded) > 1:
+            name = next(iter(self._loaded))
+            if name == keep:
+                self._loaded.move_to_end(name)
+                continue
+            self._loaded.pop(name)
+            self.evictions += 1
+            print(f"Evicted collection {name!r} ({self.loaded_bytes() / 1e6:.1f} MB still loaded)")
+
+    def loaded_bytes(self):
+        return sum(entry[3] for entry in self._loaded.values())
+
+    def get_retriever(self, name, k=2, rerank=False):
+        vectorstore, bm25 = self.load(name)
+        return HybridRetriever(vectorstore=vectorstore, bm25=bm25, k=k, rerank=rerank)
+
+    def stats(self):
+        with self._lock:
+            return {"loaded": {name: entry[3] for name, entry in self._loaded.items()},
+                    "loaded_bytes": self.loaded_bytes(), "ram_budget_bytes": self.ram_budget_bytes,
+                    "hits": self.hits, "loads": self.loads, "evictions": self.evictions}
+
+
+# One manager per collections folder, shared by every session in the process
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_collection_manager(embeddings, root=COLLECTIONS_DIR, ram_budget_mb=RAM_BUDGET_MB):
+    key = os.path.abspath(root)
+    with _managers_lock:
+        if key not in _managers:
+            _managers[key] = CollectionManager(embeddings, root, ram_budget_mb)
+        return _managers[key]
+
+
+if __name__ == "__main__":
+    # python collection_manager.py [list | delete <name>]
+    import sys
+
+    manager = CollectionManager(None)
+    if len(sys.argv) > 2 and sys.argv[1] == "delete":
+        manager.delete(sys.argv[2])
+        print(f"Deleted {sys.argv[2]}")
+    else:
+        print(f"{'collection':<24} {'model':<40} {'dim':>5} {'chunks':>8} {'sources':>8} {'mode':>6} {'built':>20}")
+        for m in manager.list_collections():
+            built = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(m["built_at"])) if m["built_at"] else "-"
+            print(f"{m['name']:<24} {m['model']:<40} {m['dimension'] or '-':>5} {m['doc_count']:>8} "
+                  f"{m['sources']:>8} {m['index_mode']:>6} {built:>20}")
@@ -0,0 +1,132 @@
+import os
+import re
+import math
+import threading
+
+import numpy as np
+from langchain_core.documents import Document
+
+# How many chunks to retrieve before packing (the prompt used to get the top 2 as they came)
+CANDIDATES = 8
+# Max tokens of retrieved context per prompt; NEWS_CONTEXT_TOKENS overrides it
+CONTEXT_TOKEN_BUDGET = int(os.getenv("NEWS_CONTEXT_TOKENS", "800"))
+# MMR trade-off: 1.0 is pure relevance, lower values push harder for chunks that add something new
+MMR_LAMBDA = 0.7
+# A chunk this similar to one already packed is a near-duplicate (same wire story, split overlap) and is dropped
+DUPLICATE_SIMILARITY = 0.92
+# Don't bother truncating a chunk into less room than this; a fragment that short rarely helps
+MIN_SPAN_TOKENS = 48
+
+# Llama 3's tokenizer is built on the same BPE as tiktoken's cl100k_base, so its counts are
+# within a few percent of what Groq bills. Without tiktoken (or its encoding file, which is
+# downloaded on first use) we fall back to the usual ~4 characters per token for English.
+TOKENIZER_ENCODING = "cl100k_base"
+CHARS_PER_TOKEN = 4
+SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def get_encoding():
+    """The local tokenizer, loaded once per process; None if it isn't available."""
+    global _encoding, _encoding_loaded
+    with _encoding_lock:
+        if not _encoding_loaded:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+            except Exception as e:
+                print(f"Token counts are estimated ({CHARS_PER_TOKEN} chars/token): {TOKENIZER_ENCODING} unavailable ({e})")
+            _encoding_loaded = True
+        return _encoding
+
+
+def count_tokens(text):
+    encoding = get_encoding()
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text, max_tokens):
+    """The longest prefix within max_tokens, cut back to the last full sentence when there is one."""
+    encoding = get_encoding()
+    if encoding is None:
+        prefix = text[:max_tokens * CHARS_PER_TOKEN]
+    else:
+        prefix = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    if len(prefix) == len(text):
+        return text
+    sentences = SENTENCE_END.split(prefix)
+    return " ".join(sentences[:-1]) if len(sentences) > 1 else prefix
+
+
+def mmr_order(relevance, vectors, lambda_mult=MMR_LAMBDA, duplicate_similarity=DUPLICATE_SIMILARITY):
+    """
+    Maximal marginal relevance over normalized chunk vectors: repeatedly picks the chunk
+    with the best relevance minus similarity to what's already picked. Near-duplicates
+    of a picked chunk are dropped. Returns (picked indices in order, number dropped).
+    """
+    n = len(relevance)
+    redundancy = np.zeros(n, dtype=np.float32)  # max similarity to any picked chunk
+    remaining = np.ones(n, dtype=bool)
+    picked, dropped = [], 0
+    while remaining.any():
+        scores = np.where(remaining, lambda_mult * relevance - (1 - lambda_mult) * redundancy, -np.inf)
+        i = int(np.argmax(scores))
+        remaining[i] = False
+        if redundancy[i] >= duplicate_similarity:
+            dropped += 1
+            continue
+        picked.append(i)
+        redundancy = np.maximum(redundancy, vectors @ vectors[i])
+    return picked, dropped
+
+
+def pack_context(docs, embeddings, token_budget=CONTEXT_TOKEN_BUDGET):
+    """
+    Picks what goes into the prompt from the retrieved candidates (best first):
+    near-duplicates are dropped, MMR orders the rest, and chunks are packed until
+    token_budget is used, with the last one cut at a sentence to fill the gap.
+    Relevance is the retriever's own ranking (BM25 + vector fusion, or the
+    cross-encoder when reranking), so MMR only decides what is redundant.
+    Returns (packed docs, stats).
+    """
+    stats = {"candidates": len(docs), "duplicates_dropped": 0, "chunks_used": 0, "truncated": 0,
+             "candidate_tokens": 0, "context_tokens": 0, "tokens_saved": 0}
+    if not docs:
+        return [], stats
+
+    texts = [doc.page_content for doc in docs]
+    # Chunk vectors come out of the shared embedding cache (they were embedded at ingest)
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.where(norms == 0, 1, norms)
+    relevance = 1.0 - np.arange(len(docs), dtype=np.float32) / len(docs)
+
+    order, stats["duplicates_dropped"] = mmr_order(relevance, vectors)
+    packed, used = [], 0
+    for i in order:
+        tokens = count_tokens(texts[i])
+        if used + tokens <= token_budget:
+            packed.append(docs[i])
+            used += tokens
+        elif token_budget - used >= MIN_SPAN_TOKENS:
+            span = truncate_to_tokens(texts[i], token_budget - used)
+            packed.append(Document(page_content=span, metadata={**docs[i].metadata, "truncated": True}))
+            stats["truncated"] += 1
+            used += count_tokens(span)
+
+    stats["chunks_used"] = len(packed)
+    stats["candidate_tokens"] = count_tokens("\n\n".join(texts))
+    stats["context_tokens"] = count_tokens("\n\n".join(doc.page_content for doc in packed))
+    stats["tokens_saved"] = stats["candidate_tokens"] - stats["context_tokens"]
+    return packed, stats
+
+
+def format_context_stats(stats):
+    return (f"prompt {stats.get('prompt_tokens', stats['context_tokens'])} tokens "
+            f"(context {stats['context_tokens']}, saved {stats['tokens_saved']}), "
+            f"{stats['chunks_used']}/{stats['candidates']} chunks, {stats['duplicates_dropped']} duplicates dropped")
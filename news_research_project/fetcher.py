@@ -0,0 +1,199 @@
+import os
+import time
+import threading
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+import requests
+from requests.adapters import HTTPAdapter
+from langchain_core.documents import Document
+
+# Download / parse limits
+MAX_DOWNLOADS = 8          # concurrent downloads overall
+MAX_PER_HOST = 2           # concurrent downloads to a single site
+PARSE_WORKERS = min(4, os.cpu_count() or 1)
+CONNECT_TIMEOUT = 5        # seconds
+READ_TIMEOUT = 15          # seconds per socket read (requests' timeout, not the whole download)
+DOWNLOAD_TIMEOUT = 30      # seconds per URL from when it's queued, so a site trickling bytes can't stall the batch
+PARSE_TIMEOUT = 30         # seconds per document from when it's queued
+MAX_BYTES = 10 * 1024 * 1024
+READ_CHUNK_BYTES = 64 * 1024
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (news-research-tool)"}
+
+
+def parse_html(html):
+    """Runs in a worker process: turns raw HTML into the same text UnstructuredURLLoader would give."""
+    from unstructured.partition.html import partition_html
+    elements = partition_html(text=html)
+    return "\n\n".join(str(element) for element in elements)
+
+
+class Fetcher:
+    """
+    Downloads URLs with a bounded thread pool (one pooled requests.Session, capped
+    per host) and parses the HTML in a process pool, so CPU-heavy parsing doesn't
+    hold the GIL while other downloads are in flight. The process pool is started
+    on first use and kept for the fetcher's lifetime; close() shuts it down.
+
+    Only http(s) URLs are fetched unless allow_local_files is set. The URLs come
+    from the Streamlit sidebar, and reading paths like /root/.env into a searchable
+    index is not something a user of the app should be able to do.
+    """
+
+    def __init__(self, max_downloads=MAX_DOWNLOADS, max_per_host=MAX_PER_HOST, parse_workers=PARSE_WORKERS,
+                 allow_local_files=False):
+        self.allow_local_files = allow_local_files
+        self.max_downloads = max_downloads
+        self.max_per_host = max_per_host
+        self.parse_workers = parse_workers
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_downloads, pool_maxsize=max_per_host)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(HEADERS)
+
+        self._host_limits = {}
+        self._host_lock = threading.Lock()
+        self._parsers = None
+        self._parsers_lock = threading.Lock()
+
+    def _parse_pool(self):
+        with self._parsers_lock:
+            if self._parsers is None:
+                self._parsers = ProcessPoolExecutor(max_workers=self.parse_workers)
+            return self._parsers
+
+    def _drop_parse_pool(self, pool):
+        """
+        A parse that blew its deadline keeps its worker busy and can't be interrupted
+        (and a crashed worker breaks the whole pool), so the pool is retired, letting
+        its processes exit once they finish, and the next parse starts a fresh one.
+        """
+        with self._parsers_lock:
+            if self._parsers is pool:
+                self._parsers = None
+        pool.shutdown(wait=False)
+
+    def close(self):
+        with self._parsers_lock:
+            if self._parsers is not None:
+                self._parsers.shutdown(wait=False, cancel_futures=True)
+                self._parsers = None
+        self.session.close()
+
+    def _host_limit(self, host):
+        with self._host_lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.Semaphore(self.max_per_host)
+            return self._host_limits[host]
+
+    def download(self, url, deadline=None):
+        """
+        Returns (raw text, is_html). With allow_local_files, file:// URLs and plain paths
+        are read from disk. Gives up with TimeoutError once time.monotonic() passes `deadline`.
+        """
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https"):
+            if not self.allow_local_files:
+                raise ValueError("only http:// and https:// URLs can be fetched")
+            path = url2pathname(parsed.path) if parsed.scheme == "file" else url
+            with open(path, encoding="utf-8") as f:
+                return f.read(), path.lower().endswith((".html", ".htm"))
+
+        with self._host_limit(parsed.netloc):
+            with self.session.get(url, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), stream=True) as response:
+                response.raise_for_status()
+                # Read in chunks so the per-URL deadline holds even when every single read is quick
+                chunks, size = [], 0
+                while size < MAX_BYTES:
+                    if deadline is not None and time.monotonic() > deadline:
+                        raise TimeoutError(f"download took longer than {DOWNLOAD_TIMEOUT}s")
+                    chunk = response.raw.read(min(READ_CHUNK_BYTES, MAX_BYTES - size), decode_content=True)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                    size += len(chunk)
+                body = b"".join(chunks)
+                encoding = response.encoding or response.apparent_encoding or "utf-8"
+                return body.decode(encoding, errors="replace"), "html" in response.headers.get("Content-Type", "html")
+
+    def iter_documents(self, urls, errors=None):
+        """
+        Yields one Document per URL as soon as it's downloaded and parsed, in completion order.
+        Failed URLs are skipped; pass a dict as `errors` to collect url -> error message.
+        """
+        urls = [url for url in urls if url and url.strip()]
+        if not urls:
+            return
+        errors = errors if errors is not None else {}
+
+        downloads = ThreadPoolExecutor(max_workers=self.max_downloads)
+        parsers = None
+        parse_timed_out = False
+        pending = {}  # future -> (stage, url, deadline)
+        try:
+            for url in urls:
+                deadline = time.monotonic() + DOWNLOAD_TIMEOUT
+                pending[downloads.submit(self.download, url, deadline)] = ("download", url, deadline)
+
+            while pending:
+                timeout = max(0.0, min(deadline for _, _, deadline in pending.values()) - time.monotonic())
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                # Skip whatever has blown past its own deadline, finished or not
+                now = time.monotonic()
+                for future, (stage, url, deadline) in list(pending.items()):
+                    if future not in done and now >= deadline:
+                        del pending[future]
+                        future.cancel()
+                        errors[url] = f"{stage} timed out"
+                        parse_timed_out = parse_timed_out or stage == "parse"
+
+                for future in done:
+                    stage, url, _ = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        errors[url] = f"{stage} failed: {e}"
+                        if isinstance(e, BrokenProcessPool):
+                            self._drop_parse_pool(parsers)
+                        continue
+
+                    if stage == "download":
+                        text, is_html = result
+                        if is_html:
+                            parsers = self._parse_pool()
+                            deadline = time.monotonic() + PARSE_TIMEOUT
+                            try:
+                                pending[parsers.submit(parse_html, text)] = ("parse", url, deadline)
+                            except BrokenProcessPool as e:
+                                errors[url] = f"parse failed: {e}"
+                                self._drop_parse_pool(parsers)
+                        else:
+                            yield Document(page_content=text, metadata={"source": url})
+                    else:
+                        yield Document(page_content=result, metadata={"source": url})
+        finally:
+            # Don't wait on stragglers we already gave up on; downloads stop at their own deadline
+            downloads.shutdown(wait=False, cancel_futures=True)
+            for future in pending:
+                future.cancel()
+            if parse_timed_out and parsers is not None:
+                self._drop_parse_pool(parsers)
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def get_fetcher():
+    """One fetcher (and HTTP connection pool) per process, for web URLs only."""
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = Fetcher()
+        return _fetcher
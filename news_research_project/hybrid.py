@@ -0,0 +1,164 @@
+import re
+import math
+import threading
+from collections import Counter
+
+import numpy as np
+from langchain_core.retrievers import BaseRetriever
+
+from index_modes import index_ids
+
+# How many candidates each side (BM25 and FAISS) contributes before fusion
+CANDIDATES = 20
+# Reciprocal rank fusion constant; 60 is the usual choice and keeps one list from dominating
+RRF_K = 60
+# Only this many fused candidates go through the (slower) cross-encoder
+RERANK_CANDIDATES = 10
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+# Keeps tickers, versions and prices together: "iCNG", "Q2", "1.5", "o'reilly"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.'][a-z0-9]+)*")
+STOPWORDS = frozenset("a an and are as at be by for from has have in is it its of on or that the this to was were "
+                      "what when which who why will with how did does do".split())
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Sparse inverted index over the chunk texts: term -> (rows, term frequencies) as
+    numpy arrays, plus each chunk's length. Scoring a query only touches the
+    postings of its terms, so tickers and exact numbers that MiniLM blurs still hit.
+    """
+
+    def __init__(self, record_ids, texts, k1=1.5, b=0.75):
+        self.record_ids = np.asarray(record_ids, dtype=np.int64)  # row -> docstore record id
+        self.k1 = k1
+        self.b = b
+
+        postings = {}
+        lengths = np.zeros(len(texts), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths[row] = sum(counts.values())
+            for term, tf in counts.items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(row)
+                postings[term][1].append(tf)
+
+        self.lengths = lengths
+        self.avg_length = float(lengths.mean()) if len(lengths) else 0.0
+        n = len(texts)
+        self.postings = {}
+        for term, (rows, tfs) in postings.items():
+            idf = math.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            self.postings[term] = (np.asarray(rows, dtype=np.int32), np.asarray(tfs, dtype=np.float32), idf)
+
+    def __len__(self):
+        return len(self.record_ids)
+
+    def memory_bytes(self):
+        """Roughly what the index takes in RAM: the numpy arrays plus ~100 bytes of dict overhead per term."""
+        arrays = sum(rows.nbytes + tfs.nbytes for rows, tfs, _ in self.postings.values())
+        return arrays + self.record_ids.nbytes + self.lengths.nbytes + 100 * len(self.postings)
+
+    def search(self, query, k):
+        """Returns [(record_id, score)] for the k best matching chunks."""
+        terms = [term for term in set(tokenize(query)) if term in self.postings]
+        if not terms or not len(self):
+            return []
+
+        scores = np.zeros(len(self), dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.lengths / (self.avg_length or 1.0))
+        for term in terms:
+            rows, tfs, idf = self.postings[term]
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm[rows])
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.record_ids[row]), float(scores[row])) for row in top]
+
+
+def build_bm25(vectorstore):
+    # Chunks deleted by ingest stay in docs.jsonl but are gone from the FAISS index
+    ids = index_ids(vectorstore.index)
+    texts = [vectorstore.docstore.search(int(i)).page_content for i in ids]
+    return BM25Index(ids, texts)
+
+
+_cross_encoder = None
+_cross_encoder_lock = threading.Lock()
+
+
+def get_cross_encoder():
+    """Loads the reranking model once per process (CPU)."""
+    global _cross_encoder
+    with _cross_encoder_lock:
+        if _cross_encoder is None:
+            from sentence_transformers import CrossEncoder
+            _cross_encoder = CrossEncoder(RERANK_MODEL, device="cpu")
+        return _cross_encoder
+
+
+def reciprocal_rank_fusion(ranked_lists, weights, rrf_k=RRF_K):
+    """Combines ranked [(record_id, score)] lists into {record_id: fused score}."""
+    fused = {}
+    for ranked, weight in zip(ranked_lists, weights):
+        for rank, (record_id, _) in enumerate(ranked):
+            fused[record_id] = fused.get(record_id, 0.0) + weight / (rrf_k + rank + 1)
+    return fused
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    BM25 + FAISS retrieval fused with reciprocal rank fusion, optionally reranked
+    by a cross-encoder. Each returned Document carries its scores in metadata
+    ("score", "bm25_score", "vector_distance" and "rerank_score" when reranked),
+    so callers can show them without searching again.
+    """
+
+    vectorstore: object
+    bm25: object
+    k: int = 2
+    candidates: int = CANDIDATES
+    bm25_weight: float = 1.0
+    vector_weight: float = 1.0
+    rerank: bool = False
+    rerank_candidates: int = RERANK_CANDIDATES
+
+    def vector_search(self, query, k):
+        vector = np.asarray([self.vectorstore.embedding_function.embed_query(query)], dtype=np.float32)
+        distances, labels = self.vectorstore.index.search(vector, min(k, self.vectorstore.index.ntotal))
+        return [(int(label), float(distance)) for label, distance in zip(labels[0], distances[0]) if label != -1]
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        if self.vectorstore.index.ntotal == 0:
+            return []
+
+        vector_hits = self.vector_search(query, self.candidates)
+        bm25_hits = self.bm25.search(query, self.candidates)
+        fused = reciprocal_rank_fusion([bm25_hits, vector_hits], [self.bm25_weight, self.vector_weight])
+        ranked = sorted(fused, key=fused.get, reverse=True)
+
+        keep = self.rerank_candidates if self.rerank else self.k
+        bm25_scores, vector_distances = dict(bm25_hits), dict(vector_hits)
+        docs = []
+        for record_id in ranked[:keep]:
+            doc = self.vectorstore.docstore.search(record_id)
+            doc.metadata["score"] = fused[record_id]
+            doc.metadata["bm25_score"] = bm25_scores.get(record_id)
+            doc.metadata["vector_distance"] = vector_distances.get(record_id)
+            docs.append(doc)
+
+        if self.rerank and docs:
+            scores = get_cross_encoder().predict([(query, doc.page_content) for doc in docs])
+            for doc, score in zip(docs, scores):
+                doc.metadata["rerank_score"] = float(score)
+            docs.sort(key=lambda doc: doc.metadata["rerank_score"], reverse=True)
+
+        return docs[:self.k]
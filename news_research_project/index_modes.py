@@ -0,0 +1,194 @@
+import os
+import json
+import math
+
+import faiss
+import numpy as np
+
+# Which search index to keep next to the exact one: "auto" picks by corpus size (see choose_mode)
+INDEX_MODE = os.getenv("NEWS_INDEX_MODE", "auto")
+MODES = ("flat", "sq8", "hnsw", "ivfpq")
+
+# The compressed copy used for searching; index.faiss stays the exact (flat) source of truth
+SEARCH_INDEX_FILE = "search.faiss"
+SEARCH_META_FILE = "search_meta.json"
+
+# auto mode: exact search is fast enough up to here...
+FLAT_MAX_VECTORS = 20_000
+# ...then int8 codes (4x less memory, still a full scan)...
+SQ8_MAX_VECTORS = 100_000
+# ...then an HNSW graph over int8 codes, and IVF-PQ past this
+HNSW_MAX_VECTORS = 1_000_000
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+PQ_BITS = 8
+# Retrain IVF-PQ from scratch once the corpus has grown this much since training
+RETRAIN_GROWTH = 2.0
+
+
+def choose_mode(n_vectors):
+    if n_vectors <= FLAT_MAX_VECTORS:
+        return "flat"
+    if n_vectors <= SQ8_MAX_VECTORS:
+        return "sq8"
+    if n_vectors <= HNSW_MAX_VECTORS:
+        return "hnsw"
+    return "ivfpq"
+
+
+def resolve_mode(mode, n_vectors):
+    mode = choose_mode(n_vectors) if mode == "auto" else mode
+    if mode not in MODES:
+        raise ValueError(f"Unknown index mode {mode!r}; use one of {MODES} or 'auto'")
+    # IVF-PQ needs enough vectors to train its centroids and codebooks
+    if mode == "ivfpq" and n_vectors < 256 * 39:
+        return "sq8"
+    return mode
+
+
+def pq_subquantizers(dim):
+    # About 4 dimensions per sub-vector (384 -> 96 bytes per vector, 16x smaller than float32);
+    # 8 per sub-vector halves that again but cost ~15 points of recall@10 in benchmark_index.py
+    m = max(1, dim // 4)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def ivf_lists(n_vectors):
+    # The usual ~sqrt(n) rule, kept within what the training sample can support
+    return int(min(max(16, 4 * math.sqrt(n_vectors)), n_vectors // 39))
+
+
+def new_index(mode, dim, n_vectors):
+    """An empty (untrained) index for `mode`, addressed by record ids."""
+    if mode == "flat":
+        inner = faiss.IndexFlatL2(dim)
+    elif mode == "sq8":
+        # Linear int8 per dimension (min/max range -> 0..255), the same scheme as the
+        # int8 example in llm_fine_tuning/quantization_basics.ipynb
+        inner = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+    elif mode == "hnsw":
+        inner = faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_8bit, HNSW_M)
+        inner.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        inner.hnsw.efSearch = HNSW_EF_SEARCH
+    else:
+        nlist = ivf_lists(n_vectors)
+        index = faiss.IndexIVFPQ(faiss.IndexFlatL2(dim), dim, nlist, pq_subquantizers(dim), PQ_BITS)
+        index.nprobe = max(16, nlist // 10)
+        # IVF stores record ids itself (and removes by id without renumbering), so no IDMap wrapper
+        return index
+    return faiss.IndexIDMap2(inner)
+
+
+def build_index(vectors, ids, mode):
+    """Train + fill an index of `mode` (not "auto") with the given vectors and record ids."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index = new_index(mode, vectors.shape[1], len(vectors))
+    if not index.is_trained:
+        # A random sample is plenty for the centroids/codebooks and keeps training time flat as the corpus grows
+        sample_size = min(len(vectors), 40 * max(getattr(index, "nlist", 0), 256))
+        sample = vectors[np.random.default_rng(0).choice(len(vectors), sample_size, replace=False)]
+        index.train(sample)
+    index.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+    return index
+
+
+def index_ids(index):
+    """Record ids currently stored in a search index, whichever kind it is."""
+    if hasattr(index, "id_map"):
+        return faiss.vector_to_array(index.id_map)
+    if isinstance(index, faiss.IndexIVF):
+        invlists = index.invlists
+        parts = [faiss.rev_swig_ptr(invlists.get_ids(i), invlists.list_size(i)).copy()
+                 for i in range(index.nlist) if invlists.list_size(i)]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+    return np.arange(index.ntotal, dtype=np.int64)
+
+
+def exact_vectors(flat_index):
+    """(vectors, ids) out of the exact IndexIDMap2(IndexFlatL2) that ingest maintains."""
+    ids = faiss.vector_to_array(flat_index.id_map)
+    vectors = flat_index.index.reconstruct_n(0, flat_index.ntotal) if flat_index.ntotal else \
+        np.zeros((0, flat_index.d), dtype=np.float32)
+    return vectors, ids
+
+
+def load_search_meta(index_dir):
+    path = os.path.join(index_dir, SEARCH_META_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_search_index(index_dir, index, meta):
+    tmp_path = os.path.join(index_dir, SEARCH_INDEX_FILE + ".tmp")
+    faiss.write_index(index, tmp_path)
+    with open(os.path.join(index_dir, SEARCH_META_FILE + ".tmp"), encoding="utf-8", mode="w") as f:
+        json.dump(meta, f)
+    os.replace(os.path.join(index_dir, SEARCH_META_FILE + ".tmp"), os.path.join(index_dir, SEARCH_META_FILE))
+    os.replace(tmp_path, os.path.join(index_dir, SEARCH_INDEX_FILE))
+
+
+def drop_search_index(index_dir):
+    for name in (SEARCH_INDEX_FILE, SEARCH_META_FILE):
+        path = os.path.join(index_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def rebuild_search_index(index_dir, flat_index, mode=INDEX_MODE):
+    """The train step: builds the compressed search index from the exact vectors."""
+    mode = resolve_mode(mode, flat_index.ntotal)
+    if mode == "flat":
+        drop_search_index(index_dir)
+        return mode
+    vectors, ids = exact_vectors(flat_index)
+    save_search_index(index_dir, build_index(vectors, ids, mode), {"mode": mode, "trained_on": len(ids)})
+    return mode
+
+
+def sync_search_index(index_dir, flat_index, added_ids=(), added_vectors=None, removed_ids=(), mode=INDEX_MODE):
+    """
+    Keeps the search index in step with an ingest. New vectors are added to the
+    trained index and removed ids deleted from it, so the codebooks aren't retrained
+    each time. A full rebuild happens when the wanted mode changes (the corpus grew
+    past a threshold), IVF-PQ has outgrown its training set, or HNSW loses vectors
+    (its graph can't delete).
+    """
+    wanted = resolve_mode(mode, flat_index.ntotal)
+    meta = load_search_meta(index_dir)
+    current = meta["mode"] if meta and os.path.exists(os.path.join(index_dir, SEARCH_INDEX_FILE)) else "flat"
+
+    if wanted != current or (wanted == "hnsw" and len(removed_ids)) or \
+            (wanted == "ivfpq" and flat_index.ntotal > RETRAIN_GROWTH * meta["trained_on"]):
+        return rebuild_search_index(index_dir, flat_index, wanted)
+    if wanted == "flat":
+        return wanted
+
+    index = faiss.read_index(os.path.join(index_dir, SEARCH_INDEX_FILE))
+    if len(removed_ids):
+        index.remove_ids(np.asarray(removed_ids, dtype=np.int64))
+    if len(added_ids):
+        index.add_with_ids(np.ascontiguousarray(added_vectors, dtype=np.float32), np.asarray(added_ids, dtype=np.int64))
+    save_search_index(index_dir, index, meta)
+    return wanted
+
+
+def index_memory_bytes(index):
+    """Size of the serialized index, a close proxy for what it takes in RAM."""
+    return int(faiss.serialize_index(index).size)
+
+
+if __name__ == "__main__":
+    # Train step by hand: python index_modes.py [vector_index] [auto|flat|sq8|hnsw|ivfpq]
+    import sys
+    from ingest import open_id_index
+
+    index_dir = sys.argv[1] if len(sys.argv) > 1 else "vector_index"
+    flat = open_id_index(index_dir, None)
+    built = rebuild_search_index(index_dir, flat, sys.argv[2] if len(sys.argv) > 2 else INDEX_MODE)
+    print(f"{flat.ntotal} vectors -> {built} search index")
@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import hashlib
+import threading
+
+import faiss
+import numpy as np
+
+from fetcher import Fetcher
+from vector_store import INDEX_FILE, append_documents, read_index, write_index
+from index_modes import sync_search_index
+
+# Keeps track of what each URL contributed to the index
+MANIFEST_FILE = "manifest.json"
+
+# One ingestion at a time per process (two sessions clicking "Process URLs" together)
+_ingest_lock = threading.Lock()
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_sources(urls):
+    """
+    Fetches every source into a Document (see fetcher.py). Unlike the app, this
+    command-line path also reads file:// URLs and plain paths, which keeps the
+    whole pipeline testable offline.
+    """
+    fetcher = Fetcher(allow_local_files=True)
+    try:
+        return list(fetcher.iter_documents(urls))
+    finally:
+        fetcher.close()
+
+
+def load_manifest(index_dir):
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"sources": {}, "chunks": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(index_dir, manifest):
+    tmp_path = os.path.join(index_dir, MANIFEST_FILE + ".tmp")
+    with open(tmp_path, encoding="utf-8", mode="w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(index_dir, MANIFEST_FILE))
+
+
+def open_id_index(index_dir, dim):
+    """
+    Opens the index as an IndexIDMap2 so we can add and remove vectors by record id.
+    An index saved by the old full rebuild (plain rows) is converted once, keeping row i as id i.
+    """
+    path = os.path.join(index_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return faiss.IndexIDMap2(faiss.IndexFlatL2(dim))
+
+    # Read fully (not mmapped) since we're about to modify it
+    index = faiss.read_index(path)
+    if isinstance(index, faiss.IndexIDMap2):
+        return index
+
+    id_index = faiss.IndexIDMap2(faiss.IndexFlatL2(index.d))
+    if index.ntotal:
+        id_index.add_with_ids(index.reconstruct_n(0, index.ntotal), np.arange(index.ntotal, dtype=np.int64))
+    return id_index
+
+
+def ingest_documents(docs, index_dir, embeddings, text_splitter):
+    """
+    Incrementally adds fetched documents to the index:
+    - a source whose content hash is unchanged is skipped entirely
+    - a changed source keeps the chunks it still has, and its removed chunks are deleted
+    - only chunks never seen before are embedded; a chunk already indexed under
+      another source reuses that vector
+    Returns counts of what happened so the UI can report them.
+    """
+    stats = {"sources_skipped": 0, "sources_updated": 0, "chunks_added": 0,
+             "chunks_removed": 0, "chunks_reused": 0, "chunks_embedded": 0}
+
+    with _ingest_lock:
+        os.makedirs(index_dir, exist_ok=True)
+        manifest = load_manifest(index_dir)
+        sources, chunk_ids = manifest["sources"], manifest["chunks"]
+
+        to_remove = []
+        new_chunks = []  # (source, position in that source, chunk_hash, Document)
+        for doc in docs:
+            source = doc.metadata.get("source", "")
+            doc_hash = content_hash(doc.page_content)
+            previous = sources.get(source)
+            if previous and previous["doc_hash"] == doc_hash:
+                stats["sources_skipped"] += 1
+                continue
+
+            stats["sources_updated"] += 1
+            chunks = text_splitter.split_documents([doc])
+            hashes = [content_hash(chunk.page_content) for chunk in chunks]
+
+            old_ids = dict(zip(previous["chunk_hashes"], previous["ids"])) if previous else {}
+            kept_ids = []
+            for position, (chunk_hash, chunk) in enumerate(zip(hashes, chunks)):
+                if chunk_hash in old_ids:
+                    kept_ids.append(old_ids.pop(chunk_hash))
+                else:
+                    kept_ids.append(None)
+                    new_chunks.append((source, position, chunk_hash, chunk))
+            to_remove.extend(old_ids.values())
+
+            # The new ids get filled in once the chunks are appended below
+            sources[source] = {"doc_hash": doc_hash, "chunk_hashes": hashes, "ids": kept_ids}
+
+        if not new_chunks and not to_remove:
+            return stats
+
+        # A chunk already indexed under another source can reuse that vector,
+        # as long as that copy isn't one we're about to delete
+        removed = set(to_remove)
+        reusable = {}
+        for chunk_hash, ids in chunk_ids.items():
+            alive = [i for i in ids if i not in removed]
+            if alive:
+                reusable[chunk_hash] = alive[0]
+
+        # Embed only chunk texts the index has never seen
+        to_embed = list({chunk_hash: chunk.page_content for _, _, chunk_hash, chunk in new_chunks
+                         if chunk_hash not in reusable}.items())
+        vectors = {}
+        if to_embed:
+            embedded = embeddings.embed_documents([text for _, text in to_embed])
+            vectors = {chunk_hash: np.asarray(v, dtype=np.float32) for (chunk_hash, _), v in zip(to_embed, embedded)}
+            stats["chunks_embedded"] = len(to_embed)
+
+        dim = len(next(iter(vectors.values()))) if vectors else None
+        index = open_id_index(index_dir, dim)
+
+        ids, batch = [], []
+        if new_chunks:
+            ids = append_documents(index_dir, [chunk for _, _, _, chunk in new_chunks])
+            for (source, position, chunk_hash, _), new_id in zip(new_chunks, ids):
+                if chunk_hash in vectors:
+                    batch.append(vectors[chunk_hash])
+                else:
+                    batch.append(index.reconstruct(int(reusable[chunk_hash])))
+                    stats["chunks_reused"] += 1
+                sources[source]["ids"][position] = new_id
+            index.add_with_ids(np.vstack(batch), np.asarray(ids, dtype=np.int64))
+            stats["chunks_added"] = len(ids)
+
+        if to_remove:
+            index.remove_ids(np.asarray(to_remove, dtype=np.int64))
+            stats["chunks_removed"] = len(to_remove)
+
+        # Rebuild the hash -> ids lookup from the sources so removed ids disappear from it
+        chunk_ids.clear()
+        for source_entry in sources.values():
+            for chunk_hash, chunk_id in zip(source_entry["chunk_hashes"], source_entry["ids"]):
+                chunk_ids.setdefault(chunk_hash, []).append(chunk_id)
+
+        write_index(index, index_dir)
+        # Keep the compressed search index (if the corpus is big enough for one) in step
+        sync_search_index(index_dir, index, ids, np.vstack(batch) if batch else None, to_remove)
+        save_manifest(index_dir, manifest)
+
+    return stats
+
+
+if __name__ == "__main__":
+    # Offline usage: python ingest.py nvda_news_1.txt file:///path/to/article.txt
+    from langchain_huggingface import HuggingFaceEmbeddings
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(separators=['\n\n', '\n', '.', ','], chunk_size=1000)
+    model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2", model_kwargs={'device': 'cpu'})
+    print(ingest_documents(load_sources(sys.argv[1:]), "vector_index", model, splitter))
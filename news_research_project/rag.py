@@ -0,0 +1,49 @@
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+
+from shared.tracing import span
+from context_packing import CONTEXT_TOKEN_BUDGET, count_tokens, pack_context
+
+# The instructions for the AI
+TEMPLATE = """
+You are a helpful assistant. Answer the question based ONLY on the following context.
+If you don't know the answer, just say "I don't know".
+
+Context:
+{context}
+
+Question: {question}
+"""
+prompt = ChatPromptTemplate.from_template(TEMPLATE)
+
+
+# Glue chunks together into one string
+def format_docs(docs):
+    return "\n\n".join(doc.page_content for doc in docs)
+
+
+def build_answer_chain(llm):
+    """Prompt -> LLM -> text, fed with already retrieved context."""
+    return prompt | llm | StrOutputParser()
+
+
+def stream_answer(retriever, answer_chain, question, config=None, embeddings=None,
+                  token_budget=CONTEXT_TOKEN_BUDGET, context_stats=None):
+    """
+    Retrieves once and returns (docs, stream of answer text). The same docs (with
+    their scores in metadata) are then used for the sources list, so the search
+    isn't repeated. Lives here (not in main.py) so the benchmark suite runs the same path.
+    With `embeddings`, the retrieved candidates are deduplicated and packed into
+    token_budget (see context_packing.py); the token counts are recorded on the
+    "context" trace span and, if given, written into the `context_stats` dict.
+    """
+    docs = retriever.invoke(question, config=config)
+    if embeddings is not None:
+        with span("context", name="pack_context") as attrs:
+            docs, stats = pack_context(docs, embeddings, token_budget)
+            stats["prompt_tokens"] = count_tokens(prompt.format(context=format_docs(docs), question=question))
+            attrs.update(stats)
+        if context_stats is not None:
+            context_stats.update(stats)
+    chunks = answer_chain.stream({"context": format_docs(docs), "question": question}, config=config)
+    return docs, chunks
@@ -0,0 +1,147 @@
+import os
+import json
+import mmap
+from collections.abc import Mapping
+
+import faiss
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from index_modes import SEARCH_INDEX_FILE
+
+# File names inside an index directory
+INDEX_FILE = "index.faiss"
+DOCS_FILE = "docs.jsonl"
+OFFSETS_FILE = "docs.offsets.npy"
+
+
+class MmapDocStore(Docstore):
+    """
+    Read-only document store backed by a JSONL file plus an array of byte offsets.
+    Both files are memory-mapped, so opening it is instant and only the
+    documents a query actually returns are read and decoded.
+    """
+
+    def __init__(self, index_dir):
+        self.offsets = np.load(os.path.join(index_dir, OFFSETS_FILE), mmap_mode="r")
+        self._file = open(os.path.join(index_dir, DOCS_FILE), "rb")
+        # mmap can't map an empty file
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if len(self.offsets) > 1 else b""
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def search(self, search):
+        i = int(search)
+        if not 0 <= i < len(self):
+            return f"ID {search} not found."
+        record = json.loads(self._data[self.offsets[i]:self.offsets[i + 1]])
+        return Document(page_content=record["page_content"], metadata=record["metadata"])
+
+    def add(self, texts):
+        raise TypeError("MmapDocStore is read-only; add documents with ingest.ingest_documents().")
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+
+class RowIdMapping(Mapping):
+    """
+    FAISS label i is document record i (either the row of a plain index or the id
+    given to an IndexIDMap), so there's no need for a real dict the size of the index.
+    """
+
+    def __init__(self, size):
+        self.size = size
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.size:
+            raise KeyError(i)
+        return i
+
+    def __iter__(self):
+        return iter(range(self.size))
+
+    def __len__(self):
+        return self.size
+
+
+def write_docs(path, docs, offsets, mode="wb"):
+    # Appends one JSON line per document and returns the offsets list extended with their end positions
+    with open(path, mode) as f:
+        for doc in docs:
+            line = json.dumps({"page_content": doc.page_content, "metadata": doc.metadata}).encode("utf-8") + b"\n"
+            f.write(line)
+            offsets.append(offsets[-1] + len(line))
+    return offsets
+
+
+def append_documents(index_dir, docs):
+    """
+    Appends documents to the store and returns their record ids.
+    Existing records never move, so ids handed to FAISS stay valid; the offsets
+    file is swapped in afterwards, which is what makes the new records visible.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    offsets_path = os.path.join(index_dir, OFFSETS_FILE)
+    offsets = np.load(offsets_path).tolist() if os.path.exists(offsets_path) else [0]
+    first_id = len(offsets) - 1
+
+    docs_path = os.path.join(index_dir, DOCS_FILE)
+    if len(offsets) == 1 or not os.path.exists(docs_path):
+        open(docs_path, "wb").close()
+    else:
+        # Drop anything past the last committed record (left behind by a crash mid-append)
+        os.truncate(docs_path, offsets[-1])
+
+    offsets = write_docs(docs_path, docs, offsets, mode="ab")
+    np.save(os.path.join(index_dir, OFFSETS_FILE + ".tmp.npy"), np.asarray(offsets, dtype=np.int64))
+    os.replace(os.path.join(index_dir, OFFSETS_FILE + ".tmp.npy"), offsets_path)
+    return list(range(first_id, len(offsets) - 1))
+
+
+def write_index(index, index_dir):
+    tmp_path = os.path.join(index_dir, INDEX_FILE + ".tmp")
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, os.path.join(index_dir, INDEX_FILE))
+
+
+def read_index(path):
+    # Memory-map the index where the FAISS build supports it, otherwise read it normally
+    try:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        return faiss.read_index(path)
+
+
+def open_vector_store(index_dir, embeddings):
+    index = read_index(os.path.join(index_dir, INDEX_FILE))
+    # Search the compressed copy when there is one (see index_modes.py). If a crash left
+    # it out of step with the exact index, fall back to exact search until the next ingest.
+    search_path = os.path.join(index_dir, SEARCH_INDEX_FILE)
+    if os.path.exists(search_path):
+        search_index = read_index(search_path)
+        if search_index.ntotal == index.ntotal:
+            index = search_index
+    docstore = MmapDocStore(index_dir)
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=RowIdMapping(len(docstore)),
+    )
+
+
+def index_version(index_dir):
+    """Changes whenever ingest replaces the exact or the compressed index."""
+    version = os.stat(os.path.join(index_dir, INDEX_FILE)).st_mtime_ns
+    search_path = os.path.join(index_dir, SEARCH_INDEX_FILE)
+    return (version, os.stat(search_path).st_mtime_ns if os.path.exists(search_path) else None)
+
+
+def index_exists(index_dir):
+    return all(os.path.exists(os.path.join(index_dir, name)) for name in (INDEX_FILE, DOCS_FILE, OFFSETS_FILE))
@@ -4,16 +4,23 @@ st.set_page_config(page_title="Nigerian Fusion Generator", page_icon="🇳🇬")
 
 st.title("🇳🇬 Nigerian Fusion Food Name Generator")
 
+COUNTRIES = ("India", "Italy", "Mexico", "Saudi Arabia", "USA",
+             "China", "Japan", "Brazil", "South Africa", "Australia")
+
 # sidebar selection for the user
-country = st.sidebar.selectbox(
-    "Pick a Country",
-    ("India", "Italy", "Mexico", "Saudi Arabia", "USA",
-     "China", "Japan", "Brazil", "South Africa", "Australia")
-)
+country = st.sidebar.selectbox("Pick a Country", COUNTRIES)
+
+# batch mode: generate every country concurrently so switching countries afterwards is instant
+if st.sidebar.button("Generate all countries"):
+    with st.spinner("Creating concepts for every country..."):
+        all_results = restaurant.generate_for_countries(COUNTRIES)
+    with st.sidebar.expander("All concepts", expanded=True):
+        for name, result in all_results.items():
+            st.write(f"**{name}:** {result['restaurant_name'].strip()}")
 
 # when a country is selected, generate the content
 if country:
-    # use the function from your restaurant.py file
+    # use the function from your restaurant.py file (memoized, so reruns don't call the LLM again)
     with st.spinner(f"Creating a Nigerian-fusion concept for {country}..."):
         response = restaurant.generate_restaurant_name_and_items(country)
 
@@ -1,54 +1,129 @@
 import os
+import sys
+import asyncio
+import threading
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import RunnablePassthrough, ConfigurableField
+
+# Make the repo-level "shared" package importable when running from this folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared.tracing import callbacks
 
 load_dotenv()
 
 # keep temperature high for creativity
-llm = ChatGroq(model="llama-3.3-70b-versatile", temperature=0.7)
+DEFAULT_TEMPERATURE = 0.7
+# how many countries we generate for at the same time in batch mode
+MAX_CONCURRENCY = 4
+
+# no response cache: at this temperature asking again for the same country should give new names.
+# temperature and model_kwargs (where the seed goes) can be changed per call through the config,
+# so one compiled chain serves every setting.
+llm = ChatGroq(model="llama-3.3-70b-versatile", temperature=DEFAULT_TEMPERATURE).configurable_fields(
+    temperature=ConfigurableField(id="temperature"),
+    model_kwargs=ConfigurableField(id="model_kwargs"),
+)
 parser = StrOutputParser()
 
+# STRATEGY: Use "Positive Constraints"
+# Instead of "Suggest a fancy name", we ask for specific linguistic blends.
+# This forces the model to dig deeper into its vocabulary (Yoruba, Igbo, etc.)
+prompt_template_name = PromptTemplate.from_template(
+    """
+    I want to open a modern Nigerian restaurant in {country}.
+
+    Generate a sophisticated restaurant name that blends a specific Nigerian word 
+    (from Yoruba, Igbo, or Hausa) with a word or concept from {country}'s local language.
+
+    Focus on themes like:
+    - Specific Ingredients (e.g., Pepper, Basil, Yam)
+    - Geography (Rivers, Islands, Cities)
+    - Abstract Concepts (Joy, Soul, Taste)
+
+    Return ONLY the name.
+    """
+)
+
+# Menu prompt remains similar but ensures it matches the new fancy vibe
+prompt_template_items = PromptTemplate.from_template(
+    "Suggest 5 avant-garde fusion dishes for a restaurant named '{restaurant_name}' located in {country}. "
+    "Return it as a comma-separated string."
+)
+
+# Built once at import: name first, then the menu (which needs the name)
+chain = (
+        {"restaurant_name": prompt_template_name | llm | parser, "country": RunnablePassthrough()}
+        | RunnablePassthrough.assign(menu_items=prompt_template_items | llm | parser)
+)
 
-def generate_restaurant_name_and_items(country):
-    # STRATEGY: Use "Positive Constraints"
-    # Instead of "Suggest a fancy name", we ask for specific linguistic blends.
-    # This forces the model to dig deeper into its vocabulary (Yoruba, Igbo, etc.)
+# Results memoized per (country, temperature, seed) so reruns don't pay for two LLM calls again
+_results = {}
+_results_lock = threading.Lock()
 
-    prompt_template_name = PromptTemplate.from_template(
-        """
-        I want to open a modern Nigerian restaurant in {country}.
 
-        Generate a sophisticated restaurant name that blends a specific Nigerian word 
-        (from Yoruba, Igbo, or Hausa) with a word or concept from {country}'s local language.
+def _config(temperature, seed, max_concurrency=None):
+    config = {"configurable": {"temperature": temperature, "model_kwargs": {"seed": seed} if seed is not None else {}},
+              "callbacks": callbacks()}
+    if max_concurrency is not None:
+        config["max_concurrency"] = max_concurrency
+    return config
 
-        Focus on themes like:
-        - Specific Ingredients (e.g., Pepper, Basil, Yam)
-        - Geography (Rivers, Islands, Cities)
-        - Abstract Concepts (Joy, Soul, Taste)
 
-        Return ONLY the name.
-        """
-    )
+def generate_restaurant_name_and_items(country, temperature=DEFAULT_TEMPERATURE, seed=None):
+    key = (country, temperature, seed)
+    with _results_lock:
+        if key in _results:
+            return _results[key]
 
-    # Menu prompt remains similar but ensures it matches the new fancy vibe
-    prompt_template_items = PromptTemplate.from_template(
-        "Suggest 5 avant-garde fusion dishes for a restaurant named '{restaurant_name}' located in {country}. "
-        "Return it as a comma-separated string."
-    )
+    result = chain.invoke(country, config=_config(temperature, seed))
+    with _results_lock:
+        _results[key] = result
+    return result
 
-    chain = (
-            {"restaurant_name": prompt_template_name | llm | parser, "country": RunnablePassthrough()}
-            | RunnablePassthrough.assign(menu_items=prompt_template_items | llm | parser)
-    )
 
-    return chain.invoke(country)
+def generate_for_countries(countries, temperature=DEFAULT_TEMPERATURE, seed=None, max_concurrency=MAX_CONCURRENCY):
+    """
+    Generates name + menu for many countries at once with chain.batch, at most
+    max_concurrency countries in flight. Already generated countries are reused.
+    Returns {country: result}.
+    """
+    with _results_lock:
+        missing = [country for country in dict.fromkeys(countries) if (country, temperature, seed) not in _results]
+
+    if missing:
+        outputs = chain.batch(missing, config=_config(temperature, seed, max_concurrency))
+        with _results_lock:
+            for country, result in zip(missing, outputs):
+                _results[(country, temperature, seed)] = result
+
+    with _results_lock:
+        return {country: _results[(country, temperature, seed)] for country in countries}
+
+
+async def agenerate_for_countries(countries, temperature=DEFAULT_TEMPERATURE, seed=None, max_concurrency=MAX_CONCURRENCY):
+    """Async version of generate_for_countries (uses chain.abatch)."""
+    with _results_lock:
+        missing = [country for country in dict.fromkeys(countries) if (country, temperature, seed) not in _results]
+
+    if missing:
+        outputs = await chain.abatch(missing, config=_config(temperature, seed, max_concurrency))
+        with _results_lock:
+            for country, result in zip(missing, outputs):
+                _results[(country, temperature, seed)] = result
+
+    with _results_lock:
+        return {country: _results[(country, temperature, seed)] for country in countries}
 
 
 if __name__ == "__main__":
     result = generate_restaurant_name_and_items("China")
     print(f"--- Results for {result.get('country', 'Selected Country')} ---")
     print(f"Restaurant Name: {result['restaurant_name']}")
-    print(f"Menu Items: {result['menu_items']}")
\ No newline at end of file
+    print(f"Menu Items: {result['menu_items']}")
+
+    # Batch mode: several countries concurrently
+    for country, result in asyncio.run(agenerate_for_countries(["India", "Italy", "Mexico"])).items():
+        print(f"{country}: {result['restaurant_name'].strip()}")
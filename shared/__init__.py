@@ -0,0 +1,3 @@
+# Helpers shared by the apps in this repo (caching, etc.)
+# The apps run as plain scripts from their own folder, so they add the repo root
+# to sys.path before importing from here.
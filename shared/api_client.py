@@ -0,0 +1,58 @@
+import os
+import json
+import urllib.error
+import urllib.request
+
+# Where api_server/server.py is listening, e.g. "http://127.0.0.1:8000".
+# Unset means the Streamlit apps do everything in their own process, as before.
+API_URL = os.getenv("GENAI_API_URL", "").rstrip("/")
+# LLM calls can queue behind others on the server, so be generous
+TIMEOUT_SECONDS = float(os.getenv("GENAI_API_TIMEOUT", "120"))
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def call(path, payload, api_url=None, timeout=TIMEOUT_SECONDS):
+    """POSTs a JSON payload to the API server and returns the decoded JSON response."""
+    request = urllib.request.Request(
+        (api_url or API_URL) + path,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        # The server answers errors as {"error": "..."}; fall back to the raw body
+        body = e.read().decode("utf-8", errors="replace")
+        try:
+            message = json.loads(body)["error"]
+        except (ValueError, KeyError, TypeError):
+            message = body or e.reason
+        raise ApiError(f"API server returned {e.code}: {message}", status=e.code) from None
+    except urllib.error.URLError as e:
+        raise ApiError(f"API server unreachable at {api_url or API_URL}: {e.reason}") from None
+
+
+def generate_post(length, tag, topic, api_url=None):
+    return call("/v1/linkedin/post", {"length": length, "tag": tag, "topic": topic}, api_url)["post"]
+
+
+def news_query(question, rerank=False, token_budget=None, collection=None, api_url=None):
+    """{"answer", "sources": [{"source", "score", "truncated"}], "context": packing stats}"""
+    payload = {"question": question, "rerank": rerank}
+    if collection:
+        payload["collection"] = collection
+    if token_budget is not None:
+        payload["token_budget"] = int(token_budget)
+    return call("/v1/news/query", payload, api_url)
+
+
+def tshirt_question(question, api_url=None):
+    """{"answer", "sql", "db_result", "plan_cache_hit"}"""
+    return call("/v1/tshirt/question", {"question": question}, api_url)
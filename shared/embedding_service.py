@@ -0,0 +1,203 @@
+import os
+import time
+import queue
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from shared.tracing import span
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "embeddings.sqlite")
+)
+
+# Micro-batching: wait at most this long for other callers before running the model
+MAX_BATCH_SIZE = 64
+MAX_WAIT_SECONDS = 0.01
+
+
+class VectorCache:
+    """
+    Persistent text-hash -> vector store in SQLite.
+    Vectors are stored as float32, or as int8 plus one float32 scale per vector
+    (symmetric absmax quantization, 4x smaller) when quantize=True.
+    """
+
+    def __init__(self, db_path=DEFAULT_CACHE_PATH, quantize=False):
+        self.quantize = quantize
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, dtype TEXT, scale REAL, data BLOB)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            # SQLite caps the number of bound parameters, so look up in slices
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                for key, dtype, scale, data in self._conn.execute(
+                        f"SELECT key, dtype, scale, data FROM vectors WHERE key IN ({placeholders})", batch):
+                    if dtype == "int8":
+                        found[key] = np.frombuffer(data, dtype=np.int8).astype(np.float32) * scale
+                    else:
+                        found[key] = np.frombuffer(data, dtype=np.float32)
+        return found
+
+    def put_many(self, items):
+        rows = []
+        for key, vector in items:
+            vector = np.asarray(vector, dtype=np.float32)
+            if self.quantize:
+                scale = float(np.abs(vector).max()) / 127 or 1.0
+                rows.append((key, "int8", scale, np.round(vector / scale).astype(np.int8).tobytes()))
+            else:
+                rows.append((key, "float32", 1.0, vector.tobytes()))
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO vectors VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+
+class EmbeddingService(Embeddings):
+    """
+    One sentence-transformers model per process, exposed as a LangChain Embeddings object.
+    - Texts already in the persistent cache are never re-embedded (across runs and apps).
+    - Concurrent callers are merged into larger batches by a background worker,
+      so several Streamlit sessions share one model.encode call.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL, normalize=False, cache=None,
+                 max_batch_size=MAX_BATCH_SIZE, max_wait_seconds=MAX_WAIT_SECONDS):
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        self.model_name = model_name
+        self.normalize = normalize
+        self.model = HuggingFaceEmbeddings(
+            model_name=model_name,
+            model_kwargs={'device': 'cpu'},
+            encode_kwargs={'normalize_embeddings': normalize}
+        )
+        self.cache = cache if cache is not None else VectorCache()
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+        self._stats_lock = threading.Lock()
+        self.texts_encoded = 0
+        self.batches = 0
+        self.encode_seconds = 0.0
+        self.cache_hits = 0
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.model_name}\x00{self.normalize}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _run(self):
+        while True:
+            requests = [self._queue.get()]
+            size = len(requests[0][0])
+            deadline = time.monotonic() + self.max_wait_seconds
+            # Gather whatever else arrives within the wait window, up to the batch size
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                requests.append(request)
+                size += len(request[0])
+
+            # Different callers often ask for the same text at the same time; encode it once
+            texts = list(dict.fromkeys(text for request_texts, _ in requests for text in request_texts))
+            try:
+                start = time.perf_counter()
+                vectors = dict(zip(texts, self.model.embed_documents(texts)))
+                elapsed = time.perf_counter() - start
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+
+            with self._stats_lock:
+                self.texts_encoded += len(texts)
+                self.batches += 1
+                self.encode_seconds += elapsed
+
+            for request_texts, future in requests:
+                future.set_result([vectors[text] for text in request_texts])
+
+    def _encode(self, texts):
+        future = Future()
+        self._queue.put((texts, future))
+        return future.result()
+
+    def embed_documents(self, texts):
+        with span("embedding", texts=len(texts)) as attrs:
+            vectors, cached = self._embed(texts)
+            attrs["cached"] = cached
+            attrs["cache_hit"] = cached == len(texts)
+        return vectors
+
+    def _embed(self, texts):
+        """Returns (vectors, how many came from the cache)."""
+        keys = [self._key(text) for text in texts]
+        found = self.cache.get_many(list(set(keys)))
+
+        # Encode each missing text once, even if it appears several times in this call
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+
+        cached = len(texts) - sum(1 for key in keys if key in missing)
+        with self._stats_lock:
+            self.cache_hits += cached
+
+        if missing:
+            vectors = self._encode(list(missing.values()))
+            new_items = list(zip(missing.keys(), vectors))
+            self.cache.put_many(new_items)
+            found.update((key, np.asarray(vector, dtype=np.float32)) for key, vector in new_items)
+
+        return [found[key].tolist() for key in keys], cached
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "texts_encoded": self.texts_encoded,
+                "batches": self.batches,
+                "cache_hits": self.cache_hits,
+                "encode_seconds": self.encode_seconds,
+                "texts_per_sec": self.texts_encoded / self.encode_seconds if self.encode_seconds else 0.0,
+            }
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_embedding_service(model_name=DEFAULT_MODEL, normalize=False):
+    """Returns the process-wide service for this model, loading it on first use."""
+    key = (model_name, normalize)
+    with _services_lock:
+        if key not in _services:
+            _services[key] = EmbeddingService(model_name, normalize)
+        return _services[key]
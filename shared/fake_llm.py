@@ -0,0 +1,184 @@
+import re
+import time
+import random
+import asyncio
+import hashlib
+from typing import Any, Callable, Optional
+
+import numpy as np
+from pydantic import ConfigDict
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# Defaults used by every fake model unless install() or the constructor overrides them.
+# Roughly what Groq feels like from here: a short wait, then a few hundred tokens/sec.
+SETTINGS = {
+    "latency_seconds": 0.2,
+    "tokens_per_sec": 300.0,
+    "response_tokens": 60,
+    "responder": None,
+    "embedding_seconds_per_text": 0.0005,
+}
+
+WORDS = ("data", "model", "pipeline", "supply", "chain", "cloud", "latency", "agent", "query",
+         "vector", "insight", "team", "scale", "cost", "python", "batch", "stream", "cache")
+
+
+def seeded_random(text):
+    return random.Random(int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:16], 16))
+
+
+def default_response(prompt, response_tokens):
+    """Same prompt -> same words, so runs (and the response cache) behave deterministically."""
+    rng = seeded_random(prompt)
+    return " ".join(rng.choice(WORDS) for _ in range(response_tokens))
+
+
+def prompt_text(messages):
+    return "\n".join(str(message.content) for message in messages)
+
+
+def apply_stop(text, stop):
+    for token in stop or []:
+        index = text.find(token)
+        if index != -1:
+            text = text[:index]
+    return text
+
+
+def split_tokens(text):
+    # Words with their trailing whitespace, so joining the chunks gives back the exact text
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for ChatGroq: waits `latency_seconds` before the first
+    token, then emits tokens at `tokens_per_sec`. The text comes from `responder(prompt)`
+    when given, otherwise a fixed pseudo-random sentence derived from the prompt.
+    Accepts (and ignores) ChatGroq's constructor arguments, so it can replace it as-is.
+    """
+
+    model_config = ConfigDict(extra="ignore", arbitrary_types_allowed=True)
+
+    model_name: str = "fake-chat"
+    temperature: float = 0.0
+    model_kwargs: dict = {}
+    latency_seconds: Optional[float] = None
+    tokens_per_sec: Optional[float] = None
+    response_tokens: Optional[int] = None
+    responder: Optional[Callable[[str], str]] = None
+
+    @property
+    def _llm_type(self):
+        return "fake-chat"
+
+    @property
+    def _identifying_params(self):
+        # Part of the response cache key, like model name and temperature are for ChatGroq
+        return {"model_name": self.model_name, "temperature": self.temperature, "model_kwargs": self.model_kwargs}
+
+    def _setting(self, name):
+        value = getattr(self, name)
+        return SETTINGS[name] if value is None else value
+
+    def _respond(self, messages, stop):
+        prompt = prompt_text(messages)
+        responder = self._setting("responder")
+        text = responder(prompt) if responder else default_response(prompt, self._setting("response_tokens"))
+        text = apply_stop(text, stop)
+        usage = {"input_tokens": len(prompt.split()), "output_tokens": len(split_tokens(text))}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        return text, usage
+
+    def _token_delay(self):
+        rate = self._setting("tokens_per_sec")
+        return 1.0 / rate if rate else 0.0
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        text, usage = self._respond(messages, stop)
+        time.sleep(self._setting("latency_seconds") + usage["output_tokens"] * self._token_delay())
+        message = AIMessage(content=text, usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        text, usage = self._respond(messages, stop)
+        await asyncio.sleep(self._setting("latency_seconds") + usage["output_tokens"] * self._token_delay())
+        message = AIMessage(content=text, usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        text, usage = self._respond(messages, stop)
+        time.sleep(self._setting("latency_seconds"))
+        delay = self._token_delay()
+        for token in split_tokens(text):
+            time.sleep(delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        # Usage goes on the last chunk, the way Groq reports it
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=usage))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        text, usage = self._respond(messages, stop)
+        await asyncio.sleep(self._setting("latency_seconds"))
+        delay = self._token_delay()
+        for token in split_tokens(text):
+            await asyncio.sleep(delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=usage))
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Hashed bag-of-words vectors (normalized), so texts sharing words still land
+    close together and similarity search behaves sensibly without a model download.
+    Accepts HuggingFaceEmbeddings' constructor arguments.
+    """
+
+    def __init__(self, model_name="fake-embeddings", model_kwargs=None, encode_kwargs=None, dimensions=384, **kwargs):
+        self.model_name = model_name
+        self.dimensions = dimensions
+
+    def _vector(self, text):
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            digest = hashlib.md5(word.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        time.sleep(SETTINGS["embedding_seconds_per_text"] * len(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def install(**settings):
+    """
+    Swaps ChatGroq and HuggingFaceEmbeddings for the fakes above. Call it before
+    importing an app module (they bind `from langchain_groq import ChatGroq` at import).
+    Keyword arguments update SETTINGS, e.g. install(latency_seconds=0.05, responder=fn).
+    """
+    unknown = set(settings) - set(SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown fake LLM settings: {sorted(unknown)}")
+    SETTINGS.update(settings)
+
+    import langchain_groq
+    langchain_groq.ChatGroq = FakeChatModel
+    try:
+        import langchain_huggingface
+        langchain_huggingface.HuggingFaceEmbeddings = FakeEmbeddings
+    except ImportError:
+        # Fine when the embedding package isn't installed: nothing can load the real model either
+        pass
@@ -0,0 +1,194 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+from shared.tracing import span
+
+# Where the on-disk tier lives; can be overridden per machine
+DEFAULT_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "llm_cache.sqlite")
+)
+
+
+class TieredLLMCache(BaseCache):
+    """
+    Content-addressed LLM response cache with two tiers:
+    1. An in-memory LRU dict for the current process (Streamlit reruns hit this).
+    2. A SQLite file on disk, shared across processes and restarts.
+
+    LangChain hands us the rendered prompt plus an "llm_string" that already
+    contains the model name, temperature and other params, so hashing the two
+    together gives a key that changes whenever any of them change.
+    """
+
+    def __init__(self, db_path=DEFAULT_CACHE_PATH, max_memory_entries=512,
+                 max_disk_bytes=256 * 1024 * 1024, ttl_seconds=7 * 24 * 3600):
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._memory = OrderedDict()  # key -> (created_at, generations)
+        self._lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        # One connection guarded by our lock; Streamlit calls us from several threads
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT, size INTEGER, created_at REAL, last_access REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache(last_access)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache(created_at)")
+        self._conn.commit()
+        # Running size of the disk tier, so a write doesn't have to SUM the whole table.
+        # Other processes sharing the file can make it drift; it's re-counted before evicting.
+        self._disk_bytes = self._count_disk_bytes()
+
+    @staticmethod
+    def make_key(prompt, llm_string):
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at, now):
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def lookup(self, prompt, llm_string):
+        with span("llm_cache") as attrs:
+            generations = self._lookup(prompt, llm_string)
+            attrs["cache_hit"] = generations is not None
+        return generations
+
+    def _lookup(self, prompt, llm_string):
+        key = self.make_key(prompt, llm_string)
+        now = time.time()
+
+        with self._lock:
+            # Tier 1: memory
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, generations = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self.hits_memory += 1
+                    return generations
+                del self._memory[key]
+
+            # Tier 2: disk
+            row = self._conn.execute(
+                "SELECT value, created_at, size FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created_at, size = row
+            if self._expired(created_at, now):
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self._disk_bytes -= size
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            generations = loads(value)
+            self._remember(key, created_at, generations)
+            self.hits_disk += 1
+            return generations
+
+    def update(self, prompt, llm_string, return_val):
+        key = self.make_key(prompt, llm_string)
+        now = time.time()
+        value = dumps(list(return_val))
+
+        with self._lock:
+            self._remember(key, now, list(return_val))
+            # A replaced row gives its old size back
+            old = self._conn.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now)
+            )
+            self._disk_bytes += len(value) - (old[0] if old else 0)
+            self._evict_disk()
+            self._conn.commit()
+
+    def clear(self, **kwargs):
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+            self._disk_bytes = 0
+
+    def _remember(self, key, created_at, generations):
+        self._memory[key] = (created_at, generations)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _count_disk_bytes(self):
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+
+    def _evict_disk(self):
+        # Drop anything past its TTL (a range scan on the created_at index), then, only once
+        # over budget, the least recently used rows (walking the last_access index)
+        if self.ttl_seconds is not None:
+            cutoff = time.time() - self.ttl_seconds
+            expired = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM llm_cache WHERE created_at < ?", (cutoff,)).fetchone()[0]
+            if expired:
+                self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (cutoff,))
+                self._disk_bytes -= expired
+
+        if self._disk_bytes <= self.max_disk_bytes:
+            return
+        self._disk_bytes = self._count_disk_bytes()
+        # Evict down to 90% of the budget, so the next few writes don't each trigger this again
+        target = int(self.max_disk_bytes * 0.9)
+        while self._disk_bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, size FROM llm_cache ORDER BY last_access LIMIT 256").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self._disk_bytes <= target:
+                    break
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._disk_bytes -= size
+
+    def stats(self):
+        hits = self.hits_memory + self.hits_disk
+        total = hits + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_bytes": self._disk_bytes,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Returns the one cache instance for this process (built on first use)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TieredLLMCache()
+    return _cache
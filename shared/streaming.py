@@ -0,0 +1,43 @@
+import time
+
+
+def stream_with_metrics(chunks, metrics):
+    """
+    Passes streamed LLM output through as plain text while filling `metrics` with
+    time-to-first-token and tokens/sec for the request.
+
+    `chunks` can be message chunks from llm.stream() or strings from a chain that
+    ends in StrOutputParser. When the provider reports usage on the last chunk we use
+    its output token count, otherwise each streamed chunk counts as one token.
+    """
+    start = time.perf_counter()
+    metrics.update({"ttft_seconds": None, "tokens": 0, "total_seconds": 0.0, "tokens_per_sec": 0.0})
+    reported_tokens = None
+
+    for chunk in chunks:
+        text = chunk if isinstance(chunk, str) else chunk.content
+        usage = getattr(chunk, "usage_metadata", None)
+        if usage:
+            reported_tokens = usage.get("output_tokens", reported_tokens)
+
+        if not text:
+            continue
+        if metrics["ttft_seconds"] is None:
+            metrics["ttft_seconds"] = time.perf_counter() - start
+        metrics["tokens"] += 1
+        yield text
+
+    metrics["total_seconds"] = time.perf_counter() - start
+    if reported_tokens:
+        metrics["tokens"] = reported_tokens
+    # Generation rate after the first token arrived, which is what the reader actually sees
+    generation_seconds = metrics["total_seconds"] - (metrics["ttft_seconds"] or 0.0)
+    if generation_seconds > 0:
+        metrics["tokens_per_sec"] = metrics["tokens"] / generation_seconds
+
+
+def format_metrics(metrics):
+    ttft = metrics.get("ttft_seconds")
+    ttft_text = f"{ttft:.2f}s" if ttft is not None else "n/a"
+    return (f"First token in {ttft_text} · {metrics.get('tokens', 0)} tokens "
+            f"in {metrics.get('total_seconds', 0.0):.2f}s ({metrics.get('tokens_per_sec', 0.0):.1f} tokens/sec)")
@@ -0,0 +1,399 @@
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import queue
+import atexit
+import sqlite3
+import threading
+import contextvars
+from functools import wraps
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Tracing is on by default; set TRACING=0 to turn every span into a no-op
+TRACING_ENABLED = os.getenv("TRACING", "1") == "1"
+
+# Spans go to a JSONL file by default; a path ending in .sqlite / .db uses a SQLite table instead
+DEFAULT_TRACE_PATH = os.getenv(
+    "TRACE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "traces.jsonl")
+)
+
+# Traces stop growing at about this size: the JSONL file rolls over to <path>.1 (replacing the
+# previous one), and the SQLite table drops its oldest quarter of spans
+MAX_TRACE_BYTES = int(float(os.getenv("TRACE_MAX_MB", "64")) * 1024 * 1024)
+
+# The writer thread drains the queue at least this often; callers never wait on disk
+FLUSH_INTERVAL_SECONDS = 1.0
+MAX_QUEUE_SIZE = 10000
+
+# (trace_id, span_id) of the span we're currently inside, so nested spans link up
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+def new_id():
+    return uuid.uuid4().hex[:16]
+
+
+# --- Sinks ---
+
+class JsonlSink:
+    """Appends one JSON line per span, rolling over to <path>.1 past max_bytes."""
+
+    def __init__(self, path, max_bytes=MAX_TRACE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def write_many(self, records):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, default=str) + "\n")
+            size = f.tell()
+        if size > self.max_bytes:
+            # At most two files' worth on disk; the older half of the history goes
+            os.replace(self.path, self.path + ".1")
+
+    def read_all(self):
+        records = []
+        for path in (self.path + ".1", self.path):
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        try:
+                            records.append(json.loads(line))
+                        except json.JSONDecodeError:
+                            # A line cut short by a crash; skip it rather than losing the report
+                            continue
+        return records
+
+
+class SQLiteSink:
+    """Stores spans in a `spans` table; the stage/duration columns make ad-hoc SQL easy."""
+
+    def __init__(self, path, max_bytes=MAX_TRACE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS spans ("
+            "span_id TEXT, trace_id TEXT, parent_id TEXT, stage TEXT, name TEXT, "
+            "start REAL, duration_ms REAL, attrs TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_spans_stage ON spans(stage)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def write_many(self, records):
+        rows = [(r["span_id"], r["trace_id"], r["parent_id"], r["stage"], r["name"], r["start"],
+                 r["duration_ms"], json.dumps(r.get("attrs", {}), default=str)) for r in records]
+        with self._lock:
+            self._conn.executemany("INSERT INTO spans VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+            # Pages in use; pages freed by an earlier trim are reused before the file grows
+            used_pages = (self._conn.execute("PRAGMA page_count").fetchone()[0]
+                          - self._conn.execute("PRAGMA freelist_count").fetchone()[0])
+            if used_pages * self._conn.execute("PRAGMA page_size").fetchone()[0] > self.max_bytes:
+                # Oldest spans first (rowid order)
+                self._conn.execute(
+                    "DELETE FROM spans WHERE rowid < (SELECT MIN(rowid) FROM spans) + (SELECT COUNT(*) FROM spans) / 4")
+                self._conn.commit()
+
+    def read_all(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT span_id, trace_id, parent_id, stage, name, start, duration_ms, attrs FROM spans"
+            ).fetchall()
+        return [{"span_id": row[0], "trace_id": row[1], "parent_id": row[2], "stage": row[3], "name": row[4],
+                 "start": row[5], "duration_ms": row[6], "attrs": json.loads(row[7] or "{}")} for row in rows]
+
+
+def open_sink(path):
+    if path.endswith((".sqlite", ".db")):
+        return SQLiteSink(path)
+    return JsonlSink(path)
+
+
+# --- Tracer ---
+
+class Tracer:
+    """
+    Collects finished spans on an in-memory queue and writes them out in batches
+    from a background thread, so recording a span costs a dict and a queue.put.
+    If the queue ever fills up (sink stuck), spans are dropped and counted
+    instead of slowing the app down.
+    """
+
+    def __init__(self, sink, flush_interval=FLUSH_INTERVAL_SECONDS, max_queue_size=MAX_QUEUE_SIZE):
+        self.sink = sink
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._write_lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name="tracing-writer", daemon=True)
+        self._worker.start()
+
+    def record(self, record):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self):
+        records = []
+        while True:
+            try:
+                records.append(self._queue.get_nowait())
+            except queue.Empty:
+                return records
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        with self._write_lock:
+            records = self._drain()
+            if records:
+                try:
+                    self.sink.write_many(records)
+                except Exception as e:
+                    print(f"tracing: could not write {len(records)} spans: {e}")
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """Returns the process-wide tracer (built on first use)."""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer(open_sink(DEFAULT_TRACE_PATH))
+                atexit.register(_tracer.flush)
+    return _tracer
+
+
+def _finish(stage, name, trace_id, span_id, parent_id, start_wall, duration_seconds, attrs):
+    get_tracer().record({
+        "span_id": span_id,
+        "trace_id": trace_id,
+        "parent_id": parent_id,
+        "stage": stage,
+        "name": name or stage,
+        "start": start_wall,
+        "duration_ms": duration_seconds * 1000.0,
+        "attrs": attrs,
+    })
+
+
+@contextmanager
+def span(stage, name=None, **attrs):
+    """
+    Times the block as one span of `stage`. Yields the attrs dict so the block can
+    add what it learns along the way (token counts, cache_hit, rows...).
+    Spans opened inside the block become its children and share its trace_id.
+    """
+    if not TRACING_ENABLED:
+        yield attrs
+        return
+
+    parent = _current.get()
+    trace_id = parent[0] if parent else new_id()
+    span_id = new_id()
+    token = _current.set((trace_id, span_id))
+    start_wall = time.time()
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        try:
+            _current.reset(token)
+        except ValueError:
+            # Closed from a different context (e.g. a generator finished by another thread)
+            _current.set(parent)
+        _finish(stage, name, trace_id, span_id, parent[1] if parent else None, start_wall, duration, attrs)
+
+
+def traced(stage):
+    """Decorator version of span() for wrapping a whole function."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage, name=func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- LangChain callbacks ---
+
+def _token_usage(response):
+    """Pulls input/output token counts out of an LLMResult, whichever way the provider reported them."""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return usage.get("prompt_tokens"), usage.get("completion_tokens")
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if metadata:
+                return metadata.get("input_tokens"), metadata.get("output_tokens")
+    return None, None
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Turns LangChain callback events into spans: one "llm" span per model call
+    (with token counts and time to first token when streaming), one "retrieval"
+    span per retriever call and one "prompt" span per prompt template render.
+    Runs are linked to whatever span() is open when the chain is invoked.
+    """
+
+    def __init__(self):
+        self._runs = {}  # run_id -> [stage, name, trace_id, span_id, parent_id, start_wall, start_perf, attrs]
+
+    def _start(self, run_id, stage, name, **attrs):
+        if not TRACING_ENABLED:
+            return
+        parent = _current.get()
+        trace_id = parent[0] if parent else new_id()
+        self._runs[run_id] = [stage, name, trace_id, new_id(), parent[1] if parent else None,
+                              time.time(), time.perf_counter(), attrs]
+
+    def _end(self, run_id, **attrs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        stage, name, trace_id, span_id, parent_id, start_wall, start_perf, run_attrs = run
+        run_attrs.update(attrs)
+        _finish(stage, name, trace_id, span_id, parent_id, start_wall,
+                time.perf_counter() - start_perf, run_attrs)
+
+    @staticmethod
+    def _name(serialized, kwargs, default):
+        if kwargs.get("name"):
+            return kwargs["name"]
+        if serialized:
+            return serialized.get("name") or (serialized.get("id") or [default])[-1]
+        return default
+
+    # LLM calls
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, "llm", self._name(serialized, kwargs, "chat_model"))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, "llm", self._name(serialized, kwargs, "llm"))
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        run = self._runs.get(run_id)
+        if run is not None and token and "ttft_ms" not in run[7]:
+            run[7]["ttft_ms"] = (time.perf_counter() - run[6]) * 1000.0
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        input_tokens, output_tokens = _token_usage(response)
+        self._end(run_id, input_tokens=input_tokens, output_tokens=output_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=type(error).__name__)
+
+    # Retrieval
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._start(run_id, "retrieval", self._name(serialized, kwargs, "retriever"))
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end(run_id, documents=len(documents))
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=type(error).__name__)
+
+    # Prompt assembly (prompt templates report as chains); other chain steps are left out
+    def on_chain_start(self, serialized, inputs, *, run_id, **kwargs):
+        name = self._name(serialized, kwargs, "chain")
+        if "Prompt" in name:
+            self._start(run_id, "prompt", name)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=type(error).__name__)
+
+
+_handler = TracingCallbackHandler()
+
+
+def callbacks():
+    """Callbacks list to pass as config={"callbacks": callbacks()} on invoke/stream/batch."""
+    return [_handler] if TRACING_ENABLED else []
+
+
+# --- Report ---
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def load_spans(path=DEFAULT_TRACE_PATH):
+    if _tracer is not None and _tracer.sink.path == path:
+        _tracer.flush()
+    if not os.path.exists(path) and not os.path.exists(path + ".1"):
+        return []
+    return open_sink(path).read_all()
+
+
+def summarize(spans):
+    """Per-stage count, p50/p95/mean latency, cache hit rate and token totals."""
+    by_stage = {}
+    for record in spans:
+        by_stage.setdefault(record["stage"], []).append(record)
+
+    summary = {}
+    for stage, records in sorted(by_stage.items()):
+        durations = sorted(record["duration_ms"] for record in records)
+        attrs = [record.get("attrs") or {} for record in records]
+        cache_flags = [a["cache_hit"] for a in attrs if a.get("cache_hit") is not None]
+        summary[stage] = {
+            "count": len(records),
+            "p50_ms": percentile(durations, 50),
+            "p95_ms": percentile(durations, 95),
+            "mean_ms": sum(durations) / len(durations),
+            "cache_hit_rate": sum(1 for flag in cache_flags if flag) / len(cache_flags) if cache_flags else None,
+            "output_tokens": sum(a.get("output_tokens") or 0 for a in attrs),
+            "errors": sum(1 for a in attrs if a.get("error")),
+        }
+    return summary
+
+
+def format_summary(summary):
+    lines = [f"{'stage':<16}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}{'cache hit':>11}{'tokens':>9}"]
+    for stage, row in summary.items():
+        hit_rate = f"{row['cache_hit_rate']:.0%}" if row["cache_hit_rate"] is not None else "-"
+        lines.append(f"{stage:<16}{row['count']:>8}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+                     f"{row['mean_ms']:>10.1f}{hit_rate:>11}{row['output_tokens']:>9}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # Usage (from the repo root): python -m shared.tracing [path-to-traces.jsonl|.sqlite]
+    trace_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_TRACE_PATH
+    print(format_summary(summarize(load_spans(trace_path))))
@@ -1,22 +1,114 @@
 import os
+import re
+import sys
+import time
+import hashlib
+import threading
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain_community.utilities import SQLDatabase
 from langchain_experimental.sql import SQLDatabaseChain
 from langchain_community.vectorstores import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_core.example_selectors import SemanticSimilarityExampleSelector
 from langchain_core.prompts import FewShotPromptTemplate, PromptTemplate
 from sqlalchemy import create_engine
 
 # Import the training examples from our separate file(few_shot.py)
 from few_shots import few_shots
+from plan_cache import PlanCache
+from result_cache import ResultCache, SummaryMirror, TableVersions
+
+# Make the repo-level "shared" package importable when running from this folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared.llm_cache import get_llm_cache
+from shared.embedding_service import get_embedding_service
+from shared.tracing import span, callbacks
 
 # Load secret keys (like DB passwords and API keys) from the .env file
 load_dotenv()
 
+# How long the schema + sample rows snapshot is reused before we ask the database again
+TABLE_INFO_TTL_SECONDS = 600
 
-def get_few_shot_db_chain():
+# Answer the hot aggregates (stock / revenue by brand, color, size) from a local SQLite summary
+USE_SUMMARY_MIRROR = os.getenv("TSHIRT_SUMMARY_MIRROR", "1") == "1"
+
+
+class CachedSQLDatabase(SQLDatabase):
+    """
+    SQLDatabase that keeps the table_info text (schema + sample rows) instead of
+    re-querying the database for it on every question.
+    The snapshot is refreshed after TABLE_INFO_TTL_SECONDS or on refresh_table_info().
+    """
+
+    def __init__(self, *args, table_info_ttl=TABLE_INFO_TTL_SECONDS, use_summary_mirror=USE_SUMMARY_MIRROR, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._table_info_ttl = table_info_ttl
+        self._table_info_cache = {}
+        self._table_info_lock = threading.Lock()
+
+        # Executed SELECTs are cached until the tables they read change
+        self.table_versions = TableVersions(self._engine)
+        self.result_cache = ResultCache(self.table_versions, self.get_usable_table_names())
+        self.summary_mirror = None
+        if use_summary_mirror and {"t_shirts", "discounts"} <= set(self.get_usable_table_names()):
+            self.summary_mirror = SummaryMirror(self._engine, self.table_versions)
+
+    def run(self, command, fetch="all", include_columns=False, **kwargs):
+        # Only the plain "give me all rows" form is cached; anything unusual goes straight through
+        if fetch != "all" or include_columns or kwargs.get("parameters"):
+            return super().run(command, fetch, include_columns, **kwargs)
+
+        with span("sql_execute") as attrs:
+            # Stays True unless the result cache misses and we actually have to run the query
+            attrs["cache_hit"] = True
+
+            def execute():
+                attrs["cache_hit"] = False
+                if self.summary_mirror is not None:
+                    result = self.summary_mirror.answer(command)
+                    if result is not None:
+                        attrs["source"] = "summary_mirror"
+                        return result
+                attrs["source"] = "database"
+                return super(CachedSQLDatabase, self).run(command, fetch, include_columns, **kwargs)
+
+            return self.result_cache.run(command, execute)
+
+    def get_table_info(self, table_names=None):
+        key = tuple(sorted(table_names)) if table_names else None
+        now = time.monotonic()
+        with self._table_info_lock:
+            cached = self._table_info_cache.get(key)
+            if cached is not None and now - cached[0] < self._table_info_ttl:
+                return cached[1]
+
+        table_info = super().get_table_info(table_names)
+        with self._table_info_lock:
+            self._table_info_cache[key] = (now, table_info)
+        return table_info
+
+    def refresh_table_info(self):
+        """Drops the cached table_info and re-reads the schema, so schema_version picks up any change."""
+        self.result_cache.clear()
+        with self._table_info_lock:
+            self._table_info_cache.clear()
+            self._metadata.clear()
+            self._metadata.reflect(views=self._view_support, bind=self._engine,
+                                   only=list(self._usable_tables), schema=self._schema)
+
+    @property
+    def schema_version(self):
+        """A hash of every usable table's columns and types; changes whenever the schema does."""
+        parts = []
+        for table in self._metadata.sorted_tables:
+            if table.name in self._usable_tables:
+                columns = ",".join(f"{column.name}:{column.type}" for column in table.columns)
+                parts.append(f"{table.name}({columns})")
+        return hashlib.sha256(";".join(sorted(parts)).encode("utf-8")).hexdigest()
+
+
+def build_few_shot_db_chain():
     """
     This function sets up the entire AI pipeline:
     1. Connects to the database.
@@ -34,27 +126,26 @@ def get_few_shot_db_chain():
     db_port = os.getenv("DB_PORT")
 
     # Build the connection string and create the engine
-    db_uri = f"mysql+mysqlconnector://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+    # DB_URI overrides the TiDB settings, e.g. "sqlite:///tshirts.db" for a local stand-in
+    db_uri = os.getenv("DB_URI") or f"mysql+mysqlconnector://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
     engine = create_engine(db_uri, pool_pre_ping=True, pool_recycle=300)
 
     # We load sample rows so the AI understands what the data looks like
-    db = SQLDatabase(engine, sample_rows_in_table_info=3)
+    # (cached, so the sample rows are only fetched again when the snapshot expires)
+    db = CachedSQLDatabase(engine, sample_rows_in_table_info=3)
 
     # --- 2. Initialize the LLM ---
     # We use Groq with Llama 3.
     # Important: Temperature is set to 0. We want the AI to be precise (mathematical), not creative.
-    llm = ChatGroq(model_name="llama-3.3-70b-versatile", groq_api_key=os.getenv("GROQ_API_KEY"), temperature=0)
+    # Since the output is deterministic, repeated questions are answered from the shared response cache.
+    llm = ChatGroq(model_name="llama-3.3-70b-versatile", groq_api_key=os.getenv("GROQ_API_KEY"), temperature=0,
+                   cache=get_llm_cache())
 
     # --- 3. Setup 'Few-Shot' Learning ---
     # This part allows the AI to find similar questions we've answered before.
     # We use HuggingFace to turn text into numbers (embeddings).
-    model_kwargs = {'device': 'cpu'}
-    encode_kwargs = {'normalize_embeddings': False}
-    embeddings = HuggingFaceEmbeddings(
-        model_name='sentence-transformers/all-MiniLM-L6-v2',
-        model_kwargs=model_kwargs,
-        encode_kwargs=encode_kwargs
-    )
+    # The shared service loads the model once per process and caches the few-shot vectors on disk.
+    embeddings = get_embedding_service('sentence-transformers/all-MiniLM-L6-v2')
 
     # Store our 'few_shots' examples in a vector database so we can search them
     to_vectorize = [" ".join(example.values()) for example in few_shots]
@@ -108,4 +199,133 @@ def get_few_shot_db_chain():
         return_intermediate_steps=True
     )
 
-    return chain
\ No newline at end of file
+    return chain
+
+
+# The chain is built once per process and shared by every Streamlit session.
+# Everything in it is safe to share: the SQLAlchemy engine pools its own connections,
+# and the prompt, few-shot store and LLM client hold no per-question state.
+_chain = None
+_chain_lock = threading.Lock()
+chain_setup_seconds = None
+
+
+def get_few_shot_db_chain():
+    """Returns the shared chain, building it on first use."""
+    global _chain, chain_setup_seconds
+    with _chain_lock:
+        if _chain is None:
+            start = time.perf_counter()
+            _chain = build_few_shot_db_chain()
+            chain_setup_seconds = time.perf_counter() - start
+        return _chain
+
+
+def refresh_schema():
+    """Forces the next question to re-read the table schema and sample rows."""
+    if _chain is not None:
+        _chain.database.refresh_table_info()
+
+
+_plan_cache = None
+_plan_cache_lock = threading.Lock()
+
+
+def get_plan_cache():
+    global _plan_cache
+    with _plan_cache_lock:
+        if _plan_cache is None:
+            _plan_cache = PlanCache(embeddings=get_embedding_service('sentence-transformers/all-MiniLM-L6-v2'))
+        return _plan_cache
+
+
+# One row with one numeric column, as SQLDatabase.run prints it: "[(310,)]", "[(Decimal('-2805.50'),)]"
+SCALAR_RESULT = re.compile(r"^\[\((?:Decimal\(')?(-?\d+(?:\.\d+)?)(?:'\))?,\)\]$")
+
+
+def describe_result(db_result):
+    """
+    Turns a raw single-value SQL result like "[(Decimal('2805.50'),)]" into a sentence.
+    Anything else (several rows or columns, text) is shown as the database returned it.
+    """
+    match = SCALAR_RESULT.match(str(db_result).strip())
+    if not match:
+        if str(db_result).strip() in ("", "[]"):
+            return "The database didn't return any rows for that."
+        return f"Here is what the database returned: {db_result}"
+    number = match.group(1)
+    # If it has a decimal point (like 2805.50), treat it as Revenue/Money
+    if "." in number:
+        return f"The total amount is ${number}."
+    # If it is just digits (like 310), treat it as a Count/Quantity
+    return f"The total count is {number} items."
+
+
+def format_response(response):
+    """
+    Pulls what the UI (and the API server) shows out of an answer_question response:
+    {"answer", "sql", "db_result", "plan_cache_hit"}.
+    """
+    # Extract internal execution steps
+    steps = response.get('intermediate_steps', [])
+    sql_code = "N/A"
+    db_result = "N/A"
+
+    if isinstance(steps, list) and len(steps) > 1:
+        sql_code = steps[1]
+        for step in steps:
+            if isinstance(step, str) and (step.startswith("[(") or step.startswith("[")):
+                db_result = step
+
+    # Process the final text response
+    final_answer = response['result']
+    final_answer = final_answer.split("SQLQuery:")[-1].split("Answer:")[-1].strip()
+
+    # Fallback Logic: If the AI failed to write English (gave raw SQL)
+    if "SELECT" in final_answer.upper():
+        if db_result != "N/A":
+            # LOGIC: Make the clean number sound natural
+            final_answer = describe_result(db_result)
+        else:
+            final_answer = "I found a result in the database, but couldn't put it into a sentence."
+
+    return {"answer": final_answer, "sql": sql_code, "db_result": str(db_result),
+            "plan_cache_hit": bool(response.get("plan_cache_hit"))}
+
+
+def answer_question(question):
+    """
+    Answers a question, skipping the LLM when we've already generated SQL for
+    the same (or a near-identical) question against the current schema.
+    The response has the same shape as SQLDatabaseChain's, plus "plan_cache_hit".
+    """
+    with span("tshirt_question"):
+        return _answer_question(question)
+
+
+def _answer_question(question):
+    chain = get_few_shot_db_chain()
+    plan_cache = get_plan_cache()
+    schema_version = chain.database.schema_version
+
+    with span("plan_cache") as attrs:
+        sql = plan_cache.lookup(question, schema_version)
+        attrs["cache_hit"] = sql is not None
+    if sql is not None:
+        db_result = chain.database.run(sql)
+        return {
+            "query": question,
+            "result": describe_result(db_result),
+            # Same layout as the chain: [inputs, sql, {"sql_cmd": sql}, result]
+            "intermediate_steps": [{"input": question}, sql, {"sql_cmd": sql}, db_result],
+            "plan_cache_hit": True,
+        }
+
+    # The tracing callbacks split this into prompt assembly, SQL generation (llm) and sql_execute spans
+    response = chain.invoke(question, config={"callbacks": callbacks()})
+    steps = response.get("intermediate_steps", [])
+    # The chain only gets past step 3 if the SQL actually ran, so it's safe to reuse
+    if isinstance(steps, list) and len(steps) > 3 and isinstance(steps[1], str):
+        plan_cache.store(question, steps[1].strip(), schema_version)
+    response["plan_cache_hit"] = False
+    return response
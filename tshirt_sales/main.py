@@ -1,49 +1,31 @@
 import streamlit as st
-import re
-from langchain_helper import get_few_shot_db_chain
+import time
+import langchain_helper
+from langchain_helper import answer_question, format_response, get_plan_cache, refresh_schema
+from shared import api_client
 
 st.title("T Shirts Database Q&A 👕")
 
+# The schema snapshot refreshes on its own every few minutes; this forces it right away
+if st.sidebar.button("Refresh database schema"):
+    refresh_schema()
+
 question = st.text_input("Question: ")
 
 if question:
-    chain = get_few_shot_db_chain()
-
     with st.spinner('Thinking...'):
         try:
-            # 1. Execute the chain
-            response = chain.invoke(question)
-
-            # 2. Extract internal execution steps
-            steps = response.get('intermediate_steps', [])
-            sql_code = "N/A"
-            db_result = "N/A"
-
-            if isinstance(steps, list) and len(steps) > 1:
-                sql_code = steps[1]
-                for step in steps:
-                    if isinstance(step, str) and (step.startswith("[(") or step.startswith("[")):
-                        db_result = step
-
-            # 3. Process the final text response
-            final_answer = response['result']
-            final_answer = final_answer.split("SQLQuery:")[-1].split("Answer:")[-1].strip()
-
-            # 4. Fallback Logic: If the AI failed to write English (gave raw SQL)
-            if "SELECT" in final_answer.upper():
-                if db_result != "N/A":
-                    # Extract the clean number
-                    clean_number = re.sub(r"[^\d.]", "", db_result)
-
-                    # LOGIC: Make it sound natural
-                    # If it has a decimal point (like 2805.50), treat it as Revenue/Money
-                    if "." in clean_number:
-                        final_answer = f"The total amount is ${clean_number}."
-                    # If it is just digits (like 310), treat it as a Count/Quantity
-                    else:
-                        final_answer = f"The total count is {clean_number} items."
-                else:
-                    final_answer = "I found a result in the database, but couldn't put it into a sentence."
+            # 1. Execute the chain (built once per process and reused for every question).
+            # Questions we've already turned into SQL skip the LLM and just run the saved query.
+            # With GENAI_API_URL set, the shared API server answers instead (warm chain, coalesced requests).
+            start = time.perf_counter()
+            if api_client.API_URL:
+                result = api_client.tshirt_question(question)
+            else:
+                # 2-4. Pull the SQL, raw result and a clean sentence out of the chain's steps
+                result = format_response(answer_question(question))
+            question_seconds = time.perf_counter() - start
+            final_answer, sql_code, db_result = result["answer"], result["sql"], result["db_result"]
 
             # 5. Display Output
             st.header("Answer")
@@ -53,5 +35,14 @@ if question:
                 st.code(sql_code, language='sql')
                 st.write(f"Raw Database Output: {db_result}")
 
+            saved_sql = ' (saved SQL, no LLM call)' if result['plan_cache_hit'] else ''
+            if api_client.API_URL:
+                st.caption(f"Answered by {api_client.API_URL} in {question_seconds:.2f}s{saved_sql}")
+            else:
+                plan_stats = get_plan_cache().stats()
+                st.caption(f"Chain setup (once per process): {langchain_helper.chain_setup_seconds:.2f}s · "
+                           f"This question: {question_seconds:.2f}s{saved_sql} · "
+                           f"Plan cache hit rate: {plan_stats['hit_rate']:.0%}")
+
         except Exception as e:
             st.error(f"An error occurred: {e}")
\ No newline at end of file
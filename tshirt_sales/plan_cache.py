@@ -0,0 +1,140 @@
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Words that don't change what a question asks for
+STOPWORDS = {"please", "the", "a", "an", "do", "we", "i", "you", "have", "has", "is", "are",
+             "of", "in", "for", "our", "my", "me", "tell", "can", "could", "there", "left"}
+
+# Words that flip what a question asks for ("not white", "without discounts")
+NEGATIONS = {"not", "no", "without", "except", "excluding", "other", "never", "none"}
+
+# The constants of the few-shot discount formula, (100 - COALESCE(pct_discount, 0)) / 100, aren't filter values
+FORMULA_CONSTANTS = re.compile(r"\(\s*100\s*-|/\s*100(?:\.0+)?\b|coalesce\(\s*[\w.]+\s*,\s*0\s*\)", re.IGNORECASE)
+NUMBER = re.compile(r"(?<![\w.])\d+(?:\.\d+)?(?![\w.])")
+
+# Near-duplicates must be almost identical in meaning to reuse a plan
+SIMILARITY_THRESHOLD = 0.92
+MAX_ENTRIES = 512
+
+
+def normalize_question(question):
+    """Lowercase, unify quotes, drop punctuation and filler words, collapse spaces."""
+    text = question.lower().replace("’", "'").replace("‘", "'")
+    text = re.sub(r"[^\w\s'.-]", " ", text)
+    text = re.sub(r"(?<!\d)\.|\.(?!\d)", " ", text)  # keep decimal points, drop full stops
+    words = [word for word in text.split() if word not in STOPWORDS]
+    return " ".join(words)
+
+
+def sql_literals(sql):
+    """
+    Values a query depends on: string literals ('Nike', 'XS') and every number in it
+    (price > 20, LIMIT 5, BETWEEN 10 AND 20, IN (1, 2)). Only the constants of the
+    discount formula are ignored.
+    """
+    strings = re.findall(r"'([^']*)'", sql)
+    numbers = NUMBER.findall(FORMULA_CONSTANTS.sub(" ", re.sub(r"'[^']*'", "", sql)))
+    return [s.lower() for s in strings] + numbers
+
+
+def question_signature(key):
+    """The numbers and negations of a normalized question; a reused plan needs the same ones."""
+    words = key.split()
+    return (sorted(NUMBER.findall(key)),
+            sorted(word for word in words if word in NEGATIONS or word.endswith("n't")))
+
+
+class PlanCache:
+    """
+    Maps a question to the SQL the chain generated (and successfully ran) for it.
+    Exact matches use the normalized question text; otherwise we fall back to the
+    most similar cached question, but only if every literal in its SQL ('Nike',
+    'XS', 5, ...) also appears in the new question and both questions have the same
+    numbers and negations, so "Nike white" never reuses the plan for "Nike black",
+    "top 3" the one for "top 5", or "not white" the one for "white".
+    Entries are evicted least-recently-used and dropped when the schema changes.
+    """
+
+    def __init__(self, embeddings=None, max_entries=MAX_ENTRIES, similarity_threshold=SIMILARITY_THRESHOLD):
+        self.embeddings = embeddings
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.schema_version = None
+        self._entries = OrderedDict()  # normalized question -> (sql, unit vector or None)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    def _embed(self, text):
+        if self.embeddings is None:
+            return None
+        vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_schema(self, schema_version):
+        if schema_version != self.schema_version:
+            self._entries.clear()
+            self.schema_version = schema_version
+
+    def lookup(self, question, schema_version):
+        key = normalize_question(question)
+        with self._lock:
+            self._check_schema(schema_version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            candidates = [(k, sql, vector) for k, (sql, vector) in self._entries.items() if vector is not None]
+
+        if candidates and self.embeddings is not None:
+            signature = question_signature(key)
+            query = self._embed(key)
+            scores = np.stack([vector for _, _, vector in candidates]) @ query
+            for i in np.argsort(-scores):
+                if scores[i] < self.similarity_threshold:
+                    break
+                cached_key, sql, _ = candidates[i]
+                if question_signature(cached_key) != signature:
+                    continue
+                if all(re.search(rf"\b{re.escape(literal)}\b", key) for literal in sql_literals(sql)):
+                    with self._lock:
+                        if cached_key in self._entries:
+                            self._entries.move_to_end(cached_key)
+                        self.similar_hits += 1
+                    return sql
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def store(self, question, sql, schema_version):
+        key = normalize_question(question)
+        vector = self._embed(key)
+        with self._lock:
+            self._check_schema(schema_version)
+            self._entries[key] = (sql, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            hits = self.hits + self.similar_hits
+            total = hits + self.misses
+            return {
+                "exact_hits": self.hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+                "entries": len(self._entries),
+            }
@@ -0,0 +1,250 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+from decimal import Decimal
+from collections import OrderedDict
+
+from sqlalchemy import text
+
+# Cheap per-table fingerprints. Row count alone misses UPDATEs (e.g. stock changes), and plain
+# column sums miss updates that keep the total (stock moved between shirts, prices swapped,
+# a discount moved to another shirt), so each value is also weighted by its row's id.
+# Tables not listed here use COUNT(*) only.
+VERSION_EXPRESSIONS = {
+    "t_shirts": "COUNT(*), SUM(stock_quantity), SUM(price), "
+                "SUM(t_shirt_id * stock_quantity), SUM(t_shirt_id * price)",
+    "discounts": "COUNT(*), SUM(pct_discount), SUM(discount_id * t_shirt_id), SUM(discount_id * pct_discount)",
+}
+
+# Don't re-fingerprint the tables more often than this
+VERSION_CHECK_SECONDS = 5
+MAX_RESULTS = 1024
+
+SUMMARY_PATH = os.getenv("TSHIRT_SUMMARY_PATH",
+                         os.path.join(os.path.dirname(os.path.abspath(__file__)), "tshirt_summary.sqlite"))
+
+
+def normalize_sql(sql):
+    """Collapses whitespace and lowercases everything outside string literals, so formatting doesn't matter."""
+    parts = re.split(r"('(?:[^']|'')*')", sql.strip().rstrip(";"))
+    return "".join(part if part.startswith("'") else re.sub(r"\s+", " ", part.lower()) for part in parts).strip()
+
+
+def tables_in(sql, known_tables):
+    """Which of the known tables a query reads from."""
+    words = set(re.findall(r"[a-z_][a-z0-9_]*", re.sub(r"'(?:[^']|'')*'", "", sql.lower())))
+    return sorted(table for table in known_tables if table.lower() in words)
+
+
+class TableVersions:
+    """Fingerprints tables with one small aggregate each, re-checked at most every VERSION_CHECK_SECONDS."""
+
+    def __init__(self, engine, check_seconds=VERSION_CHECK_SECONDS):
+        self.engine = engine
+        self.check_seconds = check_seconds
+        self._versions = {}  # table -> (checked_at, fingerprint)
+        self._lock = threading.Lock()
+
+    def get(self, tables):
+        now = time.monotonic()
+        stale = []
+        with self._lock:
+            for table in tables:
+                cached = self._versions.get(table)
+                if cached is None or now - cached[0] >= self.check_seconds:
+                    stale.append(table)
+
+        if stale:
+            with self.engine.connect() as connection:
+                for table in stale:
+                    expression = VERSION_EXPRESSIONS.get(table, "COUNT(*)")
+                    row = connection.execute(text(f"SELECT {expression} FROM {table}")).fetchone()
+                    with self._lock:
+                        self._versions[table] = (now, tuple(str(value) for value in row))
+
+        with self._lock:
+            return tuple(self._versions[table][1] for table in tables)
+
+    def invalidate(self):
+        with self._lock:
+            self._versions.clear()
+
+
+class ResultCache:
+    """
+    LRU cache of SQL results keyed on the normalized query text.
+    Each entry remembers the fingerprints of the tables it read; if any of them
+    changed since, the entry is ignored and the query runs again.
+    """
+
+    def __init__(self, versions, known_tables, max_entries=MAX_RESULTS):
+        self.versions = versions
+        self.known_tables = list(known_tables)
+        self.max_entries = max_entries
+        self._results = OrderedDict()  # normalized sql -> (table versions, result)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def run(self, sql, execute):
+        key = normalize_sql(sql)
+        # Only plain reads are cacheable
+        if not key.startswith(("select", "with")):
+            return execute()
+
+        tables = tables_in(key, self.known_tables)
+        current = self.versions.get(tables)
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None and entry[0] == current:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        result = execute()
+        with self._lock:
+            self._results[key] = (current, result)
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+        self.versions.invalidate()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / total if total else 0.0, "entries": len(self._results)}
+
+
+# --- Precomputed summary (local SQLite mirror) ---
+
+# Stock, inventory value and post-discount value per brand/color/size.
+# The discount factor reproduces the few-shot revenue query exactly: a shirt with no
+# discount row counts once at full price, a shirt with several rows counts once per row.
+SUMMARY_QUERY = """
+SELECT t.brand, t.color, t.size,
+       SUM(t.stock_quantity) AS stock,
+       SUM(t.price * t.stock_quantity) AS inventory_value,
+       SUM(t.price * t.stock_quantity * COALESCE(d.factor, 1)) AS discounted_value
+FROM t_shirts t
+LEFT JOIN (
+    SELECT t_shirt_id, SUM((100 - COALESCE(pct_discount, 0)) / 100.0) AS factor
+    FROM discounts GROUP BY t_shirt_id
+) d ON t.t_shirt_id = d.t_shirt_id
+GROUP BY t.brand, t.color, t.size
+"""
+
+CONDITION = r"(brand|color|size)\s*=\s*('(?:[^']|'')*')"
+# Optional "WHERE col = 'x' AND ..." on brand/color/size only; the whole clause is captured as one group
+PLAIN_CONDITION = r"(?:brand|color|size)\s*=\s*'(?:[^']|'')*'"
+WHERE = rf"(?:\s+where\s+({PLAIN_CONDITION}(?:\s+and\s+{PLAIN_CONDITION})*))?"
+
+# Query shapes the summary can answer exactly; anything else goes to the real database
+SUMMARY_PATTERNS = [
+    (re.compile(rf"select sum\(\s*stock_quantity\s*\) from t_shirts{WHERE}"), "stock"),
+    (re.compile(rf"select sum\(\s*price\s*\*\s*stock_quantity\s*\) from t_shirts{WHERE}"), "inventory_value"),
+    # The few-shot "revenue after discounts" query
+    (re.compile(r"select sum\(\s*a\.total_amount\s*\*\s*\(\s*\(\s*100\s*-\s*coalesce\(\s*discounts\.pct_discount\s*,\s*0\s*\)\s*\)\s*/\s*100\s*\)\s*\)"
+                r"(?: as \w+)? from \(\s*select sum\(\s*price\s*\*\s*stock_quantity\s*\) as total_amount\s*,\s*t_shirt_id"
+                rf" from t_shirts{WHERE} group by t_shirt_id\s*\) a left join discounts"
+                r" on a\.t_shirt_id\s*=\s*discounts\.t_shirt_id"), "discounted_value"),
+]
+
+
+# Money is stored as integer ten-thousandths: exact for 2-decimal prices times whole-percent
+# discounts, where SQLite REAL sums would drift (5712.299999999999 instead of 5712.30)
+MONEY_COLUMNS = ("inventory_value", "discounted_value")
+MONEY_SCALE = 10_000
+
+
+def to_stored(column, value):
+    if value is None:
+        return None
+    if column in MONEY_COLUMNS:
+        # MySQL hands back Decimals, SQLite floats; str() keeps either exact
+        return int((Decimal(str(value)) * MONEY_SCALE).to_integral_value())
+    return int(value)
+
+
+def from_stored(column, value):
+    # Money comes back as a 2-decimal Decimal, the way MySQL prints the real query's result
+    if value is None or column not in MONEY_COLUMNS:
+        return value
+    return (Decimal(value) / MONEY_SCALE).quantize(Decimal("0.01"))
+
+
+class SummaryMirror:
+    """
+    Keeps SUMMARY_QUERY materialized in a local SQLite file and answers matching
+    aggregate queries from it. The mirror is rebuilt (read-through) whenever the
+    source tables' fingerprints change, so answers are never stale.
+    """
+
+    def __init__(self, engine, versions, path=SUMMARY_PATH):
+        self.engine = engine
+        self.versions = versions
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summary (brand TEXT, color TEXT, size TEXT, "
+            "stock INTEGER, inventory_value INTEGER, discounted_value INTEGER)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS summary_meta (source_version TEXT)")
+        self._conn.commit()
+
+    def match(self, sql):
+        """Returns (column, {filter column: value}) if the summary can answer this query, else None."""
+        key = normalize_sql(sql)
+        for pattern, column in SUMMARY_PATTERNS:
+            found = pattern.fullmatch(key)
+            if found:
+                filters = {}
+                for name, literal in re.findall(CONDITION, found.group(1) or ""):
+                    value = literal[1:-1].replace("''", "'")
+                    if filters.get(name, value) != value:
+                        return None
+                    filters[name] = value
+                return column, filters
+        return None
+
+    def refresh(self, source_version):
+        with self.engine.connect() as connection:
+            rows = connection.execute(text(SUMMARY_QUERY)).fetchall()
+        with self._lock:
+            self._conn.execute("DELETE FROM summary")
+            self._conn.executemany("INSERT INTO summary VALUES (?, ?, ?, ?, ?, ?)",
+                                   [tuple(row[:3]) + tuple(to_stored(column, value) for column, value in
+                                                           zip(("stock",) + MONEY_COLUMNS, row[3:]))
+                                    for row in rows])
+            self._conn.execute("DELETE FROM summary_meta")
+            self._conn.execute("INSERT INTO summary_meta VALUES (?)", (source_version,))
+            self._conn.commit()
+
+    def answer(self, sql):
+        """Result string in the same format as SQLDatabase.run, or None if this query isn't covered."""
+        matched = self.match(sql)
+        if matched is None:
+            return None
+        column, filters = matched
+
+        source_version = repr(self.versions.get(["discounts", "t_shirts"]))
+        with self._lock:
+            row = self._conn.execute("SELECT source_version FROM summary_meta").fetchone()
+        if row is None or row[0] != source_version:
+            self.refresh(source_version)
+
+        # MySQL compares strings case-insensitively by default, so the mirror does too
+        where = " AND ".join(f"{name} = ? COLLATE NOCASE" for name in filters)
+        query = f"SELECT SUM({column}) FROM summary" + (f" WHERE {where}" if where else "")
+        with self._lock:
+            result = self._conn.execute(query, list(filters.values())).fetchall()
+        return str([(from_stored(column, value),) for value, in result])
@@ -0,0 +1,90 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import langchain_helper  # noqa: E402
+
+
+class FakeDatabase:
+    schema_version = "v1"
+
+    def __init__(self, result):
+        self.result = result
+
+    def run(self, sql):
+        return self.result
+
+
+class FakeChain:
+    def __init__(self, result):
+        self.database = FakeDatabase(result)
+
+
+class FakePlanCache:
+    def lookup(self, question, schema_version):
+        return "SELECT brand, SUM(stock_quantity) FROM t_shirts GROUP BY brand"
+
+
+def test_describe_result_scalars():
+    assert langchain_helper.describe_result("[(310,)]") == "The total count is 310 items."
+    assert langchain_helper.describe_result("[(Decimal('2805.50'),)]") == "The total amount is $2805.50."
+    assert langchain_helper.describe_result("[(Decimal('-12.50'),)]") == "The total amount is $-12.50."
+
+
+def test_describe_result_keeps_non_scalars():
+    assert "Nike" in langchain_helper.describe_result("[('Nike',)]")
+    assert langchain_helper.describe_result("[]") == "The database didn't return any rows for that."
+
+
+def test_plan_cache_hit_with_multi_row_result(monkeypatch):
+    db_result = "[('Nike', 10), ('Adidas', 5)]"
+    monkeypatch.setattr(langchain_helper, "get_few_shot_db_chain", lambda: FakeChain(db_result))
+    monkeypatch.setattr(langchain_helper, "get_plan_cache", lambda: FakePlanCache())
+
+    response = langchain_helper.format_response(langchain_helper.answer_question("Stock per brand?"))
+
+    assert response["plan_cache_hit"]
+    assert response["db_result"] == db_result
+    # Both rows come through as they are, not squashed into one number like "105"
+    assert response["answer"] == f"Here is what the database returned: {db_result}"
+
+
+class SameVector:
+    """Every question embeds to the same vector, so only the literal checks keep plans apart."""
+
+    def embed_query(self, text):
+        return [1.0, 0.0]
+
+
+def similar_plan(cached_question, sql, question):
+    from plan_cache import PlanCache
+    cache = PlanCache(embeddings=SameVector())
+    cache.store(cached_question, sql, "v1")
+    return cache.lookup(question, "v1")
+
+
+def test_plan_cache_compares_limit():
+    sql = "SELECT brand FROM t_shirts ORDER BY price DESC LIMIT 5"
+    assert similar_plan("top 5 brands by price", sql, "top 3 brands by price") is None
+    assert similar_plan("top 5 brands by price", sql, "show top 5 brands by price") == sql
+
+
+def test_plan_cache_compares_between_and_in():
+    between = "SELECT COUNT(*) FROM t_shirts WHERE price BETWEEN 10 AND 20"
+    assert similar_plan("shirts priced between 10 and 20", between, "shirts priced between 10 and 30") is None
+    in_list = "SELECT SUM(stock_quantity) FROM t_shirts WHERE t_shirt_id IN (1, 2)"
+    assert similar_plan("stock of shirts 1 and 2", in_list, "stock of shirts 1 and 3") is None
+
+
+def test_plan_cache_compares_negation():
+    sql = "SELECT SUM(stock_quantity) FROM t_shirts WHERE color != 'White'"
+    assert similar_plan("how many shirts are not white", sql, "how many shirts are white") is None
+    sql = "SELECT SUM(stock_quantity) FROM t_shirts WHERE color = 'White'"
+    assert similar_plan("how many shirts are white", sql, "how many shirts are not white") is None
+
+
+def test_plan_cache_ignores_discount_formula_constants():
+    sql = ("SELECT SUM(a.total_amount * ((100 - COALESCE(discounts.pct_discount, 0)) / 100)) FROM "
+           "(SELECT SUM(price * stock_quantity) AS total_amount, t_shirt_id FROM t_shirts "
+           "WHERE brand = 'Nike' GROUP BY t_shirt_id) a LEFT JOIN discounts ON a.t_shirt_id = discounts.t_shirt_id")
+    assert similar_plan("nike revenue after discounts", sql, "total nike revenue after discounts") == sql